@@ -0,0 +1,381 @@
+"""
+Admissão de Alertas (POST /alerts)
+Fila limitada, cotas por cliente e gravação em lote (group commit) na frente
+do insert_alerts, para que uma integração com defeito ou uma tempestade de
+alertas não sature o MongoDB usado pelas leituras do dashboard
+
+  - cota por client_id (token bucket): ALERT_INGEST_RATE alertas/s, com
+    rajadas de até ALERT_INGEST_BURST; acima dela -> 429 com Retry-After
+  - fila limitada (ALERT_INGEST_QUEUE_SIZE): cheia -> 429 com Retry-After
+    estimado pelo ritmo de gravação
+  - um único gravador em segundo plano grava ao atingir
+    ALERT_INGEST_BATCH_SIZE alertas ou ALERT_INGEST_FLUSH_INTERVAL segundos
+  - falhas transitórias (rede, troca de primário) são regravadas até
+    ALERT_INGEST_RETRIES vezes, com espera crescente; só depois o alerta
+    fica `failed`
+
+A requisição recebe 202 assim que o alerta é aceito, sem esperar o lote;
+com `Prefer: wait=N` espera a gravação por até N segundos. O _id do alerta é
+atribuído na admissão e serve de tracking id (GET /alerts/ingest/{id}).
+created_at continua sendo o instante da gravação (série temporal e rollups
+dependem disso).
+"""
+
+import asyncio
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Any, Optional
+
+from bson import ObjectId
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Motivos de recusa
+SHED_QUOTA = 'quota'
+SHED_QUEUE = 'queue_full'
+
+# Situação de um alerta admitido
+QUEUED = 'queued'
+STORED = 'stored'
+FAILED = 'failed'
+
+# Regravação de um alerta que a tentativa anterior já tinha gravado (chave
+# duplicada no índice _id_); em outro índice (fingerprint_active_unique) é
+# um alerta ativo do mesmo problema, e o alerta falha com esse código
+DUPLICATE_KEY = 11000
+_ID_INDEX = re.compile(r'index: _id_(\s|$)')
+
+_STOP = object()
+
+
+class TokenBucket:
+    """Fichas de um cliente (repostas continuamente a `rate` por segundo)"""
+
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> float:
+        """Consome uma ficha; retorna 0 ou os segundos até haver uma ficha"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class ClientQuotas:
+    """Token bucket por client_id (LRU limitado a `max_clients`)
+
+    Um cliente removido pelo LRU volta com a rajada cheia; com rate <= 0 as
+    cotas ficam desativadas.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: float = 50.0, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def take(self, client_id: str, now: Optional[float] = None) -> float:
+        """0 se o cliente está dentro da cota; senão segundos até a próxima ficha"""
+        if not self.enabled:
+            return 0.0
+
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = self._buckets[client_id] = TokenBucket(self.burst, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket.take(self.rate, self.burst, now)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def retry_after_seconds(seconds: float) -> int:
+    """Valor do cabeçalho Retry-After (segundos inteiros, mínimo 1)"""
+    return max(1, math.ceil(seconds))
+
+
+class AlertIngestor:
+    """Fila limitada de alertas gravada em lote por uma task asyncio
+
+    submit() não espera o banco: decide na hora entre aceitar (tracking id)
+    e recusar (motivo e Retry-After). Com wait=True, devolve também um future
+    resolvido com a situação final do alerta.
+
+    on_recovered recebe os alertas que uma tentativa interrompida gravou
+    (chave duplicada na regravação), para os efeitos que insert_alerts só
+    aplica aos inseridos (rollups, deduplicação).
+    """
+
+    def __init__(self, write_batch: Callable[[List[Dict]], Awaitable[Dict[str, Any]]],
+                 quotas: Optional[ClientQuotas] = None,
+                 max_queue: int = 5000, batch_size: int = 500,
+                 flush_interval: float = 0.2, max_tracked: int = 10000,
+                 retries: int = 3, retry_backoff: float = 0.5,
+                 on_recovered: Optional[Callable[[List[Dict]], Awaitable[None]]] = None):
+        self.write_batch = write_batch
+        self.quotas = quotas if quotas is not None else ClientQuotas()
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_tracked = max_tracked
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.on_recovered = on_recovered
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._tracking: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        # Requisições esperando a gravação do próprio alerta
+        self._waiters: Dict[str, asyncio.Future] = {}
+        # Alertas gravados por segundo (média móvel), para o Retry-After da fila cheia
+        self._write_rate = 0.0
+
+        self.stats = {
+            'accepted': 0,
+            'shed_quota': 0,
+            'shed_queue': 0,
+            'stored': 0,
+            'failed': 0,
+            'retried': 0,
+            'recovered': 0,
+            'batches': 0,
+        }
+
+    @classmethod
+    def from_env(cls, write_batch, on_recovered=None) -> 'AlertIngestor':
+        """Cria o admissor a partir das variáveis de ambiente"""
+        return cls(
+            write_batch,
+            quotas=ClientQuotas(
+                rate=float(os.getenv('ALERT_INGEST_RATE', '10')),
+                burst=float(os.getenv('ALERT_INGEST_BURST', '50')),
+                max_clients=int(os.getenv('ALERT_INGEST_MAX_CLIENTS', '10000')),
+            ),
+            max_queue=int(os.getenv('ALERT_INGEST_QUEUE_SIZE', '5000')),
+            batch_size=int(os.getenv('ALERT_INGEST_BATCH_SIZE', '500')),
+            flush_interval=float(os.getenv('ALERT_INGEST_FLUSH_INTERVAL', '0.2')),
+            max_tracked=int(os.getenv('ALERT_INGEST_TRACKED', '10000')),
+            retries=int(os.getenv('ALERT_INGEST_RETRIES', '3')),
+            retry_backoff=float(os.getenv('ALERT_INGEST_RETRY_BACKOFF', '0.5')),
+            on_recovered=on_recovered,
+        )
+
+    def start(self):
+        """Inicia a task de gravação (deve ser chamado dentro do event loop)"""
+        if self._task is not None:
+            return
+        self._closed = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: Optional[float] = 30.0):
+        """Para de aceitar, grava o que está na fila e encerra a task"""
+        if self._task is None:
+            return
+
+        self._closed = True
+        await self._queue.put(_STOP)
+
+        try:
+            await asyncio.wait_for(self._task, timeout)
+            logger.info(f"✓ Admissão de alertas encerrada: {self.stats}")
+        except asyncio.TimeoutError:
+            logger.error(f"✗ Admissão de alertas não terminou em {timeout}s "
+                         f"({self._queue.qsize()} alertas pendentes)")
+            # Requisições ainda esperando não ficam presas no encerramento
+            for tracking_id in list(self._waiters):
+                self._settle(tracking_id, FAILED, error='API encerrada antes da gravação')
+        self._task = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, alert_data: Dict, wait: bool = False) -> Dict[str, Any]:
+        """Admite um alerta: {'accepted': True, 'tracking_id'} (e 'done', um
+        future com a situação final, se wait) ou {'accepted': False, 'reason',
+        'retry_after'}"""
+        if self._closed or self._task is None:
+            return {'accepted': False, 'reason': SHED_QUEUE,
+                    'retry_after': retry_after_seconds(self.flush_interval)}
+
+        # Fila cheia antes da cota: a recusa não consome a ficha do cliente
+        if self._queue.full():
+            self.stats['shed_queue'] += 1
+            return {'accepted': False, 'reason': SHED_QUEUE,
+                    'retry_after': retry_after_seconds(self._drain_time())}
+
+        quota_wait = self.quotas.take(str(alert_data.get('client_id')))
+        if quota_wait > 0:
+            self.stats['shed_quota'] += 1
+            return {'accepted': False, 'reason': SHED_QUOTA,
+                    'retry_after': retry_after_seconds(quota_wait)}
+
+        alert_data['_id'] = ObjectId()
+        self._queue.put_nowait(alert_data)
+
+        tracking_id = str(alert_data['_id'])
+        self.stats['accepted'] += 1
+        self._track(tracking_id, {'status': QUEUED, 'accepted_at': datetime.now()})
+        admission = {'accepted': True, 'tracking_id': tracking_id}
+        if wait:
+            admission['done'] = self._waiters[tracking_id] = \
+                asyncio.get_running_loop().create_future()
+        return admission
+
+    def status(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        """Situação de um alerta admitido (None se desconhecido ou já esquecido)"""
+        entry = self._tracking.get(tracking_id)
+        return {'tracking_id': tracking_id, **entry} if entry else None
+
+    def _track(self, tracking_id: str, entry: Dict[str, Any]):
+        self._tracking[tracking_id] = entry
+        self._tracking.move_to_end(tracking_id)
+        while len(self._tracking) > self.max_tracked:
+            self._tracking.popitem(last=False)
+
+    def _drain_time(self) -> float:
+        """Segundos estimados para esvaziar a fila no ritmo atual de gravação"""
+        if self._write_rate <= 0:
+            return self.flush_interval * max(1, self.depth / self.batch_size)
+        return self.depth / self._write_rate
+
+    async def _run(self):
+        """Loop de group commit: grava ao atingir batch_size ou flush_interval"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            batch = []
+            try:
+                item = await self._queue.get()
+                deadline = loop.time() + self.flush_interval
+
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: List[Dict]):
+        """Grava um lote, regravando as falhas transitórias com espera crescente
+
+        Enquanto o gravador espera, a fila enche e novas requisições recebem
+        429: a retaguarda chega aos clientes em vez de perder alertas aceitos.
+        """
+        started = time.monotonic()
+        pending = batch
+        attempt = 0
+
+        while pending:
+            try:
+                result = await self.write_batch(pending)
+            except Exception as e:
+                logger.error(f"✗ Erro ao gravar lote de alertas: {e}")
+                result = {'errors': [{'index': i, 'code': None, 'message': str(e)}
+                                     for i in range(len(pending))]}
+
+            errors = {error['index']: error for error in result['errors']}
+            retry: List[Dict] = []
+            recovered: List[Dict] = []
+            for index, alert in enumerate(pending):
+                error = errors.get(index)
+                tracking_id = str(alert['_id'])
+                if error is None:
+                    self._settle(tracking_id, STORED)
+                elif attempt and error.get('code') == DUPLICATE_KEY \
+                        and _ID_INDEX.search(error.get('message', '')):
+                    # O _id é atribuído na admissão: a tentativa anterior gravou o alerta
+                    recovered.append(alert)
+                elif error.get('code') is None and attempt < self.retries:
+                    retry.append(alert)
+                else:
+                    self._settle(tracking_id, FAILED, error=error.get('message'),
+                                 code=error.get('code'))
+
+            if recovered:
+                await self._recover(recovered)
+
+            if retry:
+                attempt += 1
+                self.stats['retried'] += len(retry)
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                logger.warning(f"⚠ {len(retry)} alertas não gravados; nova tentativa "
+                               f"({attempt}/{self.retries}) em {delay:.1f}s")
+                await asyncio.sleep(delay)
+            pending = retry
+
+        self.stats['batches'] += 1
+        elapsed = max(time.monotonic() - started, 1e-3)
+        rate = len(batch) / elapsed
+        self._write_rate = rate if self._write_rate == 0 else 0.8 * self._write_rate + 0.2 * rate
+
+    async def _recover(self, alerts: List[Dict]):
+        self.stats['recovered'] += len(alerts)
+        if self.on_recovered is not None:
+            try:
+                await self.on_recovered(alerts)
+            except Exception as e:
+                logger.error(f"✗ Erro ao completar alertas regravados: {e}")
+        for alert in alerts:
+            self._settle(str(alert['_id']), STORED)
+
+    def _settle(self, tracking_id: str, status: str, error: Optional[str] = None,
+                code: Optional[int] = None):
+        """Registra a situação final de um alerta e libera quem a espera"""
+        entry = self._tracking.get(tracking_id, {})
+        if status == STORED:
+            entry.update(status=STORED, stored_at=datetime.now())
+            self.stats['stored'] += 1
+        else:
+            entry.update(status=FAILED, error=error, code=code)
+            self.stats['failed'] += 1
+        self._track(tracking_id, entry)
+
+        waiter = self._waiters.pop(tracking_id, None)
+        # Cancelado quando o cliente desconecta antes da gravação
+        if waiter is not None and not waiter.done():
+            waiter.set_result({'tracking_id': tracking_id, **entry})
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Profundidade da fila, recusas e gravações para /metrics"""
+        return {
+            'queue_depth': self.depth,
+            'max_queue': self.max_queue,
+            'clients': len(self.quotas),
+            'rate_per_client': self.quotas.rate,
+            'burst_per_client': self.quotas.burst,
+            'write_rate': round(self._write_rate, 1),
+            'waiting': len(self._waiters),
+            **self.stats,
+        }
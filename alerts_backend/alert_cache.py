@@ -0,0 +1,118 @@
+"""
+Cache de Alertas
+Cache LRU limitado (read-through) para a busca de um alerta pelo id
+
+Invalidação:
+  - local: update_alert, resolve_alert e delete_alert removem a entrada
+  - entre processos: eventos do ChangeFeed (change streams) da collection
+  - TTL: limita a defasagem quando change streams não estão disponíveis
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+
+class AlertCache:
+    """LRU de alertas por id com TTL e contadores
+
+    Uma leitura iniciada antes de uma invalidação não grava no cache:
+    generation() é lido antes da consulta ao banco e conferido em put().
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: 'OrderedDict[str, Tuple[Dict, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'resets': 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> 'AlertCache':
+        """Cria o cache a partir de ALERT_CACHE_SIZE (0 desativa) e ALERT_CACHE_TTL"""
+        return cls(
+            max_entries=int(os.getenv('ALERT_CACHE_SIZE', '1000')),
+            ttl_seconds=float(os.getenv('ALERT_CACHE_TTL', '30')),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def generation(self) -> int:
+        """Contador de invalidações (lido antes de consultar o banco)"""
+        return self._generation
+
+    def get(self, alert_id: str) -> Optional[Dict]:
+        """Alerta em cache (cópia) ou None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(alert_id)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+
+            alert, cached_at = entry
+            if time.monotonic() - cached_at > self.ttl:
+                del self._entries[alert_id]
+                self.counters['expired'] += 1
+                self.counters['misses'] += 1
+                return None
+
+            self._entries.move_to_end(alert_id)
+            self.counters['hits'] += 1
+            return copy.deepcopy(alert)
+
+    def put(self, alert_id: str, alert: Dict, generation: int):
+        """Guarda um alerta lido do banco, se nada foi invalidado desde `generation`"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[alert_id] = (copy.deepcopy(alert), time.monotonic())
+            self._entries.move_to_end(alert_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def invalidate(self, alert_id: Any):
+        """Remove um alerta alterado ou removido"""
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(str(alert_id), None) is not None:
+                self.counters['invalidations'] += 1
+
+    def clear(self):
+        """Esvazia o cache (ex.: eventos de outros processos podem ter sido perdidos)"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.counters['resets'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores e ocupação do cache"""
+        with self._lock:
+            lookups = self.counters['hits'] + self.counters['misses']
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                **self.counters,
+                'hit_rate': round(self.counters['hits'] / lookups, 3) if lookups else 0.0,
+            }
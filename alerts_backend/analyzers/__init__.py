@@ -3,7 +3,7 @@ Analisadores de Logs e Banco de Dados
 Detectam problemas específicos
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Set
 from datetime import datetime, timedelta
 import logging
 
@@ -22,6 +22,11 @@ class BaseAnalyzer:
         """Método abstrato - deve ser implementado pelas subclasses"""
         raise NotImplementedError("Subclasses devem implementar analyze()")
     
+    def find_duplicates(self, client_ids: Iterable[str], hours: int) -> Set[str]:
+        """Clientes que já possuem alerta ativo deste tipo na janela (consulta única)"""
+        keys = [(client_id, self.alert_type, hours) for client_id in client_ids]
+        return {client_id for client_id, _, _ in self.db.check_duplicate_alerts(keys)}
+    
     def create_alert(self, client_id: str, client_name: str, 
                     title: str, description: str, 
                     metadata: Optional[Dict] = None) -> Dict:
@@ -61,9 +66,11 @@ class BackupAnalyzer(BaseAnalyzer):
                 {'id': 'CLI002', 'name': 'Comércio XYZ'},
             ]
             
+            # Verificar de uma vez quais clientes já têm alerta recente
+            duplicates = self.find_duplicates((c['id'] for c in clients), hours=24)
+            
             for client in clients:
-                # Verificar se já existe alerta recente
-                if self.db.check_duplicate_alert(client['id'], self.alert_type, hours=24):
+                if client['id'] in duplicates:
                     continue
                 
                 # Criar alerta de backup falho
@@ -112,9 +119,12 @@ class StockAnalyzer(BaseAnalyzer):
                 }
             ]
             
+            duplicates = self.find_duplicates(
+                (item['client_id'] for item in zero_stock_items), hours=6
+            )
+            
             for item in zero_stock_items:
-                if self.db.check_duplicate_alert(item['client_id'], 
-                                                 self.alert_type, hours=6):
+                if item['client_id'] in duplicates:
                     continue
                 
                 alert = self.create_alert(
@@ -161,9 +171,12 @@ class NFeAnalyzer(BaseAnalyzer):
                 }
             ]
             
+            duplicates = self.find_duplicates(
+                (error['client_id'] for error in nfe_errors), hours=2
+            )
+            
             for error in nfe_errors:
-                if self.db.check_duplicate_alert(error['client_id'], 
-                                                 self.alert_type, hours=2):
+                if error['client_id'] in duplicates:
                     continue
                 
                 alert = self.create_alert(
@@ -209,9 +222,12 @@ class DatabaseAnalyzer(BaseAnalyzer):
                 }
             ]
             
+            duplicates = self.find_duplicates(
+                (issue['client_id'] for issue in db_issues), hours=1
+            )
+            
             for issue in db_issues:
-                if self.db.check_duplicate_alert(issue['client_id'], 
-                                                 self.alert_type, hours=1):
+                if issue['client_id'] in duplicates:
                     continue
                 
                 alert = self.create_alert(
@@ -257,9 +273,12 @@ class ErrorRateAnalyzer(BaseAnalyzer):
                 }
             ]
             
+            duplicates = self.find_duplicates(
+                (client['client_id'] for client in high_error_clients), hours=1
+            )
+            
             for client in high_error_clients:
-                if self.db.check_duplicate_alert(client['client_id'], 
-                                                 self.alert_type, hours=1):
+                if client['client_id'] in duplicates:
                     continue
                 
                 alert = self.create_alert(
@@ -305,9 +324,12 @@ class DiskSpaceAnalyzer(BaseAnalyzer):
                 }
             ]
             
+            duplicates = self.find_duplicates(
+                (server['client_id'] for server in low_disk_servers), hours=6
+            )
+            
             for server in low_disk_servers:
-                if self.db.check_duplicate_alert(server['client_id'], 
-                                                 self.alert_type, hours=6):
+                if server['client_id'] in duplicates:
                     continue
                 
                 alert = self.create_alert(
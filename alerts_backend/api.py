@@ -3,15 +3,26 @@ API REST - FastAPI
 Endpoints para o frontend consumir
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import date, datetime, timedelta
+import asyncio
 import logging
 
-from database import db_manager
-from notifiers import NotificationManager
+from admission import DUPLICATE_KEY, STORED
+from async_database import async_db_manager as db_manager
+from bulk import bulk_log
+from push import SSE_MEDIA_TYPE, parse_push_filters, sse_body
+from queries import next_cursor, parse_fields
+from rollups import ROLLUP_COLLECTION
+from search import SEARCH_SORTS, SEARCH_TARGETS, SORT_RELEVANCE, search_filters
+from serialization import FastJSONResponse
+from streaming import (
+    NDJSON_MEDIA_TYPE, json_body, ndjson_body, stream_batch_size, stream_media_type
+)
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -21,7 +32,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Sistema de Alertas API",
     description="API para gerenciamento de alertas e monitoramento",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Configurar CORS
@@ -56,12 +68,31 @@ class ResolveAlert(BaseModel):
     resolved_by: str
 
 
+class BulkFilter(BaseModel):
+    status: Optional[str] = None
+    severity: Optional[str] = None
+    client_id: Optional[str] = None
+
+
+class BulkSelection(BaseModel):
+    ids: Optional[List[str]] = None
+    filter: Optional[BulkFilter] = None
+
+
+class BulkUpdate(BulkSelection):
+    update: AlertUpdate
+
+
+class BulkResolve(BulkSelection):
+    resolved_by: str
+
+
 # ========== STARTUP/SHUTDOWN ==========
 
 @app.on_event("startup")
 async def startup_event():
     """Conecta ao MongoDB na inicialização"""
-    if db_manager.connect():
+    if await db_manager.connect():
         logger.info("✓ API iniciada e conectada ao MongoDB")
     else:
         logger.error("✗ Falha ao conectar ao MongoDB")
@@ -70,7 +101,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Fecha conexão ao desligar"""
-    db_manager.close()
+    await db_manager.close()
     logger.info("✓ API desligada")
 
 
@@ -87,34 +118,120 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas do pool de conexões, latência por comando e cache de alertas"""
+    return {
+        "success": True,
+        "profile": db_manager.pool_profile,
+        "options": db_manager.pool_options,
+        **db_manager.monitor.snapshot(),
+        "alert_cache": db_manager.alert_cache.stats(),
+        "change_feed": db_manager.change_feed.status() if db_manager.change_feed else None,
+        "etags": db_manager.versions.stats(),
+        "push": {name: hub.status() for name, hub in db_manager.push_hubs.items()},
+        "ingest": db_manager.alert_ingestor.snapshot() if db_manager.alert_ingestor else None
+    }
+
+
+def _alert_filters(status: Optional[str], severity: Optional[str],
+                   client_id: Optional[str]) -> Dict[str, Any]:
+    """Filtros de listagem de alertas ('all' = sem filtro)"""
+    filters = {}
+    
+    if status and status != "all":
+        filters['status'] = status
+    
+    if severity and severity != "all":
+        filters['severity'] = severity
+    
+    if client_id:
+        filters['client_id'] = client_id
+    
+    return filters
+
+
+def _etag_headers(etag: Optional[str]) -> Dict[str, str]:
+    """ETag da resposta; no-cache faz o navegador revalidar com If-None-Match"""
+    return {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+
+
+async def _check_etag(collections: List[str], params: Dict[str, Any],
+                      if_none_match: Optional[str]) -> Tuple[Optional[str], Optional[Response]]:
+    """ETag atual e, se o cliente já tem essa versão, a resposta 304
+    (sem refazer a consulta)"""
+    etag = await db_manager.etag(collections, params)
+    if db_manager.versions.not_modified(if_none_match, etag):
+        return etag, Response(status_code=304, headers=_etag_headers(etag))
+    return etag, None
+
+
+def _page_limit(limit: Optional[int], default: int, maximum: int) -> int:
+    """Limite de uma resposta normal (streaming não tem máximo)"""
+    if limit is None:
+        return default
+    if limit > maximum:
+        raise ValueError(f"limit acima de {maximum}; use stream=1 ou Accept: {NDJSON_MEDIA_TYPE}")
+    return limit
+
+
+def _streaming_response(media_type: str, documents, key: str, sort_field: str,
+                        limit: Optional[int]) -> StreamingResponse:
+    """Resposta NDJSON ou JSON gerada em lotes a partir de iter_alerts/iter_logs"""
+    if media_type == NDJSON_MEDIA_TYPE:
+        body = ndjson_body(documents)
+    else:
+        body = json_body(documents, key, sort_field, limit)
+    return StreamingResponse(body, media_type=media_type)
+
+
 @app.get("/alerts")
 async def get_alerts(
     status: Optional[str] = Query(None, description="Filtrar por status"),
     severity: Optional[str] = Query(None, description="Filtrar por severidade"),
     client_id: Optional[str] = Query(None, description="Filtrar por cliente"),
-    limit: int = Query(100, ge=1, le=1000, description="Limite de resultados")
+    limit: Optional[int] = Query(None, ge=1, description="Limite de resultados (padrão 100, máx. 1000; sem máximo em streaming)"),
+    cursor: Optional[str] = Query(None, description="Token da próxima página (next_cursor)"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula ('*' = documento completo)"),
+    stream: bool = Query(False, description="Resposta em streaming (lotes lidos do cursor)"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """Lista alertas com filtros opcionais"""
+    """Lista alertas com filtros opcionais
+    
+    Com `stream=1` ou `Accept: application/x-ndjson` os alertas são enviados
+    em lotes à medida que são lidos (sem `limit`, todos os que atendem aos filtros).
+    Respostas normais trazem ETag: If-None-Match com a versão atual -> 304.
+    """
     try:
-        filters = {}
+        filters = _alert_filters(status, severity, client_id)
         
-        if status and status != "all":
-            filters['status'] = status
+        media_type = stream_media_type(accept, stream)
+        if media_type:
+            documents = db_manager.iter_alerts(filters, limit, cursor, parse_fields(fields),
+                                               stream_batch_size())
+            return _streaming_response(media_type, documents, 'alerts', 'created_at', limit)
         
-        if severity and severity != "all":
-            filters['severity'] = severity
+        limit = _page_limit(limit, 100, 1000)
+        etag, not_modified = await _check_etag(['alerts'], {
+            "filters": filters, "limit": limit, "cursor": cursor, "fields": fields
+        }, if_none_match)
+        if not_modified:
+            return not_modified
         
-        if client_id:
-            filters['client_id'] = client_id
+        alerts = await db_manager.get_alerts(filters, limit, cursor, parse_fields(fields))
         
-        alerts = db_manager.get_alerts(filters, limit)
-        
-        return {
+        # Resposta retornada diretamente: ObjectId/datetime codificados em
+        # serialization.dumps, sem o jsonable_encoder
+        return FastJSONResponse({
             "success": True,
             "alerts": alerts,
-            "total": len(alerts)
-        }
+            "total": len(alerts),
+            "next_cursor": next_cursor(alerts, 'created_at', limit)
+        }, headers=_etag_headers(etag))
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao buscar alertas: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -124,32 +241,94 @@ async def get_alerts(
 async def get_alert(alert_id: str):
     """Retorna um alerta específico"""
     try:
-        from bson.objectid import ObjectId
-        
-        collection = db_manager.get_collection('alerts')
-        alert = collection.find_one({'_id': ObjectId(alert_id)})
+        alert = await db_manager.get_alert_by_id(alert_id)
         
         if not alert:
             raise HTTPException(status_code=404, detail="Alerta não encontrado")
         
-        alert['_id'] = str(alert['_id'])
-        
-        return {
+        return FastJSONResponse({
             "success": True,
             "alert": alert
-        }
+        })
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar alerta: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Espera máxima aceita em `Prefer: wait=N` (segundos)
+MAX_PREFER_WAIT = 30.0
+
+
+def _prefer_wait(prefer: Optional[str]) -> Optional[float]:
+    """Segundos de `Prefer: wait=N` (RFC 7240), limitados a MAX_PREFER_WAIT"""
+    for token in (prefer or '').replace(';', ',').split(','):
+        name, _, value = token.strip().partition('=')
+        if name.lower() == 'wait':
+            try:
+                return min(max(float(value), 0.0), MAX_PREFER_WAIT)
+            except ValueError:
+                return None
+    return None
+
+
 @app.post("/alerts")
-async def create_alert(alert: AlertCreate):
-    """Cria um novo alerta"""
+async def create_alert(alert: AlertCreate, prefer: Optional[str] = Header(None)):
+    """Cria um novo alerta
+
+    Com a admissão ativa (ALERT_INGEST_ENABLED), responde 202 com o tracking
+    id (o id do alerta) assim que o alerta é aceito, sem esperar o lote ser
+    gravado. Com `Prefer: wait=N`, espera a gravação por até N segundos:
+    200 depois de gravado (409 com um alerta ativo de mesmo fingerprint, 500
+    em falha) ou 202 se o lote ainda não foi gravado. Acima da cota do
+    client_id ou com a fila cheia, 429 com Retry-After.
+    """
     try:
-        alert_data = alert.dict()
-        alert_id = db_manager.insert_alert(alert_data)
+        alert_data = alert.model_dump()
+        ingestor = db_manager.alert_ingestor
+        wait = _prefer_wait(prefer)
+        
+        if ingestor is not None:
+            admission = ingestor.submit(alert_data, wait=wait is not None)
+            
+            if not admission['accepted']:
+                raise HTTPException(
+                    status_code=429,
+                    detail={"reason": admission['reason'],
+                            "message": "Alerta recusado: tente novamente mais tarde"},
+                    headers={"Retry-After": str(admission['retry_after'])}
+                )
+            
+            if wait is not None:
+                try:
+                    outcome = await asyncio.wait_for(admission['done'], wait)
+                except asyncio.TimeoutError:
+                    outcome = None
+                
+                if outcome is not None:
+                    if outcome.get('code') == DUPLICATE_KEY:
+                        raise HTTPException(status_code=409,
+                                            detail="Já existe um alerta ativo para este problema")
+                    if outcome['status'] != STORED:
+                        raise HTTPException(status_code=500, detail="Falha ao criar alerta")
+                    
+                    return {
+                        "success": True,
+                        "alert_id": admission['tracking_id'],
+                        "message": "Alerta criado com sucesso"
+                    }
+            
+            return FastJSONResponse({
+                "success": True,
+                "alert_id": admission['tracking_id'],
+                "tracking_id": admission['tracking_id'],
+                "status": "queued",
+                "message": "Alerta aceito para gravação"
+            }, status_code=202)
+        
+        alert_id = await db_manager.insert_alert(alert_data)
         
         if not alert_id:
             raise HTTPException(status_code=500, detail="Falha ao criar alerta")
@@ -160,21 +339,123 @@ async def create_alert(alert: AlertCreate):
             "message": "Alerta criado com sucesso"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao criar alerta: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/alerts/ingest/{tracking_id}")
+async def get_alert_ingest_status(tracking_id: str):
+    """Situação de um alerta aceito com 202 (queued, stored ou failed)"""
+    try:
+        ingestor = db_manager.alert_ingestor
+        status = ingestor.status(tracking_id) if ingestor else None
+        
+        if status is None:
+            # Fora da janela de acompanhamento: consulta o próprio alerta
+            if not await db_manager.get_alert_by_id(tracking_id):
+                raise HTTPException(status_code=404, detail="Alerta não encontrado")
+            status = {"tracking_id": tracking_id, "status": "stored"}
+        
+        return {
+            "success": True,
+            **status
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao consultar admissão do alerta: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Operações em lote: declaradas antes das rotas /alerts/{alert_id}
+
+def _bulk_filters(selection: BulkSelection) -> Optional[Dict[str, Any]]:
+    if selection.filter is None:
+        return None
+    return _alert_filters(selection.filter.status, selection.filter.severity,
+                          selection.filter.client_id)
+
+
+@app.put("/alerts/bulk")
+async def bulk_update_alerts(data: BulkUpdate):
+    """Atualiza vários alertas (lista de ids ou filtro) com uma única gravação"""
+    try:
+        update_data = {k: v for k, v in data.update.model_dump().items() if v is not None}
+        
+        if not update_data:
+            raise HTTPException(status_code=400, detail="Nenhum dado para atualizar")
+        
+        result = await db_manager.update_alerts(data.ids, _bulk_filters(data), update_data)
+        await db_manager.insert_log(bulk_log(result))
+        
+        return {
+            "success": True,
+            **result
+        }
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro na atualização em lote: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/alerts/bulk/resolve")
+async def bulk_resolve_alerts(data: BulkResolve):
+    """Resolve vários alertas (lista de ids ou filtro) com uma única gravação"""
+    try:
+        result = await db_manager.resolve_alerts(data.resolved_by, data.ids, _bulk_filters(data))
+        
+        # Um registro para toda a operação
+        await db_manager.insert_log(bulk_log(result, data.resolved_by), site='resolution_log')
+        
+        return {
+            "success": True,
+            **result
+        }
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro na resolução em lote: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/alerts/bulk/delete")
+async def bulk_delete_alerts(data: BulkSelection):
+    """Remove vários alertas (lista de ids ou filtro) com uma única gravação"""
+    try:
+        result = await db_manager.delete_alerts(data.ids, _bulk_filters(data))
+        await db_manager.insert_log(bulk_log(result))
+        
+        return {
+            "success": True,
+            **result
+        }
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro na remoção em lote: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.put("/alerts/{alert_id}")
 async def update_alert(alert_id: str, update: AlertUpdate):
     """Atualiza um alerta"""
     try:
-        update_data = {k: v for k, v in update.dict().items() if v is not None}
+        update_data = {k: v for k, v in update.model_dump().items() if v is not None}
         
         if not update_data:
             raise HTTPException(status_code=400, detail="Nenhum dado para atualizar")
         
-        success = db_manager.update_alert(alert_id, update_data)
+        success = await db_manager.update_alert(alert_id, update_data)
         
         if not success:
             raise HTTPException(status_code=404, detail="Alerta não encontrado")
@@ -195,17 +476,17 @@ async def update_alert(alert_id: str, update: AlertUpdate):
 async def resolve_alert(alert_id: str, data: ResolveAlert):
     """Marca um alerta como resolvido"""
     try:
-        success = db_manager.resolve_alert(alert_id, data.resolved_by)
+        success = await db_manager.resolve_alert(alert_id, data.resolved_by)
         
         if not success:
             raise HTTPException(status_code=404, detail="Alerta não encontrado")
         
         # Registrar no log
-        db_manager.insert_log({
+        await db_manager.insert_log({
             'origin': 'API',
             'level': 'INFO',
             'message': f'Alerta {alert_id} resolvido por {data.resolved_by}'
-        })
+        }, site='resolution_log')
         
         return {
             "success": True,
@@ -223,12 +504,9 @@ async def resolve_alert(alert_id: str, data: ResolveAlert):
 async def delete_alert(alert_id: str):
     """Deleta um alerta"""
     try:
-        from bson.objectid import ObjectId
-        
-        collection = db_manager.get_collection('alerts')
-        result = collection.delete_one({'_id': ObjectId(alert_id)})
+        success = await db_manager.delete_alert(alert_id)
         
-        if result.deleted_count == 0:
+        if not success:
             raise HTTPException(status_code=404, detail="Alerta não encontrado")
         
         return {
@@ -244,28 +522,77 @@ async def delete_alert(alert_id: str):
 
 
 @app.get("/stats")
-async def get_stats():
-    """Retorna estatísticas dos alertas"""
+async def get_stats(if_none_match: Optional[str] = Header(None)):
+    """Retorna estatísticas dos alertas (ETag: If-None-Match com a versão atual -> 304)"""
     try:
-        stats = db_manager.get_alert_stats()
+        # resolvedToday muda na virada do dia mesmo sem gravações
+        etag, not_modified = await _check_etag(['alerts', ROLLUP_COLLECTION],
+                                               {"day": date.today()}, if_none_match)
+        if not_modified:
+            return not_modified
         
-        return {
+        stats = await db_manager.get_alert_stats()
+        
+        return FastJSONResponse({
             "success": True,
             **stats
-        }
+        }, headers=_etag_headers(etag))
     
     except Exception as e:
         logger.error(f"Erro ao buscar estatísticas: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _local_time(value: datetime) -> datetime:
+    """Datas com fuso -> horário local sem fuso (formato gravado no banco)"""
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+
+@app.get("/stats/series")
+async def get_stats_series(
+    granularity: str = Query("day", description="Intervalo: minute, hour ou day"),
+    start: Optional[datetime] = Query(None, description="Início do período (padrão: últimos 60 min, 24h ou 7 dias)"),
+    end: Optional[datetime] = Query(None, description="Fim do período (padrão: agora)")
+):
+    """Alertas criados por intervalo, severidade e tipo (gráfico do dashboard)"""
+    try:
+        series = await db_manager.get_alert_series(
+            granularity,
+            _local_time(start) if start else None,
+            _local_time(end) if end else None
+        )
+        
+        return {
+            "success": True,
+            **series
+        }
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao calcular série de alertas: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/logs")
 async def get_logs(
     level: Optional[str] = Query(None, description="Filtrar por nível"),
     origin: Optional[str] = Query(None, description="Filtrar por origem"),
-    limit: int = Query(1000, ge=1, le=5000, description="Limite de resultados")
+    limit: Optional[int] = Query(None, ge=1, description="Limite de resultados (padrão 1000, máx. 5000; sem máximo em streaming)"),
+    start: Optional[datetime] = Query(None, description="Logs a partir desta data/hora"),
+    end: Optional[datetime] = Query(None, description="Logs anteriores a esta data/hora"),
+    cursor: Optional[str] = Query(None, description="Token da próxima página (next_cursor)"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula ('*' = documento completo)"),
+    stream: bool = Query(False, description="Resposta em streaming (lotes lidos do cursor)"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """Lista logs do sistema"""
+    """Lista logs do sistema (inclui logs arquivados quando o período alcança o arquivo)
+    
+    Com `stream=1` ou `Accept: application/x-ndjson` os logs são enviados em
+    lotes (sem `limit`, todo o período: exportação de um dia inteiro de logs).
+    Respostas normais trazem ETag, como em /alerts.
+    """
     try:
         filters = {}
         
@@ -275,19 +602,174 @@ async def get_logs(
         if origin:
             filters['origin'] = origin
         
-        logs = db_manager.get_logs(filters, limit)
+        if start or end:
+            filters['timestamp'] = {}
+            if start:
+                filters['timestamp']['$gte'] = _local_time(start)
+            if end:
+                filters['timestamp']['$lt'] = _local_time(end)
         
-        return {
+        media_type = stream_media_type(accept, stream)
+        if media_type:
+            documents = db_manager.iter_logs(filters, limit, cursor, parse_fields(fields),
+                                             stream_batch_size())
+            return _streaming_response(media_type, documents, 'logs', 'timestamp', limit)
+        
+        limit = _page_limit(limit, 1000, 5000)
+        etag, not_modified = await _check_etag(['logs'], {
+            "filters": filters, "limit": limit, "cursor": cursor, "fields": fields
+        }, if_none_match)
+        if not_modified:
+            return not_modified
+        
+        logs = await db_manager.get_logs(filters, limit, cursor, parse_fields(fields))
+        
+        return FastJSONResponse({
             "success": True,
             "logs": logs,
-            "total": len(logs)
-        }
+            "total": len(logs),
+            "next_cursor": next_cursor(logs, 'timestamp', limit)
+        }, headers=_etag_headers(etag))
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao buscar logs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/logs/histogram")
+async def get_logs_histogram(
+    start: Optional[datetime] = Query(None, description="Início do período (padrão: 24h atrás)"),
+    end: Optional[datetime] = Query(None, description="Fim do período (padrão: agora)"),
+    bucket: Optional[str] = Query(None, description="Largura dos intervalos (ex.: 5m, 1h, 1d)"),
+    level: Optional[str] = Query(None, description="Filtrar por nível"),
+    origin: Optional[str] = Query(None, description="Filtrar por origem")
+):
+    """Contagens de logs por intervalo de tempo, nível e origem"""
+    try:
+        end = _local_time(end) if end else datetime.now()
+        start = _local_time(start) if start else end - timedelta(days=1)
+        
+        filters = {}
+        
+        if level:
+            filters['level'] = level.upper()
+        
+        if origin:
+            filters['origin'] = origin
+        
+        histogram = await db_manager.get_log_histogram(start, end, bucket, filters)
+        
+        return {
+            "success": True,
+            **histogram
+        }
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao calcular histograma de logs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, description="Termos da busca (\"frase exata\", -excluir)"),
+    type: str = Query("all", description="alerts, logs ou all"),
+    severity: Optional[str] = Query(None, description="Severidade dos alertas"),
+    status: Optional[str] = Query(None, description="Status dos alertas"),
+    level: Optional[str] = Query(None, description="Nível dos logs"),
+    origin: Optional[str] = Query(None, description="Origem dos logs"),
+    start: Optional[datetime] = Query(None, description="A partir desta data/hora"),
+    end: Optional[datetime] = Query(None, description="Anteriores a esta data/hora"),
+    sort: str = Query(SORT_RELEVANCE, description=f"Ordenação: {', '.join(SEARCH_SORTS)}"),
+    limit: int = Query(20, ge=1, le=200, description="Resultados por página (por tipo)"),
+    cursor: Optional[str] = Query(None, description="Token da próxima página (exige type)")
+):
+    """Busca textual em alertas (título/descrição) e logs (mensagem)"""
+    try:
+        kinds = list(SEARCH_TARGETS) if type == "all" else [type]
+        if any(kind not in SEARCH_TARGETS for kind in kinds):
+            raise ValueError(f"Tipo inválido: {type} (use alerts, logs ou all)")
+        if cursor and len(kinds) > 1:
+            raise ValueError("Paginação com cursor exige type=alerts ou type=logs")
+        
+        response: Dict[str, Any] = {"success": True, "query": q, "next_cursor": {}}
+        for kind in kinds:
+            filters = search_filters(
+                kind, severity=severity, status=status,
+                level=level.upper() if level else None, origin=origin,
+                start=_local_time(start) if start else None,
+                end=_local_time(end) if end else None
+            )
+            found = await db_manager.search(kind, q, filters, limit, cursor, sort)
+            response[kind] = found['results']
+            response["next_cursor"][kind] = found['next_cursor']
+        
+        return FastJSONResponse(response)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro na busca: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ========== TEMPO REAL ==========
+
+def _push_response(collection_name: str, request: Request, filters: Dict[str, Optional[str]],
+                   last_event_id: Optional[str]) -> StreamingResponse:
+    """Conexão SSE com o hub da collection (um leitor compartilhado por todas)"""
+    hub = db_manager.push_hubs.get(collection_name)
+    if hub is None:
+        raise HTTPException(status_code=503, detail="Entrega em tempo real desativada (PUSH_ENABLED=0)")
+    
+    try:
+        parsed = parse_push_filters(collection_name, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        sse_body(hub, parsed, last_event_id, request.is_disconnected),
+        media_type=SSE_MEDIA_TYPE,
+        # Sem buffer em proxies (nginx) para os eventos saírem na hora
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/stream/alerts")
+async def stream_alerts(
+    request: Request,
+    severity: Optional[str] = Query(None, description="Severidades (separadas por vírgula)"),
+    client_id: Optional[str] = Query(None, description="Clientes (separados por vírgula)"),
+    status: Optional[str] = Query(None, description="Status (separados por vírgula)"),
+    last_event_id: Optional[str] = Query(None, description="Retomar após este evento (como o cabeçalho Last-Event-ID)"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Alertas criados, alterados e removidos, em tempo real (Server-Sent Events)
+    
+    Eventos `alert` ({"op", "alert"}) e `reset` (eventos perdidos: recarregue a
+    lista). Ao reconectar, os eventos posteriores a Last-Event-ID são reenviados.
+    """
+    return _push_response("alerts", request,
+                          {"severity": severity, "client_id": client_id, "status": status},
+                          last_event_id_header or last_event_id)
+
+
+@app.get("/stream/logs")
+async def stream_logs(
+    request: Request,
+    level: Optional[str] = Query(None, description="Níveis (separados por vírgula)"),
+    origin: Optional[str] = Query(None, description="Origens (separadas por vírgula)"),
+    last_event_id: Optional[str] = Query(None, description="Retomar após este evento (como o cabeçalho Last-Event-ID)"),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Logs novos em tempo real (Server-Sent Events, eventos `log` e `reset`)"""
+    return _push_response("logs", request, {"level": level, "origin": origin},
+                          last_event_id_header or last_event_id)
+
+
 # ========== EXECUTAR API ==========
 
 if __name__ == "__main__":
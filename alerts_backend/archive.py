@@ -0,0 +1,404 @@
+"""
+Arquivo de Logs em Parquet
+Move logs antigos do MongoDB para arquivos Parquet comprimidos, particionados
+por data (date=YYYY-MM-DD), e permite consultá-los a partir de get_logs
+
+Requer pyarrow (opcional): pip install pyarrow
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Iterator, Tuple
+import logging
+
+from bson import ObjectId, json_util
+
+from queries import LOG_SUMMARY_FIELDS, decode_cursor
+from timeseries import from_timeseries, is_timeseries
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+PARTITION_FIELD = 'date'
+
+# Colunas gravadas; metadata e `extra` (demais campos do log, como os de
+# notificação) são serializados como JSON estendido (bson.json_util)
+ARCHIVE_COLUMNS = ['_id', 'timestamp', 'level', 'origin', 'message', 'alert_id', 'metadata',
+                   'extra']
+
+
+def _schema():
+    return pa.schema([
+        ('_id', pa.string()),
+        ('timestamp', pa.timestamp('ms')),
+        ('level', pa.string()),
+        ('origin', pa.string()),
+        ('message', pa.string()),
+        ('alert_id', pa.string()),
+        ('metadata', pa.string()),
+        ('extra', pa.string()),
+    ])
+
+
+def _to_row(log: Dict) -> Dict[str, Any]:
+    metadata = log.get('metadata')
+    extra = {key: value for key, value in log.items() if key not in ARCHIVE_COLUMNS}
+    alert_id = log.get('alert_id')
+    if alert_id is not None and not isinstance(alert_id, str):
+        # A coluna guarda o texto (filtro); o tipo original volta por `extra`
+        extra['alert_id'] = alert_id
+    return {
+        '_id': str(log['_id']),
+        'timestamp': log['timestamp'],
+        'level': log.get('level'),
+        'origin': log.get('origin'),
+        'message': log.get('message'),
+        'alert_id': str(alert_id) if alert_id is not None else None,
+        'metadata': json_util.dumps(metadata) if metadata is not None else None,
+        'extra': json_util.dumps(extra) if extra else None,
+    }
+
+
+def _from_row(row: Dict[str, Any], fields: Optional[List[str]] = None) -> Dict:
+    """Linha Parquet -> log no formato do MongoDB (_id como ObjectId)
+
+    O _id é gravado como texto (hex de 24 caracteres, mesma ordem do
+    ObjectId) e volta ao tipo original, para que cursores e comparações não
+    dependam do lado da fronteira em que o log está. Os campos de `extra`
+    voltam ao nível do documento (só os pedidos em `fields`, se informado).
+    """
+    log = {key: value for key, value in row.items() if value is not None}
+    if ObjectId.is_valid(log.get('_id', '')):
+        log['_id'] = ObjectId(log['_id'])
+    if 'metadata' in log:
+        log['metadata'] = json_util.loads(log['metadata'])
+    extra = log.pop('extra', None)
+    if extra is not None:
+        log.update((key, value) for key, value in json_util.loads(extra).items()
+                   if fields is None or key in fields)
+    return log
+
+
+def _wanted(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """Campos de `extra` a devolver (None: todos os lidos)"""
+    return None if fields is None or '*' in fields else fields
+
+
+def resume_point(last: Optional[Dict], cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    """(timestamp, _id) a partir do qual o arquivo continua: último log entregue
+    pelo MongoDB ou, sem nenhum, o cursor da página"""
+    if last:
+        return last['timestamp'], str(last['_id'])
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        return value, str(last_id)
+    return None
+
+
+class LogArchive:
+    """Arquivo Parquet local de logs (gravação e leitura com pushdown)"""
+
+    def __init__(self, path: str = 'archive/logs', after_days: int = 30,
+                 batch_size: int = 5000, compression: str = 'zstd'):
+        self.path = path
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.compression = compression
+
+    @classmethod
+    def from_env(cls) -> 'LogArchive':
+        """Cria o arquivo a partir das variáveis LOG_ARCHIVE_*"""
+        return cls(
+            path=os.getenv('LOG_ARCHIVE_DIR', 'archive/logs'),
+            after_days=int(os.getenv('LOG_ARCHIVE_AFTER_DAYS', '30')),
+            batch_size=int(os.getenv('LOG_ARCHIVE_BATCH_SIZE', '5000')),
+            compression=os.getenv('LOG_ARCHIVE_COMPRESSION', 'zstd'),
+        )
+
+    @property
+    def available(self) -> bool:
+        """pyarrow instalado e diretório do arquivo existente"""
+        return pa is not None and os.path.isdir(self.path)
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """Início do dia mais antigo mantido no MongoDB (dias inteiros são arquivados)"""
+        now = now or datetime.now()
+        return datetime.combine((now - timedelta(days=self.after_days)).date(), datetime.min.time())
+
+    def reaches(self, filters: Optional[Dict], cursor: Optional[str],
+                now: Optional[datetime] = None) -> bool:
+        """A consulta alcança o período arquivado (anterior a cutoff())
+
+        Só quando pedido explicitamente: `start` antes do cutoff, `end` ou
+        cursor (paginação que já chegou ao histórico) até o cutoff. Uma página
+        incompleta sem período fica no MongoDB, em vez de percorrer todas as
+        partições à procura de um filtro seletivo.
+        """
+        if not self.available:
+            return False
+
+        cutoff = self.cutoff(now)
+        range_filter = (filters or {}).get('timestamp')
+        if isinstance(range_filter, dict):
+            start = range_filter.get('$gte', range_filter.get('$gt'))
+            end = range_filter.get('$lt', range_filter.get('$lte'))
+            if (start is not None and start < cutoff) or (end is not None and end <= cutoff):
+                return True
+
+        return bool(cursor) and decode_cursor(cursor)[0] <= cutoff
+
+    def completes(self, logs: List[Dict], limit: int, filters: Optional[Dict],
+                  cursor: Optional[str]) -> bool:
+        """Página incompleta cujo período ou cursor alcança o arquivo"""
+        return len(logs) < limit and self.reaches(filters, cursor)
+
+    def covers(self, start: datetime) -> bool:
+        """Período que alcança o arquivo (logs removidos do MongoDB)"""
+        return self.available and start < self.cutoff()
+
+    # ========== GRAVAÇÃO ==========
+
+    def archive(self, db, now: Optional[datetime] = None) -> int:
+        """Move para Parquet os logs anteriores a cutoff() e remove-os do MongoDB
+
+        Cada lote (ordenado por timestamp/_id) é gravado antes de ser removido;
+        o nome do arquivo deriva do lote, então uma execução interrompida
+        regrava o mesmo arquivo em vez de duplicar registros.
+        """
+        if pa is None:
+            raise RuntimeError("pyarrow não instalado: pip install pyarrow")
+
+        collection = db['logs']
+        timeseries = is_timeseries(db)
+        query = {'timestamp': {'$lt': self.cutoff(now)}}
+        archived = 0
+
+        while True:
+            batch = list(collection.find(query)
+                         .sort([('timestamp', 1), ('_id', 1)])
+                         .limit(self.batch_size))
+            if not batch:
+                break
+
+            if timeseries:
+                batch = [from_timeseries(log) for log in batch]
+
+            self._write(batch)
+            # Time-series: remoção por _id exige MongoDB 7.0+
+            collection.delete_many({'_id': {'$in': [log['_id'] for log in batch]}})
+            archived += len(batch)
+            logger.info(f"✓ {len(batch)} logs arquivados (até {batch[-1]['timestamp']})")
+
+        return archived
+
+    def _write(self, batch: List[Dict]):
+        """Grava um lote em um arquivo por partição de data"""
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for log in batch:
+            by_day.setdefault(log['timestamp'].date().isoformat(), []).append(_to_row(log))
+
+        for day, rows in by_day.items():
+            directory = os.path.join(self.path, f"{PARTITION_FIELD}={day}")
+            os.makedirs(directory, exist_ok=True)
+            filename = os.path.join(directory, f"part-{rows[0]['_id']}-{rows[-1]['_id']}.parquet")
+            table = pa.Table.from_pylist(rows, schema=_schema())
+            pq.write_table(table, filename + '.tmp', compression=self.compression)
+            os.replace(filename + '.tmp', filename)
+
+    # ========== LEITURA ==========
+
+    def _days(self, first_day: Optional[datetime] = None,
+              last_day: Optional[datetime] = None) -> List[str]:
+        """Partições existentes no período, da mais recente para a mais antiga"""
+        prefix = f"{PARTITION_FIELD}="
+        first = first_day.date().isoformat() if first_day else ''
+        last = last_day.date().isoformat() if last_day else '9999-12-31'
+        return sorted(
+            (day for day in (name[len(prefix):] for name in os.listdir(self.path)
+                             if name.startswith(prefix))
+             if first <= day <= last),
+            reverse=True
+        )
+
+    @staticmethod
+    def _period(filters: Dict, before: Optional[Tuple[datetime, str]]
+                ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Primeiro e último instante a ler (período da consulta e continuação do cursor)"""
+        range_filter = filters.get('timestamp', {})
+        first_day = range_filter.get('$gte', range_filter.get('$gt'))
+        ends = [value for value in (range_filter.get('$lt', range_filter.get('$lte')),
+                                    before[0] if before else None) if value is not None]
+        return first_day, min(ends) if ends else None
+
+    def _expression(self, filters: Dict, before: Optional[Tuple[datetime, str]]):
+        """Converte os filtros de get_logs em expressão pyarrow (None se não suportado)"""
+        expression = None
+
+        def add(condition):
+            nonlocal expression
+            expression = condition if expression is None else expression & condition
+
+        for key, value in filters.items():
+            if key in ('level', 'origin') and not isinstance(value, dict):
+                add(ds.field(key) == value)
+            elif key == 'timestamp' and isinstance(value, dict):
+                for op, bound in value.items():
+                    if op == '$gte':
+                        add(ds.field('timestamp') >= pa.scalar(bound, pa.timestamp('ms')))
+                    elif op == '$gt':
+                        add(ds.field('timestamp') > pa.scalar(bound, pa.timestamp('ms')))
+                    elif op == '$lt':
+                        add(ds.field('timestamp') < pa.scalar(bound, pa.timestamp('ms')))
+                    elif op == '$lte':
+                        add(ds.field('timestamp') <= pa.scalar(bound, pa.timestamp('ms')))
+                    else:
+                        return None
+            else:
+                return None
+
+        if before is not None:
+            # Continuação da paginação: (timestamp, _id) < before
+            ts = pa.scalar(before[0], pa.timestamp('ms'))
+            add((ds.field('timestamp') < ts) |
+                ((ds.field('timestamp') == ts) & (ds.field('_id') < before[1])))
+
+        return expression if expression is not None else ds.scalar(True)
+
+    def read(self, filters: Optional[Dict], limit: int,
+             before: Optional[Tuple[datetime, str]] = None,
+             fields: Optional[List[str]] = None) -> List[Dict]:
+        """Lê até `limit` logs arquivados em ordem (timestamp desc, _id desc)
+
+        before: (timestamp, _id) do último log já entregue. Partições são
+        percorridas da mais recente para a mais antiga e só são abertas até
+        completar o limite; level, origin e timestamp são filtrados no scan.
+        """
+        if not self.available or limit <= 0:
+            return []
+
+        wanted = _wanted(fields)
+        results: List[Dict] = []
+        for table in self._tables(filters, before, fields):
+            results.extend(_from_row(row, wanted) for row in
+                           table.slice(0, limit - len(results)).to_pylist())
+            if len(results) >= limit:
+                break
+
+        return results
+
+    def iter_batches(self, filters: Optional[Dict],
+                     before: Optional[Tuple[datetime, str]] = None,
+                     fields: Optional[List[str]] = None,
+                     size: int = 1000) -> Iterator[List[Dict]]:
+        """Todos os logs arquivados do período, em lotes de `size` (mesma ordem de read)
+
+        Usado no streaming: só uma partição (dia, com as colunas pedidas)
+        fica em memória por vez.
+        """
+        if not self.available:
+            return
+
+        wanted = _wanted(fields)
+        for table in self._tables(filters, before, fields):
+            for offset in range(0, table.num_rows, size):
+                yield [_from_row(row, wanted) for row in table.slice(offset, size).to_pylist()]
+
+    def _tables(self, filters: Optional[Dict], before: Optional[Tuple[datetime, str]],
+                fields: Optional[List[str]]) -> Iterator[Any]:
+        """Partições do período, filtradas e ordenadas, da mais recente para a mais antiga"""
+        filters = filters or {}
+        expression = self._expression(filters, before)
+        if expression is None:
+            logger.warning(f"⚠ Filtros não suportados pelo arquivo de logs: {list(filters)}")
+            return
+
+        first_day, last_day = self._period(filters, before)
+
+        if fields is None:
+            columns = [c for c in ARCHIVE_COLUMNS if c in LOG_SUMMARY_FIELDS]
+        elif '*' in fields:
+            columns = list(ARCHIVE_COLUMNS)
+        else:
+            columns = [c for c in ARCHIVE_COLUMNS if c in fields]
+            if any(field not in ARCHIVE_COLUMNS for field in fields):
+                columns.append('extra')
+        columns = list(dict.fromkeys(columns + ['timestamp', '_id']))
+
+        for day in self._days(first_day, last_day):
+            dataset = ds.dataset(os.path.join(self.path, f"{PARTITION_FIELD}={day}"),
+                                 format='parquet', schema=_schema())
+            table = dataset.to_table(columns=columns, filter=expression)
+            if table.num_rows == 0:
+                continue
+
+            yield table.sort_by([('timestamp', 'descending'), ('_id', 'descending')])
+
+    def histogram_rows(self, filters: Dict, bin_size: int, unit: str) -> List[Dict]:
+        """Contagens por (intervalo, nível, origem) dos logs arquivados
+
+        Mesmo formato das linhas de histogram.histogram_pipeline; cada partição
+        do período é agrupada separadamente pelo pyarrow.
+        """
+        if not self.available:
+            return []
+
+        expression = self._expression(filters, None)
+        if expression is None:
+            logger.warning(f"⚠ Filtros não suportados pelo arquivo de logs: {list(filters)}")
+            return []
+
+        first_day, last_day = self._period(filters, None)
+
+        rows: List[Dict] = []
+        for day in self._days(first_day, last_day):
+            dataset = ds.dataset(os.path.join(self.path, f"{PARTITION_FIELD}={day}"),
+                                 format='parquet', schema=_schema())
+            table = dataset.to_table(columns=['timestamp', 'level', 'origin'], filter=expression)
+            if table.num_rows == 0:
+                continue
+
+            table = table.append_column(
+                'bucket', pc.floor_temporal(table['timestamp'], multiple=bin_size, unit=unit)
+            )
+            grouped = table.group_by(['bucket', 'level', 'origin']).aggregate([('timestamp', 'count')])
+            rows.extend(
+                {'_id': {'t': row['bucket'], 'level': row['level'], 'origin': row['origin']},
+                 'count': row['timestamp_count']}
+                for row in grouped.to_pylist()
+            )
+
+        return rows
+
+    def read_after(self, filters: Optional[Dict], limit: int, live: List[Dict],
+                   cursor: Optional[str], fields: Optional[List[str]] = None) -> List[Dict]:
+        """Complemento de uma página do MongoDB que terminou antes do limite"""
+        before = resume_point(live[-1] if live else None, cursor)
+        return self.read(filters, limit - len(live), before, fields)
+
+
+if __name__ == "__main__":
+    from database import db_manager
+
+    log_archive = LogArchive.from_env()
+    if '--days' in sys.argv:
+        log_archive.after_days = int(sys.argv[sys.argv.index('--days') + 1])
+
+    db_manager.buffered_logs = False
+    if not db_manager.connect():
+        sys.exit(1)
+
+    try:
+        print(f"📦 Arquivando logs anteriores a {log_archive.cutoff():%Y-%m-%d} "
+              f"em {log_archive.path}...")
+        total = log_archive.archive(db_manager.db)
+        print(f"✅ {total} logs arquivados")
+    finally:
+        db_manager.close()
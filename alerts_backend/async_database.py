@@ -0,0 +1,770 @@
+"""
+Gerenciador Assíncrono de Conexão com MongoDB
+Contraparte do DatabaseManager para a API (FastAPI)
+"""
+
+import asyncio
+import os
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from typing import Optional, Dict, List, Any, AsyncIterator, Iterable, Set
+from datetime import datetime
+import logging
+
+from indexes import ensure_indexes_async
+from rollups import (
+    ROLLUP_COLLECTION, ops_for_insert, rollup_ids_for_stats, stats_from_rollups,
+    init_rollups_async
+)
+from dedup import (
+    DedupKey, UPSERT_OPTIONS, UpsertBatch, duplicates_pipeline, upsert_operation
+)
+from timeseries import (
+    ensure_timeseries_logs_async, is_timeseries_async, find_logs, from_logs, from_timeseries,
+    log_document
+)
+from archive import resume_point
+from backends import backend_name, create_async_client
+from write_concerns import write_tier
+from search import SORT_RELEVANCE, search_page, search_plan
+from histogram import build_histogram, empty_histogram, histogram_plan
+from series import (
+    SERIES_COLLECTION, bucket_counts, buckets_pipeline, build_series, seal_operations,
+    sealed_query, series_plan, split_buckets
+)
+from bulk import (
+    BULK_DELETE, BULK_RESOLVE, BULK_UPDATE, bulk_requests, bulk_result, bulk_targets,
+    changed_count, classify, fail, max_alerts
+)
+from change_feed import AsyncChangeFeed
+from log_writer import AsyncBufferedLogWriter, written_ids_query
+from versions import COUNTED_STATES, STATE_FIELDS, state_token
+from admission import AlertIngestor
+from manager_base import BEFORE_FIELDS, ManagerBase, before_projection
+from push import (
+    POLL_FIELDS, PUSH_COLLECTIONS, PUSH_OPERATIONS, AsyncPushPoller, PushHub, push_enabled
+)
+from queries import (
+    to_object_id, prepare_alert, chunk_errors, insert_result, failed_insert_result,
+    find_alerts, set_modifies, alert_stats_pipeline, stats_from_facet, empty_stats
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseManager(ManagerBase):
+    """Gerencia conexões e operações assíncronas com MongoDB"""
+
+    def __init__(self, pool_profile: str = 'api'):
+        super().__init__(pool_profile)
+        self.client: Optional[AsyncMongoClient] = None
+        self.db: Optional[AsyncDatabase] = None
+        self.log_writer: Optional[AsyncBufferedLogWriter] = None
+        self.change_feed: Optional[AsyncChangeFeed] = None
+        self.version_feed: Optional[AsyncChangeFeed] = None
+        # Entrega em tempo real (/stream/alerts, /stream/logs): um leitor por collection
+        self.push_enabled = push_enabled(self.pool_profile == 'api')
+        self.push_hubs: Dict[str, PushHub] = {}
+        self._push_readers: List[Any] = []
+        # Admissão de POST /alerts: cotas por cliente, fila limitada e gravação em lote
+        self.alert_ingest = os.getenv('ALERT_INGEST_ENABLED', '1') != '0'
+        self.alert_ingestor: Optional[AlertIngestor] = None
+
+    async def connect(self) -> bool:
+        """Estabelece conexão com MongoDB"""
+        try:
+            self.client = create_async_client(
+                self.connection_string,
+                [self.monitor],
+                self.pool_options
+            )
+            # Testa a conexão
+            await self.client.server_info()
+            self.db = self.client[self.database_name]
+            self._handles = {}
+            logger.info(f"✓ Conectado ao MongoDB (async): {self.database_name} (backend: {backend_name()})")
+
+            # A collection time-series precisa existir antes dos índices
+            if self.timeseries_logs:
+                await ensure_timeseries_logs_async(self.db)
+            self.logs_timeseries = await is_timeseries_async(self.db)
+
+            if self.auto_indexes:
+                await ensure_indexes_async(self.db)
+
+            if self.stats_rollups:
+                await init_rollups_async(self.db)
+
+            if self.buffered_logs and self.log_writer is None:
+                self.log_writer = AsyncBufferedLogWriter.from_env(
+                    lambda docs: self._insert_many('logs', docs),
+                    self._written_log_ids
+                )
+                self.log_writer.start()
+
+            if self.alert_ingest and self.alert_ingestor is None:
+                self.alert_ingestor = AlertIngestor.from_env(self.insert_alerts,
+                                                             self._recover_alerts)
+                self.alert_ingestor.start()
+
+            if self.change_feed_enabled and self.alert_cache.enabled and self.change_feed is None:
+                self.change_feed = AsyncChangeFeed(self.get_collection('alerts'))
+                self.change_feed.subscribe(self._on_alert_change, self.alert_cache.clear)
+                self.change_feed.start()
+
+            if self.change_feed_enabled and self.versions.enabled and self.version_feed is None:
+                # Collections time-series não geram eventos: logs usam a janela de ETAG_TTL
+                watched = ['alerts', ROLLUP_COLLECTION] + ([] if self.logs_timeseries else ['logs'])
+                self.version_feed = AsyncChangeFeed(self.db, collections=watched)
+                self.version_feed.subscribe(self.versions.on_change, self.versions.reset)
+                self.versions.watch(self.version_feed, watched)
+                self.version_feed.start()
+
+            if self.push_enabled and not self.push_hubs:
+                self._start_push()
+
+            return True
+        except Exception as e:
+            logger.error(f"✗ Erro ao conectar MongoDB: {e}")
+            return False
+
+    async def close(self):
+        """Fecha conexão com MongoDB"""
+        if self.change_feed:
+            await self.change_feed.stop()
+            self.change_feed = None
+
+        if self.version_feed:
+            await self.version_feed.stop()
+            self.version_feed = None
+
+        for reader in self._push_readers:
+            await reader.stop()
+        self._push_readers = []
+        self.push_hubs = {}
+
+        # Grava os alertas já aceitos (202) antes de fechar o client
+        if self.alert_ingestor:
+            await self.alert_ingestor.stop()
+            self.alert_ingestor = None
+
+        # Esvazia a fila de logs antes de fechar o client
+        if self.log_writer:
+            await self.log_writer.stop()
+            self.log_writer = None
+
+        if self.client:
+            await self.client.close()
+            logger.info("✓ Conexão MongoDB fechada")
+
+    def _start_push(self):
+        """Hub e leitores de cada collection entregue em tempo real
+
+        Change stream com o documento completo; o leitor por polling só
+        consulta o banco quando o change stream não é suportado.
+        """
+        for name in PUSH_COLLECTIONS:
+            hub = PushHub.from_env(name)
+            collection = self.get_collection(name)
+            timeseries = name == 'logs' and self.logs_timeseries
+
+            feed = None
+            # Collections time-series não geram eventos: apenas polling
+            if not timeseries:
+                feed = AsyncChangeFeed(collection, operations=PUSH_OPERATIONS,
+                                       full_document='updateLookup')
+                feed.subscribe(hub.on_change, hub.reset)
+                feed.start()
+                self._push_readers.append(feed)
+
+            poller = AsyncPushPoller(collection, hub, POLL_FIELDS[name], feed,
+                                     transform=from_timeseries if timeseries else None)
+            poller.start()
+            self._push_readers.append(poller)
+            self.push_hubs[name] = hub
+
+    async def _insert_many(self, collection_name: str, documents: List[Dict],
+                           chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Insere documentos em blocos com insert_many não ordenado"""
+        chunk_size = chunk_size or self.bulk_chunk_size
+        failed: List[int] = []
+        errors: List[Dict[str, Any]] = []
+
+        collection = self.get_collection(collection_name)
+
+        for start in range(0, len(documents), chunk_size):
+            chunk = documents[start:start + chunk_size]
+
+            try:
+                await collection.insert_many(chunk, ordered=False)
+            except Exception as e:
+                chunk_failed, chunk_errs = chunk_errors(e, start, len(chunk))
+                failed.extend(start + i for i in chunk_failed)
+                errors.extend(chunk_errs)
+
+        self.versions.bump(collection_name)
+        return insert_result(documents, failed, errors)
+
+    async def _apply_rollups(self, ops: List) -> None:
+        """Aplica incrementos nos rollups de estatísticas (uma ida ao banco)"""
+        if not self.stats_rollups or not ops:
+            return
+        try:
+            await self.get_collection(ROLLUP_COLLECTION).bulk_write(ops, ordered=False)
+        except Exception as e:
+            # Divergência é corrigida com: python rollups.py --rebuild
+            logger.error(f"✗ Erro ao atualizar rollups de estatísticas: {e}")
+        self.versions.bump(ROLLUP_COLLECTION)
+
+    # ========== ALERTS ==========
+
+    async def insert_alert(self, alert_data: Dict) -> Optional[str]:
+        """Insere novo alerta"""
+        try:
+            collection = self.get_collection('alerts')
+            prepare_alert(alert_data)
+
+            result = await collection.insert_one(alert_data)
+            await self._apply_rollups(self._insert_done(alert_data, result.inserted_id))
+            return str(result.inserted_id)
+        except Exception as e:
+            logger.error(f"✗ Erro ao inserir alerta: {e}")
+            return None
+
+    async def insert_alerts(self, alerts: List[Dict],
+                            chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Insere alertas em lote"""
+        now = datetime.now()
+        for alert_data in alerts:
+            prepare_alert(alert_data, now)
+
+        try:
+            result = await self._insert_many('alerts', alerts, chunk_size)
+        except Exception as e:
+            logger.error(f"✗ Erro ao inserir alertas: {e}")
+            return failed_insert_result(len(alerts), e)
+
+        await self._apply_rollups(self._inserts_done(alerts, result))
+        return result
+
+    async def _recover_alerts(self, alerts: List[Dict]):
+        """Alertas gravados por uma tentativa que retornou erro (regravação da admissão)"""
+        self.versions.bump('alerts')
+        await self._apply_rollups(ops_for_insert(alerts))
+        self.dedup.remember(alerts)
+
+    async def upsert_alert(self, alert_data: Dict) -> Optional[Dict[str, Any]]:
+        """Cria o alerta ou atualiza o ativo com o mesmo fingerprint
+
+        Operação atômica única (find_one_and_update com upsert), protegida pelo
+        índice único parcial fingerprint_active_unique contra execuções
+        concorrentes. Retorna {'_id', 'created', 'occurrences'} ou None.
+        """
+        query, update = upsert_operation(alert_data, datetime.now())
+
+        try:
+            collection = self.get_collection('alerts')
+
+            try:
+                doc = await collection.find_one_and_update(query, update, **UPSERT_OPTIONS)
+            except DuplicateKeyError:
+                # Outro processo criou o alerta entre a busca e a inserção:
+                # a nova tentativa encontra o documento e apenas o atualiza
+                doc = await collection.find_one_and_update(query, update, **UPSERT_OPTIONS)
+
+            result, ops = self._upsert_done(doc, update)
+            await self._apply_rollups(ops)
+            return result
+        except Exception as e:
+            logger.error(f"✗ Erro no upsert de alerta: {e}")
+            return None
+
+    async def upsert_alerts(self, alerts: List[Dict],
+                            chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Upsert em lote (bulk_write não ordenado, uma ida ao banco por bloco)
+
+        Retorna 'created_ids' na ordem da entrada (id dos alertas criados, None
+        para os atualizados ou com falha), os totais e os erros por alerta.
+        """
+        batch = UpsertBatch(alerts, datetime.now(), chunk_size or self.bulk_chunk_size)
+
+        for requests in batch.attempts():
+            try:
+                collection = self.get_collection('alerts')
+                batch.record((await collection.bulk_write(requests, ordered=False)).bulk_api_result)
+            except BulkWriteError as e:
+                batch.record(e.details)
+            except Exception as e:
+                batch.failed(e)
+
+        await self._apply_rollups(self._upserts_done(batch))
+        return batch.result()
+
+    async def get_alerts(self, filters: Optional[Dict] = None,
+                         limit: int = 100,
+                         cursor: Optional[str] = None,
+                         fields: Optional[List[str]] = None) -> List[Dict]:
+        """Busca alertas com filtros opcionais
+
+        cursor: token da página anterior; fields: campos retornados
+        (None = resumo, ['*'] = documento completo)
+        """
+        query, projection, order = find_alerts(filters, cursor, fields)
+
+        try:
+            collection = self.get_collection('alerts')
+
+            found = collection.find(query, projection).sort(order).limit(limit)
+            # _id segue como ObjectId: serializado na resposta (serialization.py)
+            return await found.to_list(None)
+        except Exception as e:
+            logger.error(f"✗ Erro ao buscar alertas: {e}")
+            return []
+
+    def iter_alerts(self, filters: Optional[Dict] = None,
+                    limit: Optional[int] = None,
+                    cursor: Optional[str] = None,
+                    fields: Optional[List[str]] = None,
+                    batch_size: int = 1000) -> AsyncIterator[Dict]:
+        """Alertas na ordem de get_alerts, lidos do cursor em lotes (streaming)
+
+        Os documentos não são acumulados: a memória não depende de `limit`
+        (None = todos). Cursor inválido levanta ValueError já na chamada;
+        erros de leitura interrompem a iteração.
+        """
+        query, projection, order = find_alerts(filters, cursor, fields)
+
+        return (self.get_collection('alerts').find(query, projection)
+                .sort(order)
+                .limit(limit or 0)
+                .batch_size(batch_size))
+
+    async def get_alert_by_id(self, alert_id: str) -> Optional[Dict]:
+        """Busca um alerta pelo id (read-through no cache LRU)"""
+        cached = self.alert_cache.get(alert_id)
+        if cached is not None:
+            return cached
+
+        # Lido antes da consulta: uma invalidação concorrente impede o put
+        generation = self.alert_cache.generation()
+        try:
+            collection = self.get_collection('alerts')
+            alert = await collection.find_one({'_id': to_object_id(alert_id)})
+
+            if alert:
+                self.alert_cache.put(alert_id, alert, generation)
+            return alert
+        except Exception as e:
+            logger.error(f"✗ Erro ao buscar alerta: {e}")
+            return None
+
+    async def update_alert(self, alert_id: str, update_data: Dict,
+                           site: Optional[str] = None) -> bool:
+        """Atualiza um alerta (site: ponto de chamada, define o write concern)"""
+        try:
+            collection = self.get_collection('alerts', site)
+
+            update_data['updated_at'] = datetime.now()
+
+            # Estado anterior necessário para ajustar os rollups
+            before = await collection.find_one_and_update(
+                {'_id': to_object_id(alert_id)},
+                {'$set': update_data},
+                projection=before_projection(update_data),
+                return_document=ReturnDocument.BEFORE
+            )
+
+            # Como o modified_count > 0 de um update_one: alerta inexistente ou
+            # $set sem alteração retornam False
+            if before is None or not set_modifies(before, update_data):
+                return False
+
+            await self._apply_rollups(self._update_done(alert_id, before, update_data))
+            return True
+        except Exception as e:
+            logger.error(f"✗ Erro ao atualizar alerta: {e}")
+            return False
+
+    async def resolve_alert(self, alert_id: str, resolved_by: str) -> bool:
+        """Marca alerta como resolvido"""
+        return await self.update_alert(alert_id, {
+            'status': 'resolved',
+            'resolved_by': resolved_by,
+            'resolved_at': datetime.now()
+        }, site='resolve_alert')
+
+    async def delete_alert(self, alert_id: str) -> bool:
+        """Remove um alerta"""
+        try:
+            collection = self.get_collection('alerts')
+            deleted = await collection.find_one_and_delete(
+                {'_id': to_object_id(alert_id)},
+                projection=BEFORE_FIELDS
+            )
+
+            if deleted is None:
+                return False
+
+            await self._apply_rollups(self._delete_done(alert_id, deleted))
+            return True
+        except Exception as e:
+            logger.error(f"✗ Erro ao remover alerta: {e}")
+            return False
+
+    async def update_alerts(self, ids: Optional[List[str]] = None,
+                            filters: Optional[Dict] = None,
+                            update_data: Optional[Dict] = None,
+                            site: Optional[str] = None) -> Dict[str, Any]:
+        """Atualiza vários alertas com o mesmo $set, por ids ou filtro (ver bulk.py)
+
+        Retorna o desfecho por id. ValueError para ids/filtro inválidos ou
+        filtro que alcança mais de BULK_MAX_ALERTS alertas.
+        """
+        update_data = {**(update_data or {}), 'updated_at': datetime.now()}
+        return await self._bulk_alerts(BULK_UPDATE, ids, filters, update_data, site)
+
+    async def resolve_alerts(self, resolved_by: str, ids: Optional[List[str]] = None,
+                             filters: Optional[Dict] = None) -> Dict[str, Any]:
+        """Resolve vários alertas (os já resolvidos ficam como estão)"""
+        now = datetime.now()
+        return await self._bulk_alerts(BULK_RESOLVE, ids, filters, {
+            'status': 'resolved',
+            'resolved_by': resolved_by,
+            'resolved_at': now,
+            'updated_at': now
+        }, site='resolve_alert')
+
+    async def delete_alerts(self, ids: Optional[List[str]] = None,
+                            filters: Optional[Dict] = None) -> Dict[str, Any]:
+        """Remove vários alertas, por ids ou filtro"""
+        return await self._bulk_alerts(BULK_DELETE, ids, filters)
+
+    async def _bulk_alerts(self, action: str, ids: Optional[List[str]], filters: Optional[Dict],
+                           update_data: Optional[Dict] = None,
+                           site: Optional[str] = None) -> Dict[str, Any]:
+        """Uma leitura do estado anterior, um bulk_write e uma gravação de
+        rollups para todos os alertas da operação"""
+        query, outcomes = bulk_targets(ids, filters)
+
+        try:
+            collection = self.get_collection('alerts', site)
+            befores = await collection.find(query, BEFORE_FIELDS).limit(max_alerts() + 1).to_list(None)
+        except Exception as e:
+            logger.error(f"✗ Erro ao ler alertas da operação em lote: {e}")
+            return bulk_result(action, fail(outcomes))
+
+        targets = classify(action, befores, outcomes)
+        if not targets:
+            return bulk_result(action, outcomes)
+
+        target_ids = [doc['_id'] for doc in targets]
+        try:
+            result = await collection.bulk_write(bulk_requests(action, target_ids, update_data))
+            changed = changed_count(action, result)
+        except Exception as e:
+            logger.error(f"✗ Erro na operação em lote ({action}): {e}")
+            # Parte dos alertas pode ter sido alterada
+            self.versions.bump('alerts')
+            return bulk_result(action, fail(outcomes, target_ids))
+
+        await self._apply_rollups(self._bulk_done(action, targets, changed, update_data))
+        return bulk_result(action, outcomes)
+
+    async def check_duplicate_alerts(self, keys: Iterable[DedupKey]) -> Set[DedupKey]:
+        """Retorna as chaves (client_id, alert_type, hours) que já possuem
+        alerta ativo na janela, com uma única consulta para as não cacheadas"""
+        now = datetime.now()
+        duplicates, missing = self.dedup.resolve(keys, now)
+        if not missing:
+            return duplicates
+
+        try:
+            collection = self.get_collection('alerts')
+            found = await collection.aggregate(duplicates_pipeline(missing, now))
+            rows = await found.to_list(None)
+            return duplicates | self.dedup.store(missing, rows, now)
+        except Exception as e:
+            logger.error(f"✗ Erro ao verificar duplicatas: {e}")
+            return duplicates
+
+    async def check_duplicate_alert(self, client_id: str, alert_type: str,
+                                    hours: int = 1) -> bool:
+        """Verifica se já existe alerta similar recente"""
+        key = (client_id, alert_type, hours)
+        return key in await self.check_duplicate_alerts([key])
+
+    # ========== LOGS ==========
+
+    async def insert_log(self, log_data: Dict, site: Optional[str] = None) -> bool:
+        """Insere log no banco (via fila em segundo plano quando habilitada)
+
+        site: ponto de chamada; quando seu nível de write concern difere do
+        da collection, o log é gravado diretamente com esse nível.
+        """
+        log_data['timestamp'] = datetime.now()
+
+        doc = log_document(log_data, self.logs_timeseries)
+        queued = site is None or write_tier('logs', site) == write_tier('logs')
+        if queued and self.log_writer and await self.log_writer.submit(doc):
+            return True
+
+        try:
+            collection = self.get_collection('logs', site)
+            await collection.insert_one(doc)
+            self.versions.bump('logs')
+            return True
+        except Exception as e:
+            logger.error(f"✗ Erro ao inserir log: {e}")
+            return False
+
+    async def insert_logs(self, logs: List[Dict],
+                          chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Insere logs em lote"""
+        now = datetime.now()
+        for log_data in logs:
+            log_data['timestamp'] = now
+
+        try:
+            docs = [log_document(log, self.logs_timeseries) for log in logs]
+            result = await self._insert_many('logs', docs, chunk_size)
+        except Exception as e:
+            logger.error(f"✗ Erro ao inserir logs: {e}")
+            return failed_insert_result(len(logs), e)
+
+        self._log_errors(result)
+        return result
+
+    async def _written_log_ids(self, docs: List[Dict]) -> set:
+        """_id dos logs de um bloco em disco que já foram gravados"""
+        collection = self.get_collection('logs')
+        cursor = collection.find(written_ids_query(docs), {'_id': 1})
+        return {doc['_id'] async for doc in cursor}
+
+    async def get_logs(self, filters: Optional[Dict] = None,
+                       limit: int = 1000,
+                       cursor: Optional[str] = None,
+                       fields: Optional[List[str]] = None) -> List[Dict]:
+        """Busca logs do sistema (cursor e fields como em get_alerts)
+
+        Logs já arquivados em Parquet completam a página quando o MongoDB
+        não tem registros suficientes e o período ou o cursor alcança o
+        arquivo (ver LogArchive.reaches).
+        """
+        query, projection, order = find_logs(filters, cursor, fields, self.logs_timeseries)
+
+        try:
+            collection = self.get_collection('logs')
+
+            found = collection.find(query, projection).sort(order).limit(limit)
+            logs = from_logs(await found.to_list(None), self.logs_timeseries)
+
+            # Página incompleta: continua no arquivo Parquet (logs mais antigos)
+            if self.archive.completes(logs, limit, filters, cursor):
+                logs += await asyncio.to_thread(
+                    self.archive.read_after, filters, limit, logs, cursor, fields
+                )
+            return logs
+        except Exception as e:
+            logger.error(f"✗ Erro ao buscar logs: {e}")
+            return []
+
+    def iter_logs(self, filters: Optional[Dict] = None,
+                  limit: Optional[int] = None,
+                  cursor: Optional[str] = None,
+                  fields: Optional[List[str]] = None,
+                  batch_size: int = 1000) -> AsyncIterator[Dict]:
+        """Logs na ordem de get_logs, lidos do cursor em lotes (streaming)
+
+        Como iter_alerts; depois do MongoDB continua no arquivo Parquet, uma
+        partição por vez (limit=None percorre todo o período).
+        """
+        query, projection, order = find_logs(filters, cursor, fields, self.logs_timeseries)
+
+        found = (self.get_collection('logs').find(query, projection)
+                 .sort(order)
+                 .limit(limit or 0)
+                 .batch_size(batch_size))
+        return self._iter_logs(found, filters, limit, cursor, fields, batch_size)
+
+    async def _iter_logs(self, found, filters: Optional[Dict], limit: Optional[int],
+                         cursor: Optional[str], fields: Optional[List[str]],
+                         batch_size: int) -> AsyncIterator[Dict]:
+        sent = 0
+        last = None
+        async for log in found:
+            if self.logs_timeseries:
+                log = from_timeseries(log)
+            sent += 1
+            last = log
+            yield log
+
+        if (limit and sent >= limit) or not self.archive.reaches(filters, cursor):
+            return
+
+        # Continua no arquivo Parquet (logs mais antigos), lido fora do event loop
+        before = resume_point(last, cursor)
+        batches = self.archive.iter_batches(filters, before, fields, batch_size)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                return
+            for log in batch:
+                if limit and sent >= limit:
+                    return
+                sent += 1
+                yield log
+
+    async def search(self, collection_name: str, text: str,
+                     filters: Optional[Dict] = None,
+                     limit: int = 50,
+                     cursor: Optional[str] = None,
+                     sort: str = SORT_RELEVANCE) -> Dict[str, Any]:
+        """Busca textual em alertas ou logs (índices de texto, ver search.py)
+
+        Retorna {'results', 'next_cursor'}; cada resultado traz `score`
+        (relevância) exceto em logs time-series. ValueError para ordenação
+        ou cursor inválidos.
+        """
+        query, projection, order, skip, timeseries = search_plan(
+            collection_name, text, filters, cursor, sort, self.logs_timeseries
+        )
+
+        try:
+            collection = self.get_collection(collection_name)
+
+            found = collection.find(query, projection).sort(order).skip(skip).limit(limit)
+            docs = await found.to_list(None)
+            return search_page(docs, collection_name, limit, skip, order, timeseries)
+        except Exception as e:
+            logger.error(f"✗ Erro na busca em {collection_name}: {e}")
+            return {'results': [], 'next_cursor': None}
+
+    async def get_log_histogram(self, start: datetime, end: datetime,
+                                bucket: Optional[str] = None,
+                                filters: Optional[Dict] = None) -> Dict[str, Any]:
+        """Contagens de logs por intervalo, nível e origem (ver histogram.py)
+
+        bucket: largura dos intervalos ('5m', '1h'...; None escolhe pelo
+        período). ValueError para largura ou período inválidos.
+        """
+        bucket, bin_size, unit, query, pipeline = histogram_plan(
+            start, end, bucket, filters, self.logs_timeseries
+        )
+
+        try:
+            collection = self.get_collection('logs')
+
+            cursor = await collection.aggregate(pipeline)
+            rows = await cursor.to_list(None)
+            if self.archive.covers(start):
+                rows += await asyncio.to_thread(
+                    self.archive.histogram_rows, query, bin_size, unit
+                )
+
+            return build_histogram(rows, start, end, bucket)
+        except Exception as e:
+            logger.error(f"✗ Erro ao calcular histograma de logs: {e}")
+            return empty_histogram(start, end, bucket)
+
+    # ========== SÉRIE DE ALERTAS ==========
+
+    async def get_alert_series(self, granularity: str = 'day', start: Optional[datetime] = None,
+                               end: Optional[datetime] = None) -> Dict[str, Any]:
+        """Alertas criados por intervalo, severidade e tipo (ver series.py)
+
+        Intervalos encerrados são lidos de alert_series (selados na primeira
+        leitura); apenas os abertos são agregados. ValueError para
+        granularidade ou período inválidos.
+        """
+        buckets, boundary = series_plan(granularity, start, end)
+
+        try:
+            alerts = self.get_collection('alerts')
+            series = self.get_collection(SERIES_COLLECTION)
+
+            cursor = series.find(sealed_query(granularity, buckets, boundary))
+            sealed = {doc['t']: doc for doc in await cursor.to_list(None)}
+            missing, open_buckets = split_buckets(buckets, sealed, boundary)
+
+            # Encerrados ainda não selados: uma agregação e gravação única
+            if missing:
+                cursor = await alerts.aggregate(buckets_pipeline(granularity, missing))
+                counts = bucket_counts(await cursor.to_list(None))
+                try:
+                    await series.bulk_write(seal_operations(granularity, missing, counts),
+                                            ordered=False)
+                except Exception as e:
+                    logger.error(f"✗ Erro ao selar intervalos da série de alertas: {e}")
+                sealed.update({bucket: counts.get(bucket, {}) for bucket in missing})
+
+            live = {}
+            if open_buckets:
+                cursor = await alerts.aggregate(buckets_pipeline(granularity, open_buckets))
+                live = bucket_counts(await cursor.to_list(None))
+
+            return build_series(granularity, buckets, sealed, live)
+        except Exception as e:
+            logger.error(f"✗ Erro ao calcular série de alertas: {e}")
+            return build_series(granularity, buckets, {}, {})
+
+    # ========== STATS ==========
+
+    async def get_alert_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas dos alertas (rollups, ou agregação única como fallback)"""
+        try:
+            if self.stats_rollups:
+                cursor = self.get_collection(ROLLUP_COLLECTION).find(
+                    {'_id': {'$in': rollup_ids_for_stats()}}
+                )
+                stats = stats_from_rollups(await cursor.to_list(None))
+                if stats is not None:
+                    return stats
+
+            collection = self.get_collection('alerts')
+            cursor = await collection.aggregate(alert_stats_pipeline())
+            result = await cursor.to_list(None)
+
+            return stats_from_facet(result[0] if result else {})
+        except Exception as e:
+            logger.error(f"✗ Erro ao calcular estatísticas: {e}")
+            return empty_stats()
+
+    # ========== ETAGS ==========
+
+    async def etag(self, collections: List[str], params: Dict[str, Any]) -> Optional[str]:
+        """ETag de uma consulta: estado das collections no banco e parâmetros
+
+        O estado só é relido quando a versão local mudou ou a janela expirou
+        (ver ChangeVersions.cached_state); None se desativado ou sem banco.
+        """
+        if not self.versions.enabled:
+            return None
+
+        states, stale = self.versions.states(collections)
+        try:
+            for name, version in stale.items():
+                states[name] = await self._read_state(name)
+                self.versions.store_state(name, version, states[name])
+        except Exception as e:
+            logger.error(f"✗ Erro ao ler o estado para a ETag: {e}")
+            return None
+        return self.versions.etag(states, params)
+
+    async def _read_state(self, name: str) -> str:
+        """Documentos mais recente e mais antigo pelo campo de STATE_FIELDS (e contagem)"""
+        field = STATE_FIELDS[name]
+        collection = self.get_collection(name)
+
+        newest = await collection.find_one({}, {field: 1},
+                                           sort=[(field, DESCENDING), ('_id', DESCENDING)])
+        oldest = await collection.find_one({}, {field: 1},
+                                           sort=[(field, ASCENDING), ('_id', ASCENDING)])
+        count = (await collection.estimated_document_count()
+                 if name in COUNTED_STATES else None)
+        return state_token(newest, oldest, count)
+
+
+# Singleton instance
+async_db_manager = AsyncDatabaseManager()
@@ -0,0 +1,37 @@
+"""
+Backends de Armazenamento
+Seleção do client usado pelos gerenciadores de banco (DB_BACKEND):
+  - mongodb (padrão): MongoClient/AsyncMongoClient com pool e instrumentação
+  - memory: backend em processo (memory_backend), para testes e benchmarks
+"""
+
+import os
+from typing import Dict, Any
+
+from pymongo import AsyncMongoClient, MongoClient
+
+from memory_backend import AsyncMemoryClient, MemoryClient
+
+BACKENDS = ('mongodb', 'memory')
+
+
+def backend_name() -> str:
+    """Backend configurado em DB_BACKEND"""
+    name = os.getenv('DB_BACKEND', 'mongodb').lower()
+    if name not in BACKENDS:
+        raise ValueError(f"DB_BACKEND inválido: {name} (use {', '.join(BACKENDS)})")
+    return name
+
+
+def create_client(connection_string: str, event_listeners: list, pool: Dict[str, Any]):
+    """Client síncrono do backend configurado"""
+    if backend_name() == 'memory':
+        return MemoryClient()
+    return MongoClient(connection_string, event_listeners=event_listeners, **pool)
+
+
+def create_async_client(connection_string: str, event_listeners: list, pool: Dict[str, Any]):
+    """Client assíncrono do backend configurado"""
+    if backend_name() == 'memory':
+        return AsyncMemoryClient()
+    return AsyncMongoClient(connection_string, event_listeners=event_listeners, **pool)
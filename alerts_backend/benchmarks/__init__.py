@@ -0,0 +1,94 @@
+"""
+Benchmarks do Backend
+Executar a partir de alerts_backend/: python -m benchmarks.<nome>
+"""
+
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Any, Sequence
+
+from database import DatabaseManager
+
+SEVERITIES = ['critical', 'high', 'medium', 'low']
+STATUSES = ['open', 'in_progress', 'resolved']
+ALERT_TYPES = ['backup_failed', 'stock_zero', 'nfe_error',
+               'db_connection_error', 'high_error_rate', 'disk_space_low']
+LEVELS = ['INFO', 'WARNING', 'ERROR', 'DEBUG', 'CRITICAL']
+ORIGINS = ['BackupAnalyzer', 'StockAnalyzer', 'NFeAnalyzer', 'DatabaseAnalyzer',
+           'ErrorRateAnalyzer', 'DiskSpaceAnalyzer', 'API', 'NotificationManager']
+
+
+def bench_db_manager() -> DatabaseManager:
+    """DatabaseManager apontando para um banco descartável de benchmark"""
+    manager = DatabaseManager()
+    manager.database_name = os.getenv('BENCH_DB_NAME', 'alerts_system_bench')
+    manager.buffered_logs = False
+    if not manager.connect():
+        raise SystemExit("✗ MongoDB indisponível para benchmark")
+    return manager
+
+
+def fake_alerts(count: int, days: int = 30) -> List[Dict[str, Any]]:
+    """Gera alertas sintéticos espalhados pelos últimos `days` dias"""
+    now = datetime.now()
+    alerts = []
+
+    for i in range(count):
+        created_at = now - timedelta(seconds=random.uniform(0, days * 86400))
+        status = random.choices(STATUSES, weights=[30, 10, 60], k=1)[0]
+        alert = {
+            'client_id': f"CLI{random.randint(1, 5000):05d}",
+            'client_name': f"Cliente {i}",
+            'alert_type': random.choice(ALERT_TYPES),
+            'severity': random.choice(SEVERITIES),
+            'title': f"Alerta sintético #{i}",
+            'description': "Alerta gerado para benchmark",
+            'status': status,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'metadata': {'seq': i},
+        }
+        if status == 'resolved':
+            alert['resolved_at'] = created_at + timedelta(minutes=random.uniform(5, 600))
+            alert['resolved_by'] = 'bench'
+        alerts.append(alert)
+
+    return alerts
+
+
+def fake_logs(count: int, days: int = 1) -> List[Dict[str, Any]]:
+    """Gera logs sintéticos espalhados pelos últimos `days` dias"""
+    now = datetime.now()
+    return [
+        {
+            'level': random.choices(LEVELS, weights=[40, 30, 20, 8, 2], k=1)[0],
+            'origin': random.choice(ORIGINS),
+            'message': f"Evento sintético {i} processado em {random.randint(1, 900)}ms",
+            'timestamp': now - timedelta(seconds=random.uniform(0, days * 86400)),
+            'metadata': {'seq': i},
+        }
+        for i in range(count)
+    ]
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5) -> float:
+    """Executa `fn` `repeat` vezes e retorna a mediana em milissegundos"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def print_table(headers: Sequence[str], rows: List[Sequence[Any]]):
+    """Imprime uma tabela simples alinhada"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) if rows else len(str(h))
+              for i, h in enumerate(headers)]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(v).rjust(w) for v, w in zip(row, widths)))
@@ -0,0 +1,75 @@
+"""
+Benchmark de ingestão de logs por nível de write concern
+
+Mede a vazão (logs/s) de insert_one sequencial e de insert_many em lotes com
+cada nível de write_concerns.py. A diferença entre fast e durable cresce com
+a latência de replicação do replica set; em um servidor standalone ela
+reflete apenas a espera pelo journal.
+
+Uso: python -m benchmarks.ingest [quantidade] [tamanho do lote]
+"""
+
+import sys
+import time
+
+from benchmarks import bench_db_manager, fake_logs, print_table
+from write_concerns import TIERS, write_concern
+
+BENCH_COLLECTION = 'logs_ingest_bench'
+DEFAULT_COUNT = 5_000
+DEFAULT_BATCH = 500
+
+
+def _rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:,.0f}" if seconds > 0 else "-"
+
+
+def main(count: int, batch_size: int):
+    manager = bench_db_manager()
+    base = manager.db[BENCH_COLLECTION]
+    rows = []
+
+    try:
+        for tier in TIERS:
+            concern = write_concern(tier)
+            collection = base.with_options(write_concern=concern) if concern else base
+
+            base.drop()
+            logs = fake_logs(count)
+            start = time.perf_counter()
+            for log in logs:
+                collection.insert_one(log)
+            single = time.perf_counter() - start
+
+            base.drop()
+            logs = fake_logs(count)
+            start = time.perf_counter()
+            for offset in range(0, count, batch_size):
+                collection.insert_many(logs[offset:offset + batch_size], ordered=False)
+            batched = time.perf_counter() - start
+
+            # w=0 não espera o servidor: conta o que realmente foi gravado
+            stored = base.count_documents({})
+
+            rows.append([
+                tier,
+                _rate(count, single),
+                f"{single / count * 1000:.3f}",
+                _rate(count, batched),
+                f"{stored:,}",
+            ])
+    finally:
+        base.drop()
+        manager.close()
+
+    print(f"\n📊 Ingestão de {count:,} logs por nível de write concern "
+          f"(lotes de {batch_size})\n")
+    print_table(
+        ['nível', 'insert_one (logs/s)', 'ms/log', 'insert_many (logs/s)', 'gravados'],
+        rows
+    )
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else DEFAULT_COUNT, args[1] if len(args) > 1 else DEFAULT_BATCH)
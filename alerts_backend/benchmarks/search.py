@@ -0,0 +1,112 @@
+"""
+Benchmark da busca textual (/search) em logs
+
+Carrega logs com mensagens variadas em volumes crescentes e mede
+DatabaseManager.search (índice de texto) por relevância, por data e com
+filtros, contra a mesma busca por expressão regular (sem índice).
+
+Uso: python -m benchmarks.search [tamanhos...]
+"""
+
+import random
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks import ORIGINS, bench_db_manager, fake_logs, measure, print_table
+from indexes import IndexManager
+from search import SORT_RECENT, regex_search, search_filters
+
+DEFAULT_SIZES = [100_000, 1_000_000, 3_000_000]
+BATCH = 10_000
+
+MESSAGES = [
+    "Backup do cliente {client} falhou após {n} tentativas",
+    "Timeout de conexão com o banco de dados do cliente {client}",
+    "Estoque zerado para o produto {n} do cliente {client}",
+    "NF-e {n} rejeitada pela SEFAZ: certificado expirado",
+    "Espaço em disco abaixo de {n}% no servidor do cliente {client}",
+    "Taxa de erros acima do limite: {n} erros por minuto",
+    "Notificação enviada por e-mail para {client}",
+    "Análise concluída em {n}ms sem ocorrências",
+    "Falha ao enviar mensagem de WhatsApp para {client}",
+    "Conexão restabelecida com o banco de dados após {n}s",
+]
+
+QUERIES = [
+    ('termo comum', 'banco dados', {}),
+    ('termo raro', 'certificado expirado', {}),
+    ('cliente', 'CLI00042', {}),
+    ('frase', '"backup do cliente"', {}),
+    ('termo + nível', 'timeout', {'level': 'ERROR'}),
+    ('termo + período', 'falha', {'start': 'hour'}),
+]
+
+
+def search_logs(count: int):
+    """Logs de fake_logs com mensagens de MESSAGES"""
+    logs = fake_logs(count)
+    for log in logs:
+        log['message'] = random.choice(MESSAGES).format(
+            client=f"CLI{random.randint(1, 5000):05d}", n=random.randint(1, 900)
+        )
+    return logs
+
+
+def main(sizes):
+    manager = bench_db_manager()
+    collection = manager.get_collection('logs')
+    rows = []
+
+    try:
+        loaded = 0
+        collection.drop()
+        IndexManager(manager.db).ensure_indexes()
+
+        for size in sorted(sizes):
+            missing = size - loaded
+            for start in range(0, missing, BATCH):
+                collection.insert_many(search_logs(min(BATCH, missing - start)), ordered=False)
+            loaded = size
+
+            last_hour = datetime.now() - timedelta(hours=1)
+            for label, text, options in QUERIES:
+                start = last_hour if options.get('start') else None
+                filters = search_filters('logs', level=options.get('level'), start=start)
+
+                relevance_ms = measure(lambda: manager.search('logs', text, filters, 20))
+                recent_ms = measure(lambda: manager.search('logs', text, filters, 20,
+                                                           sort=SORT_RECENT))
+                first = manager.search('logs', text, filters, 20)
+                second_ms = measure(lambda: manager.search('logs', text, filters, 20,
+                                                           first['next_cursor']))
+
+                # Referência sem índice: regex sobre message (apenas 1 execução)
+                regex_query = {**filters, 'message': regex_search(text)}
+                regex_ms = measure(
+                    lambda: list(collection.find(regex_query).sort('timestamp', -1).limit(20)),
+                    repeat=1
+                )
+
+                rows.append([
+                    f"{size:,}",
+                    label,
+                    f"{relevance_ms:.1f}",
+                    f"{second_ms:.1f}",
+                    f"{recent_ms:.1f}",
+                    f"{regex_ms:.1f}",
+                    len(first['results']),
+                ])
+    finally:
+        collection.drop()
+        manager.close()
+
+    print(f"\n📊 /search em logs (20 por página, {len(ORIGINS)} origens)\n")
+    print_table(
+        ['logs', 'consulta', 'relevância (ms)', '2ª página (ms)', 'recentes (ms)',
+         'regex (ms)', 'resultados'],
+        rows
+    )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
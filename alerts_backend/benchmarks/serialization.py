@@ -0,0 +1,80 @@
+"""
+Benchmark da serialização das listagens (/alerts, /logs): stringify_ids +
+jsonable_encoder + JSONResponse (anterior) vs. serialization.dumps com json
+padrão vs. com orjson
+
+Não usa o banco: documentos sintéticos com _id ObjectId e datas como lidos
+do MongoDB. Resultado em milissegundos por 1000 documentos.
+
+Uso: python -m benchmarks.serialization [tamanhos...]
+"""
+
+import sys
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks import fake_alerts, fake_logs, measure, print_table
+import serialization
+from serialization import FastJSONResponse, _stdlib_dumps
+
+DEFAULT_SIZES = [100, 1_000, 10_000]
+
+
+def legacy_render(key, documents):
+    """Caminho anterior: _id convertido por documento no DatabaseManager e
+    jsonable_encoder do FastAPI antes do JSONResponse"""
+    documents = [{**doc, '_id': str(doc['_id'])} for doc in documents]
+    content = {'success': True, key: documents, 'total': len(documents), 'next_cursor': None}
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def stdlib_render(key, documents):
+    content = {'success': True, key: documents, 'total': len(documents), 'next_cursor': None}
+    return _stdlib_dumps(content)
+
+
+def fast_render(key, documents):
+    content = {'success': True, key: documents, 'total': len(documents), 'next_cursor': None}
+    return FastJSONResponse(content).body
+
+
+def per_thousand(ms: float, size: int) -> str:
+    return f"{ms * 1000 / size:.2f}"
+
+
+def main(sizes):
+    if serialization.orjson is None:
+        print("⚠ orjson não instalado: a coluna orjson repete o json padrão")
+
+    rows = []
+    for key, generate in (('alerts', fake_alerts), ('logs', fake_logs)):
+        for size in sizes:
+            documents = generate(size)
+            for doc in documents:
+                doc['_id'] = ObjectId()
+
+            legacy_ms = measure(lambda: legacy_render(key, documents))
+            stdlib_ms = measure(lambda: stdlib_render(key, documents))
+            fast_ms = measure(lambda: fast_render(key, documents))
+
+            rows.append([
+                key,
+                f"{size:,}",
+                per_thousand(legacy_ms, size),
+                per_thousand(stdlib_ms, size),
+                per_thousand(fast_ms, size),
+                f"{legacy_ms / fast_ms:.1f}x",
+                'sim' if legacy_render(key, documents) == fast_render(key, documents) else 'NÃO',
+            ])
+
+    print("\n📊 Serialização das listagens - ms por 1000 documentos (mediana)\n")
+    print_table(
+        ['lista', 'docs', 'anterior', 'json padrão', 'orjson', 'ganho', 'mesmo JSON'],
+        rows
+    )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,100 @@
+"""
+Benchmark de get_alert_stats: contagens separadas vs. agregação única ($facet)
+vs. leitura dos rollups incrementais
+
+Uso: python -m benchmarks.stats [tamanhos...]
+"""
+
+import sys
+from datetime import datetime, date
+
+from benchmarks import bench_db_manager, fake_alerts, measure, print_table
+from indexes import IndexManager
+from queries import format_duration
+from rollups import ROLLUP_COLLECTION, rebuild_rollups
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 500_000]
+
+
+def legacy_stats(collection):
+    """Implementação anterior: 5 count_documents + find de 100 resolvidos"""
+    open_count = collection.count_documents({'status': 'open'})
+    in_progress = collection.count_documents({'status': 'in_progress'})
+    today_start = datetime.combine(date.today(), datetime.min.time())
+    resolved_today = collection.count_documents({
+        'status': 'resolved',
+        'resolved_at': {'$gte': today_start}
+    })
+    resolved_alerts = list(collection.find({
+        'status': 'resolved',
+        'resolved_at': {'$exists': True}
+    }).limit(100))
+
+    avg_time = "N/A"
+    if resolved_alerts:
+        total_minutes = sum(
+            (a['resolved_at'] - a['created_at']).total_seconds() / 60
+            for a in resolved_alerts
+        )
+        avg_time = format_duration(int(total_minutes / len(resolved_alerts)))
+
+    return {
+        'openAlerts': open_count,
+        'inProgress': in_progress,
+        'resolvedToday': resolved_today,
+        'avgResponseTime': avg_time,
+        'total': collection.count_documents({})
+    }
+
+
+def main(sizes):
+    manager = bench_db_manager()
+    collection = manager.get_collection('alerts')
+    rows = []
+
+    try:
+        loaded = 0
+        collection.drop()
+        IndexManager(manager.db).ensure_indexes()
+
+        for size in sorted(sizes):
+            # Carga incremental até o tamanho desejado
+            missing = size - loaded
+            for start in range(0, missing, 10_000):
+                collection.insert_many(fake_alerts(min(10_000, missing - start)),
+                                       ordered=False)
+            loaded = size
+
+            legacy_ms = measure(lambda: legacy_stats(collection))
+
+            manager.stats_rollups = False
+            facet_ms = measure(manager.get_alert_stats)
+            stats = manager.get_alert_stats()
+
+            rebuild_rollups(manager.db)
+            manager.stats_rollups = True
+            rollup_ms = measure(manager.get_alert_stats)
+
+            rows.append([
+                f"{size:,}",
+                f"{legacy_ms:.1f}",
+                f"{facet_ms:.1f}",
+                f"{rollup_ms:.1f}",
+                legacy_stats(collection)['avgResponseTime'],
+                stats['avgResponseTime'],
+            ])
+    finally:
+        collection.drop()
+        manager.get_collection(ROLLUP_COLLECTION).drop()
+        manager.close()
+
+    print("\n📊 get_alert_stats - latência mediana (ms) por tamanho da collection\n")
+    print_table(
+        ['alertas', 'legado (ms)', '$facet (ms)', 'rollup (ms)',
+         'média legado', 'média real'],
+        rows
+    )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
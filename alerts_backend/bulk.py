@@ -0,0 +1,155 @@
+"""
+Operações em Lote sobre Alertas
+Atualização, resolução e remoção de vários alertas de uma vez (PUT /alerts/bulk,
+POST /alerts/bulk/resolve, POST /alerts/bulk/delete), por lista de ids ou filtro
+
+Cada operação lê o estado anterior dos alertas em uma consulta (rollups, dedup
+e cache), grava com um único bulk_write (UpdateMany ou DeleteMany) e aplica os
+rollups em uma única gravação; o resultado traz o desfecho de cada id.
+"""
+
+import os
+from typing import Optional, Dict, List, Any, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, UpdateMany
+
+from rollups import ops_for_deletes, ops_for_transitions
+
+BULK_UPDATE = 'update'
+BULK_RESOLVE = 'resolve'
+BULK_DELETE = 'delete'
+
+# Desfechos por id
+UPDATED = 'updated'
+RESOLVED = 'resolved'
+DELETED = 'deleted'
+ALREADY_RESOLVED = 'already_resolved'
+NOT_FOUND = 'not_found'
+INVALID_ID = 'invalid_id'
+FAILED = 'error'
+
+# Desfecho de sucesso de cada operação
+DONE = {BULK_UPDATE: UPDATED, BULK_RESOLVE: RESOLVED, BULK_DELETE: DELETED}
+
+_VERBS = {BULK_UPDATE: 'atualizados', BULK_RESOLVE: 'resolvidos', BULK_DELETE: 'removidos'}
+
+
+def max_alerts() -> int:
+    return int(os.getenv('BULK_MAX_ALERTS', '1000'))
+
+
+def bulk_targets(ids: Optional[List[str]] = None,
+                 filters: Optional[Dict] = None) -> Tuple[Dict, Dict[str, str]]:
+    """Filtro da leitura e desfechos iniciais (na ordem dos ids)
+
+    Exatamente um entre `ids` e `filters` (não vazio). ValueError se nenhum,
+    ambos ou ids acima de BULK_MAX_ALERTS.
+    """
+    if bool(ids) == bool(filters):
+        raise ValueError("Informe a lista de ids ou um filtro (apenas um deles)")
+
+    if filters:
+        return dict(filters), {}
+
+    if len(ids) > max_alerts():
+        raise ValueError(f"Operação em lote limitada a {max_alerts()} alertas")
+
+    outcomes: Dict[str, str] = {}
+    object_ids = []
+    for alert_id in ids:
+        if ObjectId.is_valid(alert_id):
+            outcomes[alert_id] = NOT_FOUND
+            object_ids.append(ObjectId(alert_id))
+        else:
+            outcomes[alert_id] = INVALID_ID
+    return {'_id': {'$in': object_ids}}, outcomes
+
+
+def classify(action: str, befores: List[Dict], outcomes: Dict[str, str]) -> List[Dict]:
+    """Alertas a alterar; os que ficam de fora recebem o desfecho em `outcomes`
+
+    Alertas já resolvidos não são resolvidos de novo (resolved_at mantido).
+    ValueError quando o filtro alcança mais de BULK_MAX_ALERTS alertas.
+    """
+    if len(befores) > max_alerts():
+        raise ValueError(f"O filtro alcança mais de {max_alerts()} alertas; refine-o")
+
+    targets = []
+    for doc in befores:
+        alert_id = str(doc['_id'])
+        if action == BULK_RESOLVE and doc.get('status') == 'resolved':
+            outcomes[alert_id] = ALREADY_RESOLVED
+        else:
+            outcomes[alert_id] = DONE[action]
+            targets.append(doc)
+    return targets
+
+
+def bulk_requests(action: str, target_ids: List[Any],
+                  update_data: Optional[Dict]) -> List[Any]:
+    """Gravação única da operação sobre os alertas classificados"""
+    query = {'_id': {'$in': target_ids}}
+    if action == BULK_DELETE:
+        return [DeleteMany(query)]
+    return [UpdateMany(query, {'$set': update_data})]
+
+
+def changed_count(action: str, result: Any) -> int:
+    """Alertas alcançados pela gravação (BulkWriteResult)"""
+    return result.deleted_count if action == BULK_DELETE else result.matched_count
+
+
+def bulk_rollup_ops(action: str, targets: List[Dict], update_data: Optional[Dict]) -> List:
+    """Operações de rollup da operação em lote (estado anterior em `targets`)"""
+    if action == BULK_DELETE:
+        return ops_for_deletes(targets)
+    return ops_for_transitions(targets, update_data)
+
+
+def fail(outcomes: Dict[str, str], alert_ids: Optional[List[Any]] = None) -> Dict[str, str]:
+    """Marca como erro os ids informados (None = todos ainda pendentes/alterados)"""
+    if alert_ids is None:
+        pending = (NOT_FOUND,) + tuple(DONE.values())
+        alert_ids = [alert_id for alert_id, outcome in outcomes.items() if outcome in pending]
+    for alert_id in alert_ids:
+        outcomes[str(alert_id)] = FAILED
+    return outcomes
+
+
+def bulk_result(action: str, outcomes: Dict[str, str]) -> Dict[str, Any]:
+    """Resposta da API: desfecho por id e contagem por desfecho"""
+    counts: Dict[str, int] = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return {
+        'action': action,
+        'total': len(outcomes),
+        'succeeded': counts.get(DONE[action], 0),
+        'counts': counts,
+        'results': outcomes,
+    }
+
+
+def bulk_log(result: Dict[str, Any], actor: Optional[str] = None) -> Dict:
+    """Entrada única de log que resume a operação"""
+    action = result['action']
+    done = DONE[action]
+    message = f"Operação em lote: {result['succeeded']} alertas {_VERBS[action]}"
+    if actor:
+        message += f" por {actor}"
+    others = {outcome: count for outcome, count in result['counts'].items() if outcome != done}
+    if others:
+        message += ' (' + ', '.join(f"{outcome}: {count}" for outcome, count in others.items()) + ')'
+
+    return {
+        'origin': 'API',
+        'level': 'WARNING' if FAILED in others else 'INFO',
+        'message': message,
+        'metadata': {
+            'action': action,
+            'counts': result['counts'],
+            'alert_ids': [alert_id for alert_id, outcome in result['results'].items()
+                          if outcome == done],
+        },
+    }
@@ -0,0 +1,233 @@
+"""
+Feed de Alterações
+Acompanha as alterações de uma collection via change streams para manter
+caches de outros processos coerentes (vários workers da API no mesmo banco)
+
+Change streams exigem replica set ou cluster shardeado; em um servidor
+standalone (ou DB_BACKEND=memory) o feed fica indisponível e os caches
+dependem apenas do TTL. Um feed pode acompanhar uma collection ou várias
+collections do banco (`collections`, eventos com `ns`) e, com
+`full_document`, trazer o documento em cada evento (entrega em tempo real). Se o stream cair, os assinantes de reset são
+avisados (eventos podem ter sido perdidos) e o stream é reaberto a partir do
+último resume token.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Callable, Dict, List, Any, Optional
+import logging
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Erros do servidor que indicam que change streams não são suportados
+# (40573: não é replica set; 115/303: comando/estágio não suportado)
+UNSUPPORTED_CODES = {40573, 115, 303}
+
+# Resume token que o servidor não consegue mais retomar (oplog rotacionado)
+CHANGE_STREAM_HISTORY_LOST = 286
+
+DEFAULT_OPERATIONS = ('insert', 'update', 'replace', 'delete')
+
+
+def change_feed_enabled(default: bool) -> bool:
+    """CHANGE_FEED_ENABLED sobrescreve o padrão do gerenciador"""
+    value = os.getenv('CHANGE_FEED_ENABLED')
+    return default if value is None else value != '0'
+
+
+def feed_pipeline(operations=DEFAULT_OPERATIONS,
+                  collections: Optional[List[str]] = None,
+                  full_document: bool = False) -> List[Dict]:
+    """Filtra as operações e reduz cada evento ao id do documento
+
+    _id (resume token) é mantido pela projeção de inclusão. Com `collections`
+    (feed do banco), filtra as collections e mantém `ns` no evento; com
+    `full_document`, mantém o documento.
+    """
+    match: Dict[str, Any] = {'operationType': {'$in': list(operations)}}
+    project = {'operationType': 1, 'documentKey': 1, 'clusterTime': 1}
+    if collections:
+        match['ns.coll'] = {'$in': list(collections)}
+        project['ns'] = 1
+    if full_document:
+        project['fullDocument'] = 1
+    return [{'$match': match}, {'$project': project}]
+
+
+class _ChangeFeedBase:
+    """Assinantes, resume token e estatísticas comuns aos feeds"""
+
+    def __init__(self, operations=DEFAULT_OPERATIONS, retry_interval: float = 5.0,
+                 collections: Optional[List[str]] = None,
+                 full_document: Optional[str] = None):
+        self.operations = operations
+        self.collections = collections
+        # Opção fullDocument do change stream (ex.: 'updateLookup')
+        self.full_document = full_document
+        self.retry_interval = retry_interval
+        self.resume_token: Optional[Dict] = None
+        self.available = False
+        self.unsupported = False
+        self._listeners: List[Callable[[Dict], Any]] = []
+        self._reset_listeners: List[Callable[[], Any]] = []
+        self.stats = {
+            'events': 0,
+            'restarts': 0,
+            'errors': 0,
+        }
+
+    def subscribe(self, on_change: Callable[[Dict], Any],
+                  on_reset: Optional[Callable[[], Any]] = None):
+        """Registra callbacks: on_change(evento) e on_reset() após perda de eventos"""
+        self._listeners.append(on_change)
+        if on_reset is not None:
+            self._reset_listeners.append(on_reset)
+
+    def _dispatch(self, change: Dict):
+        self.resume_token = change.get('_id')
+        self.stats['events'] += 1
+        for listener in self._listeners:
+            try:
+                listener(change)
+            except Exception as e:
+                logger.error(f"✗ Erro em assinante do feed de alterações: {e}")
+
+    def _reset(self):
+        for listener in self._reset_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"✗ Erro em assinante do feed de alterações: {e}")
+
+    def _on_error(self, error: Exception) -> bool:
+        """Trata uma falha do stream; retorna False se o feed deve parar"""
+        self.available = False
+        self._reset()
+
+        if isinstance(error, OperationFailure) and error.code in UNSUPPORTED_CODES:
+            self.unsupported = True
+            logger.warning("⚠ Change streams indisponíveis (requer replica set); "
+                           "caches dependem do TTL")
+            return False
+        if isinstance(error, OperationFailure) and error.code == CHANGE_STREAM_HISTORY_LOST:
+            self.resume_token = None
+
+        self.stats['errors'] += 1
+        logger.warning(f"⚠ Feed de alterações interrompido: {error}; "
+                       f"reabrindo em {self.retry_interval}s")
+        return True
+
+    def _pipeline(self) -> List[Dict]:
+        return feed_pipeline(self.operations, self.collections, self.full_document is not None)
+
+    def status(self) -> Dict[str, Any]:
+        """Estado do feed para /metrics"""
+        return {
+            'available': self.available,
+            'unsupported': self.unsupported,
+            **self.stats,
+        }
+
+
+class ChangeFeed(_ChangeFeedBase):
+    """Feed lido por uma thread (client síncrono)
+
+    `collection` pode ser uma collection ou o banco (com `collections`).
+    """
+
+    def __init__(self, collection, **options):
+        super().__init__(**options)
+        self.collection = collection
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Inicia a thread do feed"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ChangeFeed', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Encerra a thread do feed"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.available = False
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self.collection.watch(self._pipeline(),
+                                           resume_after=self.resume_token,
+                                           full_document=self.full_document,
+                                           max_await_time_ms=1000) as stream:
+                    self.available = True
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is not None:
+                            self._dispatch(change)
+            except PyMongoError as e:
+                if not self._on_error(e):
+                    return
+                self.stats['restarts'] += 1
+                self._stop.wait(self.retry_interval)
+            except Exception as e:
+                logger.error(f"✗ Erro no feed de alterações: {e}")
+                self._on_error(e)
+                self._stop.wait(self.retry_interval)
+
+
+class AsyncChangeFeed(_ChangeFeedBase):
+    """Feed lido por uma task asyncio (client assíncrono), como ChangeFeed"""
+
+    def __init__(self, collection, **options):
+        super().__init__(**options)
+        self.collection = collection
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Inicia a task do feed (deve ser chamado dentro do event loop)"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancela a task do feed"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.available = False
+
+    async def _run(self):
+        while True:
+            try:
+                stream = await self.collection.watch(self._pipeline(),
+                                                     resume_after=self.resume_token,
+                                                     full_document=self.full_document)
+                async with stream:
+                    self.available = True
+                    async for change in stream:
+                        self._dispatch(change)
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                if not self._on_error(e):
+                    return
+                self.stats['restarts'] += 1
+                await asyncio.sleep(self.retry_interval)
+            except Exception as e:
+                logger.error(f"✗ Erro no feed de alterações: {e}")
+                self._on_error(e)
+                await asyncio.sleep(self.retry_interval)
@@ -0,0 +1,390 @@
+"""
+Deduplicação de Alertas
+Verificação em lote de alertas ativos por (client_id, alert_type, janela),
+com cache TTL em memória compartilhado pelos gerenciadores síncrono e assíncrono,
+e upsert atômico por fingerprint
+"""
+
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Iterable, Iterator, Set, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from queries import OPEN_STATUSES, alert_fingerprint
+
+# (client_id, alert_type, janela em horas)
+DedupKey = Tuple[str, str, int]
+
+# Campos lidos de um alerta alterado/removido para invalidar o cache
+DEDUP_FIELDS = {'client_id': 1, 'alert_type': 1}
+
+# Campos mantidos pelo upsert (não copiados da entrada)
+_UPSERT_MANAGED = {'_id', 'created_at', 'updated_at', 'last_seen', 'occurrences'}
+
+DUPLICATE_KEY_ERROR = 11000
+
+# find_one_and_update do upsert; occurrences == 1 no retorno indica alerta criado
+UPSERT_OPTIONS = {
+    'projection': {'occurrences': 1},
+    'upsert': True,
+    'return_document': ReturnDocument.AFTER,
+}
+
+
+def upsert_operation(alert_data: Dict, now: datetime) -> Tuple[Dict, Dict]:
+    """Filtro e update do upsert de um alerta
+
+    Casa o alerta ativo (open/in_progress) com o mesmo fingerprint: se existir,
+    incrementa occurrences e atualiza last_seen; caso contrário, cria o alerta.
+    """
+    fingerprint = alert_fingerprint(alert_data)
+    on_insert = {key: value for key, value in alert_data.items()
+                 if key not in _UPSERT_MANAGED}
+    on_insert.update({
+        'status': alert_data.get('status', 'open'),
+        'fingerprint': fingerprint,
+        'created_at': now
+    })
+
+    query = {'fingerprint': fingerprint, 'status': {'$in': OPEN_STATUSES}}
+    update = {
+        '$setOnInsert': on_insert,
+        '$set': {'updated_at': now, 'last_seen': now},
+        '$inc': {'occurrences': 1}
+    }
+    return query, update
+
+
+def upserted_alert(update: Dict) -> Dict:
+    """Documento criado por um upsert (usado nos rollups e no cache)"""
+    return {**update['$setOnInsert'], **update['$set'], 'occurrences': 1}
+
+
+def upsert_result(doc: Dict) -> Dict[str, Any]:
+    """Retorno de upsert_alert a partir do documento devolvido pelo upsert"""
+    return {'_id': str(doc['_id']), 'created': doc['occurrences'] == 1,
+            'occurrences': doc['occurrences']}
+
+
+def upsert_outcome(details: Dict, positions: List[int]) -> Tuple[Dict[int, Any], List[int], List[Dict[str, Any]]]:
+    """Interpreta o resultado (bulk_api_result ou BulkWriteError.details) de um
+    bulk_write de upserts
+
+    positions: posição na entrada de cada operação enviada. Retorna os ids
+    criados por posição, as posições a repetir (chave duplicada por corrida
+    com outro processo) e os demais erros ({'index', 'code', 'message'}).
+    """
+    created = {positions[item['index']]: item['_id'] for item in details.get('upserted', [])}
+    retry: List[int] = []
+    errors: List[Dict[str, Any]] = []
+
+    for write_error in details.get('writeErrors', []):
+        position = positions[write_error['index']]
+        if write_error.get('code') == DUPLICATE_KEY_ERROR:
+            retry.append(position)
+        else:
+            errors.append({
+                'index': position,
+                'code': write_error.get('code'),
+                'message': write_error.get('errmsg', '')
+            })
+
+    return created, retry, errors
+
+
+class UpsertBatch:
+    """Upsert em lote: blocos de bulk_write, nova tentativa apenas para corridas
+    de chave duplicada e o resultado por alerta
+
+    O gerenciador executa cada lista de operações de attempts() e informa o
+    desfecho com record() (bulk_api_result ou BulkWriteError.details) ou
+    failed() (erro sem detalhes por operação).
+    """
+
+    def __init__(self, alerts: List[Dict], now: datetime, chunk_size: int):
+        self.alerts = alerts
+        self.chunk_size = chunk_size
+        self.operations = [upsert_operation(alert_data, now) for alert_data in alerts]
+        self.created: Dict[int, Any] = {}
+        self.errors: List[Dict[str, Any]] = []
+        # Posições na entrada das operações da tentativa em andamento
+        self._positions: List[int] = []
+
+    def attempts(self) -> Iterator[List[UpdateOne]]:
+        for start in range(0, len(self.operations), self.chunk_size):
+            self._positions = list(range(start, min(start + self.chunk_size,
+                                                    len(self.operations))))
+
+            # Segunda tentativa apenas para corridas de chave duplicada
+            for _ in range(2):
+                yield [UpdateOne(*self.operations[p], upsert=True) for p in self._positions]
+                if not self._positions:
+                    break
+
+            self.errors.extend({'index': p, 'code': DUPLICATE_KEY_ERROR,
+                                'message': 'chave duplicada após nova tentativa'}
+                               for p in self._positions)
+
+    def record(self, details: Dict):
+        created, self._positions, errors = upsert_outcome(details, self._positions)
+        self.created.update(created)
+        self.errors.extend(errors)
+
+    def failed(self, error: Exception):
+        self.errors.extend({'index': p, 'code': None, 'message': str(error)}
+                           for p in self._positions)
+        self._positions = []
+
+    def created_alerts(self) -> List[Dict]:
+        """Documentos criados (rollups e cache de deduplicação)"""
+        return [upserted_alert(self.operations[p][1]) for p in sorted(self.created)]
+
+    def result(self) -> Dict[str, Any]:
+        """'created_ids' na ordem da entrada (None para atualizados ou com
+        falha), os totais e os erros por alerta"""
+        return {
+            'created_ids': [str(self.created[i]) if i in self.created else None
+                            for i in range(len(self.alerts))],
+            'created': len(self.created),
+            'updated': len(self.alerts) - len(self.created) - len(self.errors),
+            'errors': self.errors
+        }
+
+
+def duplicates_pipeline(keys: Iterable[DedupKey], now: datetime) -> List[Dict]:
+    """Agregação única que resolve um lote de chaves
+
+    As chaves são agrupadas por (alert_type, janela) em ramos de um $or com
+    client_id em $in; cada ramo usa o índice dedup_client_type_status_created.
+    Retorna o created_at mais recente de cada (client_id, alert_type) ativo.
+    """
+    groups: Dict[Tuple[str, int], Set[str]] = defaultdict(set)
+    for client_id, alert_type, hours in keys:
+        groups[(alert_type, hours)].add(client_id)
+
+    branches = [
+        {
+            'client_id': {'$in': sorted(client_ids)},
+            'alert_type': alert_type,
+            'status': {'$in': OPEN_STATUSES},
+            'created_at': {'$gte': now - timedelta(hours=hours)}
+        }
+        for (alert_type, hours), client_ids in sorted(groups.items())
+    ]
+
+    return [
+        {'$match': {'$or': branches}},
+        {'$group': {
+            '_id': {'client_id': '$client_id', 'alert_type': '$alert_type'},
+            'latest': {'$max': '$created_at'}
+        }}
+    ]
+
+
+class DedupCache:
+    """Cache TTL de resultados de deduplicação
+
+    Para cada (client_id, alert_type) guarda o created_at do alerta ativo mais
+    recente conhecido (None se nenhum), o instante da consulta e a janela que
+    ela cobriu. Um resultado negativo só é reaproveitado se a consulta original
+    cobriu toda a janela pedida. Alertas inseridos por este processo entram no
+    cache; alterados/removidos são invalidados. Alterações feitas por outros
+    processos são percebidas após no máximo `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 50_000):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], Tuple[Optional[datetime], datetime, int]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> 'DedupCache':
+        """Cria o cache a partir de DEDUP_CACHE_TTL (segundos; 0 desativa)"""
+        return cls(ttl_seconds=float(os.getenv('DEDUP_CACHE_TTL', '60')))
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > timedelta(0)
+
+    def _lookup(self, key: DedupKey, now: datetime) -> Optional[bool]:
+        client_id, alert_type, hours = key
+        entry = self._entries.get((client_id, alert_type))
+        if entry is None:
+            return None
+
+        latest, checked_at, covered_hours = entry
+        if now - checked_at > self.ttl:
+            del self._entries[(client_id, alert_type)]
+            return None
+
+        window_start = now - timedelta(hours=hours)
+        if latest is not None and latest >= window_start:
+            return True
+        if checked_at - timedelta(hours=covered_hours) <= window_start:
+            return False
+        return None
+
+    def resolve(self, keys: Iterable[DedupKey],
+                now: datetime) -> Tuple[Set[DedupKey], List[DedupKey]]:
+        """Separa as chaves em duplicadas (pelo cache) e pendentes de consulta"""
+        duplicates: Set[DedupKey] = set()
+        missing: List[DedupKey] = []
+
+        for key in dict.fromkeys(keys):
+            cached = self._lookup(key, now) if self.enabled else None
+            if cached is None:
+                missing.append(key)
+                self.misses += 1
+            else:
+                self.hits += 1
+                if cached:
+                    duplicates.add(key)
+
+        return duplicates, missing
+
+    def store(self, keys: List[DedupKey], rows: List[Dict],
+              now: datetime) -> Set[DedupKey]:
+        """Registra o resultado de duplicates_pipeline e retorna as duplicadas"""
+        latest = {(row['_id']['client_id'], row['_id']['alert_type']): row['latest']
+                  for row in rows}
+        duplicates = set()
+
+        for key in keys:
+            client_id, alert_type, hours = key
+            found = latest.get((client_id, alert_type))
+            if found is not None and found >= now - timedelta(hours=hours):
+                duplicates.add(key)
+
+        if self.enabled:
+            covered: Dict[Tuple[str, str], int] = defaultdict(int)
+            for client_id, alert_type, hours in keys:
+                covered[(client_id, alert_type)] = max(covered[(client_id, alert_type)], hours)
+            for pair, hours in covered.items():
+                self._entries[pair] = (latest.get(pair), now, hours)
+            self._evict(now)
+
+        return duplicates
+
+    def remember(self, alerts: Iterable[Dict]):
+        """Registra alertas recém-inseridos como ativos"""
+        if not self.enabled:
+            return
+        now = datetime.now()
+
+        for alert in alerts:
+            created_at = alert.get('created_at')
+            if alert.get('status', 'open') not in OPEN_STATUSES \
+                    or not isinstance(created_at, datetime):
+                continue
+
+            pair = (alert.get('client_id'), alert.get('alert_type'))
+            latest, checked_at, covered_hours = self._entries.get(pair, (None, now, 0))
+            if now - checked_at > self.ttl:
+                checked_at, covered_hours = now, 0
+            if latest is None or created_at > latest:
+                latest = created_at
+            self._entries[pair] = (latest, checked_at, covered_hours)
+
+        self._evict(now)
+
+    def forget(self, alert: Optional[Dict]):
+        """Invalida a entrada de um alerta alterado ou removido"""
+        if alert:
+            self._entries.pop((alert.get('client_id'), alert.get('alert_type')), None)
+
+    def _evict(self, now: datetime):
+        if len(self._entries) <= self.max_entries:
+            return
+        for pair, (_, checked_at, _) in list(self._entries.items()):
+            if now - checked_at > self.ttl:
+                del self._entries[pair]
+        if len(self._entries) > self.max_entries:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores do cache"""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# ========== BACKFILL ==========
+
+# Campos lidos para calcular o fingerprint de alertas antigos
+FINGERPRINT_FIELDS = {'client_id': 1, 'alert_type': 1, 'metadata': 1, 'status': 1,
+                      'occurrences': 1}
+
+
+def backfill_fingerprints(db, batch_size: int = 1000) -> Dict[str, int]:
+    """Grava o fingerprint (e occurrences) dos alertas criados antes dele
+    por inserção direta
+
+    Alertas ativos com o mesmo fingerprint não podem coexistir no índice
+    fingerprint_active_unique: só o mais recente (ou o que já tem fingerprint)
+    recebe o campo e os demais são contados em `duplicates`, para serem
+    resolvidos manualmente. Pode ser executado de novo a qualquer momento.
+    """
+    collection = db['alerts']
+    active = {'status': {'$in': OPEN_STATUSES}}
+    taken = {doc['fingerprint'] for doc in collection.find(
+        {**active, 'fingerprint': {'$exists': True}}, {'fingerprint': 1}
+    )}
+    counts = {'updated': 0, 'duplicates': 0}
+    operations: List[UpdateOne] = []
+
+    def flush():
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            counts['updated'] += result.modified_count
+        except BulkWriteError as e:
+            # Upsert concorrente criou o alerta ativo do mesmo fingerprint
+            counts['updated'] += e.details.get('nModified', 0)
+            counts['duplicates'] += len(e.details.get('writeErrors', []))
+        operations.clear()
+
+    missing = collection.find({'fingerprint': {'$exists': False}}, FINGERPRINT_FIELDS) \
+        .sort([('created_at', -1), ('_id', -1)]).batch_size(batch_size)
+    for alert in missing:
+        fingerprint = alert_fingerprint(alert)
+        if alert.get('status', 'open') in OPEN_STATUSES:
+            if fingerprint in taken:
+                counts['duplicates'] += 1
+                continue
+            taken.add(fingerprint)
+        fields = {'fingerprint': fingerprint}
+        if 'occurrences' not in alert:
+            # Sem o campo, o primeiro upsert (occurrences 1) pareceria uma criação
+            fields['occurrences'] = 1
+        operations.append(UpdateOne({'_id': alert['_id'], 'fingerprint': {'$exists': False}},
+                                    {'$set': fields}))
+        if len(operations) >= batch_size:
+            flush()
+
+    if operations:
+        flush()
+    return counts
+
+
+if __name__ == "__main__":
+    from database import db_manager
+
+    if '--backfill' not in sys.argv:
+        print("Uso: python dedup.py --backfill")
+        sys.exit(2)
+
+    if not db_manager.connect():
+        sys.exit(1)
+
+    try:
+        print("🔄 Gravando fingerprint dos alertas existentes...")
+        counts = backfill_fingerprints(db_manager.db)
+        print(f"✅ {counts['updated']} alertas atualizados")
+        if counts['duplicates']:
+            print(f"⚠️  {counts['duplicates']} alertas ativos repetem o problema de um "
+                  f"alerta mais recente e ficaram sem fingerprint (resolva-os)")
+    finally:
+        db_manager.close()
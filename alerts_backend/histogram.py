@@ -0,0 +1,147 @@
+"""
+Histograma de Logs
+Contagens de logs por intervalo de tempo, nível e origem (GET /logs/histogram),
+calculadas em uma única agregação sobre o intervalo do índice
+timestamp_level_origin
+
+A resposta cresce com o número de intervalos (limitado a HISTOGRAM_MAX_BUCKETS),
+não com o número de logs. Intervalos sem logs não aparecem na resposta.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Tuple
+
+from timeseries import META_FIELD, timeseries_query
+
+# Sufixo da largura -> unidade do $dateTrunc
+BUCKET_UNITS = {'s': 'second', 'm': 'minute', 'h': 'hour', 'd': 'day'}
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_BUCKET = re.compile(r'^(\d+)([smhd])$')
+
+# Larguras usadas quando `bucket` não é informado (a menor que respeita o alvo)
+AUTO_BUCKETS = ['1m', '5m', '15m', '30m', '1h', '3h', '6h', '12h', '1d']
+
+UNKNOWN = 'unknown'
+
+
+def max_buckets() -> int:
+    return int(os.getenv('HISTOGRAM_MAX_BUCKETS', '500'))
+
+
+def parse_bucket(bucket: str) -> Tuple[int, str, timedelta]:
+    """'5m' -> (5, 'minute', 5 minutos)
+
+    A largura deve dividir o dia (1m, 5m, 15m, 1h, 6h, 1d...), para que os
+    intervalos comecem sempre nos mesmos horários. ValueError se inválida.
+    """
+    match = _BUCKET.match(bucket or '')
+    if not match:
+        raise ValueError(f"Intervalo inválido: {bucket} (ex.: 30s, 5m, 1h, 1d)")
+    size, suffix = int(match.group(1)), match.group(2)
+    seconds = size * _UNIT_SECONDS[suffix]
+    if size == 0 or seconds > 86400 or 86400 % seconds:
+        raise ValueError(f"Intervalo inválido: {bucket} (deve dividir 24h)")
+    return size, BUCKET_UNITS[suffix], timedelta(seconds=seconds)
+
+
+def choose_bucket(start: datetime, end: datetime) -> str:
+    """Menor largura de AUTO_BUCKETS com até HISTOGRAM_TARGET_BUCKETS intervalos"""
+    target = int(os.getenv('HISTOGRAM_TARGET_BUCKETS', '60'))
+    for bucket in AUTO_BUCKETS:
+        if (end - start) / parse_bucket(bucket)[2] <= target:
+            return bucket
+    return AUTO_BUCKETS[-1]
+
+
+def check_window(start: datetime, end: datetime, step: timedelta):
+    """Valida o período (ValueError se vazio ou com intervalos demais)"""
+    if end <= start:
+        raise ValueError("O fim do período deve ser posterior ao início")
+    if (end - start) / step > max_buckets():
+        raise ValueError(f"Período com mais de {max_buckets()} intervalos; "
+                         "aumente a largura (bucket) ou reduza o período")
+
+
+def histogram_pipeline(query: Dict, bin_size: int, unit: str,
+                       timeseries: bool = False) -> List[Dict]:
+    """Agregação: filtro no intervalo, projeção coberta pelo índice e um $group
+    por (intervalo, nível, origem)
+
+    `query` já deve estar no formato da collection (timeseries_query).
+    """
+    prefix = f"{META_FIELD}." if timeseries else ''
+    return [
+        {'$match': query},
+        {'$project': {'_id': 0, 'timestamp': 1,
+                      f'{prefix}level': 1, f'{prefix}origin': 1}},
+        {'$group': {
+            '_id': {
+                't': {'$dateTrunc': {'date': '$timestamp', 'unit': unit, 'binSize': bin_size}},
+                'level': f'${prefix}level',
+                'origin': f'${prefix}origin',
+            },
+            'count': {'$sum': 1},
+        }},
+    ]
+
+
+def histogram_plan(start: datetime, end: datetime, bucket: Optional[str],
+                   filters: Optional[Dict],
+                   timeseries: bool) -> Tuple[str, int, str, Dict, List[Dict]]:
+    """Largura, consulta e pipeline do histograma de logs
+
+    Retorna (bucket, bin_size, unit, query, pipeline); `query` fica no
+    formato plano (consulta ao arquivo Parquet). ValueError para largura
+    ou período inválidos.
+    """
+    bucket = bucket or choose_bucket(start, end)
+    bin_size, unit, step = parse_bucket(bucket)
+    check_window(start, end, step)
+
+    query = {**(filters or {}), 'timestamp': {'$gte': start, '$lt': end}}
+    pipeline = histogram_pipeline(
+        timeseries_query(query) if timeseries else query, bin_size, unit, timeseries
+    )
+    return bucket, bin_size, unit, query, pipeline
+
+
+def build_histogram(rows: List[Dict], start: datetime, end: datetime,
+                    bucket: str) -> Dict[str, Any]:
+    """Converte as linhas do $group no formato da API
+
+    Linhas repetidas (ex.: MongoDB + arquivo Parquet) são somadas.
+    """
+    buckets: Dict[datetime, Dict[str, Any]] = {}
+    levels: Dict[str, int] = {}
+    origins: Dict[str, int] = {}
+    total = 0
+
+    for row in rows:
+        key, count = row['_id'], row['count']
+        level = key.get('level') or UNKNOWN
+        origin = key.get('origin') or UNKNOWN
+        entry = buckets.setdefault(key['t'], {'t': key['t'], 'total': 0,
+                                              'levels': {}, 'origins': {}})
+        entry['total'] += count
+        entry['levels'][level] = entry['levels'].get(level, 0) + count
+        entry['origins'][origin] = entry['origins'].get(origin, 0) + count
+        levels[level] = levels.get(level, 0) + count
+        origins[origin] = origins.get(origin, 0) + count
+        total += count
+
+    return {
+        'start': start,
+        'end': end,
+        'bucket': bucket,
+        'total': total,
+        'levels': levels,
+        'origins': origins,
+        'buckets': [buckets[t] for t in sorted(buckets)],
+    }
+
+
+def empty_histogram(start: datetime, end: datetime, bucket: str) -> Dict[str, Any]:
+    """Histograma vazio (fallback em caso de erro)"""
+    return build_histogram([], start, end, bucket)
@@ -0,0 +1,450 @@
+"""
+Gerenciador de Índices do MongoDB
+Declara os índices exigidos pelas consultas do DatabaseManager
+"""
+
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterator, NamedTuple, Optional, Tuple
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+
+from dedup import duplicates_pipeline, upsert_operation
+from queries import OPEN_STATUSES, encode_cursor, keyset_query
+from search import ALERTS_TEXT_INDEX, LOGS_TEXT_INDEX, build_search, search_filters
+from series import SERIES_COLLECTION, sealed_query, series_buckets
+from timeseries import (
+    LOGS_COLLECTION, TIMESERIES_INDEXES, is_timeseries, is_timeseries_async,
+    timeseries_query
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Índices por collection (criação idempotente)
+# As consultas de listagem ordenam por (data desc, _id desc) para a paginação
+# por cursor, por isso o _id é a última chave desses índices.
+INDEXES: Dict[str, List[IndexModel]] = {
+    'alerts': [
+        # check_duplicate_alerts: igualdade em client_id/alert_type/status, range em created_at
+        IndexModel(
+            [('client_id', ASCENDING), ('alert_type', ASCENDING),
+             ('status', ASCENDING), ('created_at', DESCENDING)],
+            name='dedup_client_type_status_created'
+        ),
+        # get_alerts sem filtro
+        IndexModel(
+            [('created_at', DESCENDING), ('_id', DESCENDING)],
+            name='created_at_id'
+        ),
+        # get_alerts com filtros da API
+        IndexModel(
+            [('status', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+            name='status_created_at_id'
+        ),
+        IndexModel(
+            [('severity', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+            name='severity_created_at_id'
+        ),
+        IndexModel(
+            [('client_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)],
+            name='client_created_at_id'
+        ),
+        # get_alert_stats: resolvidos hoje
+        IndexModel(
+            [('status', ASCENDING), ('resolved_at', DESCENDING)],
+            name='status_resolved_at'
+        ),
+        # /stream/alerts sem change streams: alertas alterados desde a última leitura
+        IndexModel(
+            [('updated_at', ASCENDING), ('_id', ASCENDING)],
+            name='updated_at_id'
+        ),
+        # /search (title e description)
+        ALERTS_TEXT_INDEX,
+    ],
+    'logs': [
+        # get_logs sem filtro
+        IndexModel(
+            [('timestamp', DESCENDING), ('_id', DESCENDING)],
+            name='timestamp_id'
+        ),
+        # get_logs por nível (e nível + origem)
+        IndexModel(
+            [('level', ASCENDING), ('origin', ASCENDING),
+             ('timestamp', DESCENDING), ('_id', DESCENDING)],
+            name='level_origin_timestamp_id'
+        ),
+        # get_logs por origem
+        IndexModel(
+            [('origin', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+            name='origin_timestamp_id'
+        ),
+        # /logs/histogram: nível e origem lidos do índice no intervalo de tempo
+        IndexModel(
+            [('timestamp', DESCENDING), ('level', ASCENDING), ('origin', ASCENDING)],
+            name='timestamp_level_origin'
+        ),
+        # /search (message); indisponível em logs time-series
+        LOGS_TEXT_INDEX,
+    ],
+    SERIES_COLLECTION: [
+        # get_alert_series: intervalos selados do período
+        IndexModel(
+            [('granularity', ASCENDING), ('t', ASCENDING)],
+            name='granularity_t'
+        ),
+    ],
+}
+
+# Índices com requisitos de versão do servidor: cada um é criado em uma
+# chamada própria, para que uma falha não impeça a criação dos demais
+# (índice, requisito informado no erro)
+ISOLATED_INDEXES: Dict[str, List[Tuple[IndexModel, str]]] = {
+    'alerts': [
+        # upsert_alert(s): no máximo um alerta ativo por fingerprint
+        (
+            IndexModel(
+                [('fingerprint', ASCENDING)],
+                name='fingerprint_active_unique',
+                unique=True,
+                partialFilterExpression={
+                    'fingerprint': {'$exists': True},
+                    'status': {'$in': OPEN_STATUSES}
+                }
+            ),
+            'MongoDB 6.0+ ($in em partialFilterExpression); sem ele upsert_alert '
+            'não é protegido contra execuções concorrentes',
+        ),
+    ],
+}
+
+# Índices substituídos por versões acima (removidos em ensure_indexes)
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    'alerts': ['created_at_desc', 'status_created_at', 'severity_created_at',
+               'client_created_at', 'updated_at'],
+    'logs': ['timestamp_desc', 'level_origin_timestamp', 'origin_timestamp'],
+}
+
+
+def _query_shapes() -> List[Dict[str, Any]]:
+    """Formatos de consulta emitidos pelo DatabaseManager (valores representativos)"""
+    now = datetime.now()
+    today_start = datetime.combine(now.date(), datetime.min.time())
+    page_token = encode_cursor(now - timedelta(hours=1), '0' * 24)
+
+    return [
+        {
+            'name': 'check_duplicate_alerts',
+            'collection': 'alerts',
+            'filter': duplicates_pipeline([
+                ('CLI001', 'backup_failed', 24),
+                ('CLI002', 'backup_failed', 24),
+                ('CLI001', 'db_connection_error', 1),
+            ], now)[0]['$match'],
+        },
+        {
+            'name': 'upsert_alert',
+            'collection': 'alerts',
+            'filter': upsert_operation({'client_id': 'CLI001', 'alert_type': 'backup_failed'},
+                                       now)[0],
+        },
+        {
+            'name': 'get_alerts',
+            'collection': 'alerts',
+            'filter': {},
+            'sort': [('created_at', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_alerts(status)',
+            'collection': 'alerts',
+            'filter': {'status': 'open'},
+            'sort': [('created_at', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_alerts(severity)',
+            'collection': 'alerts',
+            'filter': {'severity': 'critical'},
+            'sort': [('created_at', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_alerts(client_id)',
+            'collection': 'alerts',
+            'filter': {'client_id': 'CLI001'},
+            'sort': [('created_at', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_alerts(status, cursor)',
+            'collection': 'alerts',
+            'filter': keyset_query({'status': 'open'}, 'created_at', page_token),
+            'sort': [('created_at', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_alert_stats(open)',
+            'collection': 'alerts',
+            'filter': {'status': 'open'},
+        },
+        {
+            'name': 'get_alert_stats(resolved_today)',
+            'collection': 'alerts',
+            'filter': {'status': 'resolved', 'resolved_at': {'$gte': today_start}},
+        },
+        {
+            'name': 'get_logs',
+            'collection': 'logs',
+            'filter': {},
+            'sort': [('timestamp', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_logs(level)',
+            'collection': 'logs',
+            'filter': {'level': 'ERROR'},
+            'sort': [('timestamp', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_logs(origin)',
+            'collection': 'logs',
+            'filter': {'origin': 'API'},
+            'sort': [('timestamp', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_logs(level, origin)',
+            'collection': 'logs',
+            'filter': {'level': 'ERROR', 'origin': 'API'},
+            'sort': [('timestamp', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_logs(level, cursor)',
+            'collection': 'logs',
+            'filter': keyset_query({'level': 'ERROR'}, 'timestamp', page_token),
+            'sort': [('timestamp', DESCENDING), ('_id', DESCENDING)],
+        },
+        {
+            'name': 'get_log_histogram',
+            'collection': 'logs',
+            'filter': {'timestamp': {'$gte': now - timedelta(days=1), '$lt': now}},
+        },
+        {
+            'name': 'push_poll(alerts)',
+            'collection': 'alerts',
+            'filter': {'updated_at': {'$gte': now - timedelta(seconds=4)}},
+            'sort': [('updated_at', ASCENDING), ('_id', ASCENDING)],
+        },
+        {
+            'name': 'push_poll(logs)',
+            'collection': 'logs',
+            'filter': {'timestamp': {'$gte': now - timedelta(seconds=4)}},
+            'sort': [('timestamp', ASCENDING), ('_id', ASCENDING)],
+        },
+        {
+            'name': 'get_alert_series',
+            'collection': SERIES_COLLECTION,
+            'filter': sealed_query('hour', series_buckets('hour', now=now), now),
+        },
+        {
+            'name': 'get_alert_series(aberto)',
+            'collection': 'alerts',
+            'filter': {'created_at': {'$gte': now - timedelta(hours=1), '$lt': now}},
+        },
+        {
+            'name': 'search(alerts)',
+            'collection': 'alerts',
+            'filter': build_search('alerts', 'backup falhou',
+                                   search_filters('alerts', severity='critical'))[0],
+        },
+        {
+            'name': 'search(logs)',
+            'collection': 'logs',
+            'filter': build_search('logs', 'timeout conexão',
+                                   search_filters('logs', level='ERROR'))[0],
+            # Time-series não tem índice de texto (busca por regex)
+            'timeseries': False,
+        },
+    ]
+
+
+def _indexes_for(collection_name: str, timeseries: bool) -> Tuple[List[IndexModel], List[str]]:
+    """Índices declarados e obsoletos de uma collection
+
+    `logs` em modo time-series usa índices sobre os campos do meta.
+    """
+    if collection_name == LOGS_COLLECTION and timeseries:
+        return TIMESERIES_INDEXES, []
+    return INDEXES[collection_name], OBSOLETE_INDEXES.get(collection_name, [])
+
+
+class _IndexStep(NamedTuple):
+    """Uma chamada de create_indexes (requirement: só nos índices isolados)"""
+    collection: str
+    indexes: List[IndexModel]
+    obsolete: List[str]
+    requirement: Optional[str] = None
+
+
+def _index_steps(timeseries: bool) -> Iterator[_IndexStep]:
+    """Criações na ordem de ensure_indexes: um lote por collection, depois
+    cada índice isolado"""
+    for collection_name in INDEXES:
+        yield _IndexStep(collection_name, *_indexes_for(collection_name, timeseries))
+    for collection_name, isolated in ISOLATED_INDEXES.items():
+        for index, requirement in isolated:
+            yield _IndexStep(collection_name, [index], [], requirement)
+
+
+def _step_done(step: _IndexStep, names: List[str]):
+    if step.requirement is None:
+        logger.info(f"✓ Índices garantidos em '{step.collection}': {', '.join(names)}")
+
+
+def _step_failed(step: _IndexStep, error: Exception):
+    if step.requirement is None:
+        logger.error(f"✗ Erro ao criar índices em '{step.collection}': {error}")
+    else:
+        logger.error(f"✗ Índice '{step.indexes[0].document['name']}' não criado em "
+                     f"'{step.collection}' (requer {step.requirement}): {error}")
+
+
+def _obsolete_dropped(collection_name: str, name: str):
+    logger.info(f"✓ Índice obsoleto removido: {collection_name}.{name}")
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """Lista recursivamente os estágios de um plano de execução"""
+    stages = []
+
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+
+    return stages
+
+
+async def ensure_indexes_async(db) -> bool:
+    """Cria os índices declarados usando o client assíncrono"""
+    success = True
+
+    for step in _index_steps(await is_timeseries_async(db)):
+        collection = db[step.collection]
+        try:
+            existing = await collection.index_information() if step.obsolete else {}
+            for name in step.obsolete:
+                if name in existing:
+                    await collection.drop_index(name)
+                    _obsolete_dropped(step.collection, name)
+            _step_done(step, await collection.create_indexes(step.indexes))
+        except Exception as e:
+            _step_failed(step, e)
+            success = False
+
+    return success
+
+
+class IndexManager:
+    """Cria e verifica os índices das collections"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def ensure_indexes(self) -> bool:
+        """Cria os índices declarados (operação idempotente)"""
+        success = True
+
+        for step in _index_steps(is_timeseries(self.db)):
+            collection = self.db[step.collection]
+            try:
+                existing = collection.index_information() if step.obsolete else {}
+                for name in step.obsolete:
+                    if name in existing:
+                        collection.drop_index(name)
+                        _obsolete_dropped(step.collection, name)
+                _step_done(step, collection.create_indexes(step.indexes))
+            except Exception as e:
+                _step_failed(step, e)
+                success = False
+
+        return success
+
+    def verify(self) -> List[Dict[str, Any]]:
+        """Executa explain() em cada formato de consulta e reporta COLLSCAN"""
+        report = []
+        timeseries = is_timeseries(self.db)
+
+        for shape in _query_shapes():
+            query = shape['filter']
+            if shape['collection'] == LOGS_COLLECTION and timeseries:
+                if not shape.get('timeseries', True):
+                    continue
+                query = timeseries_query(query)
+            cursor = self.db[shape['collection']].find(query)
+            if shape.get('sort'):
+                cursor = cursor.sort(shape['sort'])
+
+            try:
+                plan = cursor.limit(100).explain()
+                stages = _plan_stages(plan.get('queryPlanner', {}).get('winningPlan', {}))
+                entry = {
+                    'name': shape['name'],
+                    'collection': shape['collection'],
+                    'stages': stages,
+                    'collscan': 'COLLSCAN' in stages,
+                }
+            except Exception as e:
+                entry = {
+                    'name': shape['name'],
+                    'collection': shape['collection'],
+                    'stages': [],
+                    'collscan': None,
+                    'error': str(e),
+                }
+
+            report.append(entry)
+
+        return report
+
+
+if __name__ == "__main__":
+    from database import db_manager
+
+    verify_mode = '--verify' in sys.argv
+
+    if not db_manager.connect():
+        sys.exit(1)
+
+    try:
+        manager = IndexManager(db_manager.db)
+
+        if not verify_mode:
+            sys.exit(0 if manager.ensure_indexes() else 1)
+
+        print("=" * 60)
+        print("🔍 VERIFICAÇÃO DE PLANOS DE CONSULTA")
+        print("=" * 60)
+
+        failures = 0
+        for entry in manager.verify():
+            if entry['collscan'] is None:
+                status = "⚠️ "
+                failures += 1
+                detail = entry['error']
+            elif entry['collscan']:
+                status = "❌"
+                failures += 1
+                detail = ' → '.join(entry['stages'])
+            else:
+                status = "✅"
+                detail = ' → '.join(entry['stages'])
+            print(f"  {status} {entry['collection']}.{entry['name']}: {detail}")
+
+        print("\n" + "=" * 60)
+        print(f"  {failures} consulta(s) sem índice adequado")
+        print("=" * 60)
+        sys.exit(1 if failures else 0)
+    finally:
+        db_manager.close()
@@ -0,0 +1,439 @@
+"""
+Gravador de Logs em Segundo Plano
+Enfileira logs e grava em lote (group commit) fora do caminho da requisição
+"""
+
+import os
+import queue
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Any, Optional
+import logging
+
+from bson import ObjectId, json_util
+
+logger = logging.getLogger(__name__)
+
+# Políticas quando a fila está cheia
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP = 'drop'
+OVERFLOW_SPILL = 'spill'
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_SPILL)
+
+# Espera máxima (s) por espaço na fila no modo block; sem limite o caminho da
+# requisição ficaria preso enquanto o banco estiver lento
+DEFAULT_BLOCK_TIMEOUT = 1.0
+
+_STOP = object()
+
+
+def written_ids_query(docs: List[Dict]) -> Dict:
+    """Filtro dos logs de um bloco em disco que já estão no banco
+
+    O intervalo de timestamp restringe a busca aos buckets do bloco quando
+    logs é time-series (sem índice em _id).
+    """
+    timestamps = [doc['timestamp'] for doc in docs if doc.get('timestamp')]
+    query: Dict[str, Any] = {'_id': {'$in': [doc['_id'] for doc in docs]}}
+    if len(timestamps) == len(docs):
+        query['timestamp'] = {'$gte': min(timestamps), '$lte': max(timestamps)}
+    return query
+
+
+class _LogWriterBase:
+    """Configuração, estatísticas e transbordo em disco comuns aos gravadores"""
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, overflow: str = OVERFLOW_BLOCK,
+                 block_timeout: float = DEFAULT_BLOCK_TIMEOUT,
+                 spill_path: str = 'logs_spill.jsonl',
+                 written_ids: Optional[Callable[[List[Dict]], Any]] = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de overflow inválida: {overflow}")
+
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.spill_path = spill_path
+        # Consulta os _id de um bloco em disco que já estão no banco
+        self.written_ids = written_ids
+
+        self._spill_lock = threading.Lock()
+        # stats é atualizado pelos submits e pela thread de gravação
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        # submits em andamento: stop() espera por eles antes do marcador de parada
+        self._inflight = 0
+
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'failed': 0,
+        }
+
+    @classmethod
+    def from_env(cls, write_batch, written_ids=None):
+        """Cria o gravador a partir das variáveis de ambiente"""
+        return cls(
+            write_batch,
+            max_queue=int(os.getenv('LOG_WRITER_QUEUE_SIZE', '10000')),
+            batch_size=int(os.getenv('LOG_WRITER_BATCH_SIZE', '500')),
+            flush_interval=float(os.getenv('LOG_WRITER_FLUSH_INTERVAL', '1.0')),
+            overflow=os.getenv('LOG_WRITER_OVERFLOW', OVERFLOW_BLOCK),
+            block_timeout=float(os.getenv('LOG_WRITER_BLOCK_TIMEOUT',
+                                          str(DEFAULT_BLOCK_TIMEOUT))),
+            spill_path=os.getenv('LOG_WRITER_SPILL_PATH', 'logs_spill.jsonl'),
+            written_ids=written_ids
+        )
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _drop_full(self):
+        """Registra um log descartado por falta de espaço na fila"""
+        self._count('dropped')
+        logger.warning("⚠ Fila de logs cheia, log descartado")
+
+    def _handle_result(self, batch: List[Dict], result: Dict[str, Any]) -> List[Dict]:
+        """Contabiliza um lote gravado; retorna as falhas transitórias a gravar em disco"""
+        self._count('written', result['inserted'])
+
+        # Erros sem código são de rede/timeout; erros com código (ex.: chave duplicada) são definitivos
+        transient = [batch[error['index']] for error in result['errors']
+                     if error.get('code') is None]
+        permanent = len(result['errors']) - len(transient)
+        self._count('failed', permanent)
+
+        if transient and self.overflow != OVERFLOW_SPILL:
+            self._count('failed', len(transient))
+            return []
+        return transient
+
+    @staticmethod
+    def _failed_result(batch: List[Dict], error: Exception) -> Dict[str, Any]:
+        logger.error(f"✗ Erro ao gravar lote de logs: {error}")
+        return {
+            'inserted': 0,
+            'errors': [{'index': i, 'code': None, 'message': str(error)}
+                       for i in range(len(batch))]
+        }
+
+    def _spill(self, docs: List[Dict]):
+        """Anexa logs ao arquivo de transbordo em disco
+
+        Todo log vai para o disco com _id, para a regravação reconhecer os
+        que o banco já recebeu (ver _unwritten).
+        """
+        try:
+            with self._spill_lock:
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    for doc in docs:
+                        doc.setdefault('_id', ObjectId())
+                        f.write(json_util.dumps(doc) + '\n')
+            self._count('spilled', len(docs))
+        except Exception as e:
+            self._count('dropped', len(docs))
+            logger.error(f"✗ Erro ao gravar logs em disco: {e}")
+
+    def _take_spilled(self) -> Optional[str]:
+        """Separa o arquivo de transbordo para regravação (None se não há logs em disco)
+
+        Novos transbordos vão para um arquivo novo enquanto o .replay é lido.
+        """
+        replay_path = self.spill_path + '.replay'
+
+        # Um .replay remanescente (processo interrompido) tem prioridade
+        with self._spill_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return None
+                os.replace(self.spill_path, replay_path)
+        return replay_path
+
+    def _read_spilled(self, f) -> List[Dict]:
+        """Próximo bloco (até batch_size logs) do arquivo em regravação"""
+        docs = []
+        for line in f:
+            if line.strip():
+                docs.append(json_util.loads(line))
+                if len(docs) >= self.batch_size:
+                    break
+        return docs
+
+    def _unwritten(self, docs: List[Dict], written) -> List[Dict]:
+        """Remove do bloco os logs cujo _id o banco já tem
+
+        Um lote que falhou por timeout pode ter sido gravado, e uma regravação
+        interrompida recomeça do início do arquivo; a collection time-series
+        não tem índice único em _id, então a chave duplicada não os barraria.
+        """
+        pending = [doc for doc in docs if doc['_id'] not in written]
+        self._count('replayed', len(pending))
+        return pending
+
+    def _finish_replay(self, replay_path: str, count: int):
+        os.remove(replay_path)
+        if count:
+            logger.info(f"✓ {count} logs regravados a partir do disco")
+
+
+class BufferedLogWriter(_LogWriterBase):
+    """Fila limitada de logs gravada por uma thread (client síncrono)"""
+
+    def __init__(self, write_batch: Callable[[List[Dict]], Dict[str, Any]],
+                 **options):
+        super().__init__(**options)
+        self.write_batch = write_batch
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._submits = threading.Condition()
+
+    def start(self):
+        """Inicia a thread de gravação"""
+        if self._thread is not None:
+            return
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name='BufferedLogWriter', daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, log_data: Dict) -> bool:
+        """Enfileira um log; retorna False se o gravador não aceitou"""
+        with self._submits:
+            if self._closed or self._thread is None:
+                return False
+            self._inflight += 1
+
+        try:
+            if self.overflow == OVERFLOW_BLOCK:
+                self._queue.put(log_data, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(log_data)
+            self._count('enqueued')
+        except queue.Full:
+            if self.overflow == OVERFLOW_SPILL:
+                self._spill([log_data])
+            else:
+                self._drop_full()
+        finally:
+            with self._submits:
+                self._inflight -= 1
+                self._submits.notify_all()
+        return True
+
+    def stop(self, timeout: Optional[float] = 30.0):
+        """Esvazia a fila, grava o que estiver em disco e encerra a thread"""
+        if self._thread is None:
+            return
+
+        # Recusa novos submits; os que já começaram entram antes do marcador
+        with self._submits:
+            self._closed = True
+            self._submits.wait_for(lambda: self._inflight == 0, timeout)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+        if self._thread.is_alive():
+            logger.error(f"✗ Gravador de logs não terminou em {timeout}s "
+                         f"({self._queue.qsize()} logs pendentes)")
+        else:
+            logger.info(f"✓ Gravador de logs encerrado: {self.stats}")
+        self._thread = None
+
+    def _run(self):
+        """Loop de group commit: grava ao atingir batch_size ou flush_interval"""
+        stopping = False
+
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                deadline = time.monotonic() + self.flush_interval
+
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                pass
+
+            if batch:
+                self._write(batch)
+
+            if stopping or self._queue.empty():
+                self._replay_spilled()
+
+    def _replay_spilled(self):
+        """Regrava os logs em disco, um bloco de batch_size por vez"""
+        replay_path = self._take_spilled()
+        if replay_path is None:
+            return
+
+        count = 0
+        try:
+            with open(replay_path, encoding='utf-8') as f:
+                while docs := self._read_spilled(f):
+                    written = self.written_ids(docs) if self.written_ids else set()
+                    docs = self._unwritten(docs, written)
+                    count += len(docs)
+                    if docs:
+                        self._write(docs)
+            self._finish_replay(replay_path, count)
+        except Exception as e:
+            logger.error(f"✗ Erro ao regravar logs em disco: {e}")
+
+    def _write(self, batch: List[Dict]):
+        try:
+            result = self.write_batch(batch)
+        except Exception as e:
+            result = self._failed_result(batch, e)
+        spill = self._handle_result(batch, result)
+        if spill:
+            self._spill(spill)
+
+
+class AsyncBufferedLogWriter(_LogWriterBase):
+    """Fila limitada de logs gravada por uma task asyncio (client assíncrono)"""
+
+    def __init__(self, write_batch: Callable[[List[Dict]], Awaitable[Dict[str, Any]]],
+                 **options):
+        super().__init__(**options)
+        self.write_batch = write_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._idle: Optional[asyncio.Event] = None
+
+    def start(self):
+        """Inicia a task de gravação (deve ser chamado dentro do event loop)"""
+        if self._task is not None:
+            return
+        self._closed = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, log_data: Dict) -> bool:
+        """Enfileira um log; retorna False se o gravador não aceitou"""
+        if self._closed or self._task is None:
+            return False
+
+        self._inflight += 1
+        self._idle.clear()
+        try:
+            if self.overflow == OVERFLOW_BLOCK:
+                await asyncio.wait_for(self._queue.put(log_data), self.block_timeout)
+            else:
+                self._queue.put_nowait(log_data)
+            self._count('enqueued')
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            if self.overflow == OVERFLOW_SPILL:
+                await asyncio.to_thread(self._spill, [log_data])
+            else:
+                self._drop_full()
+        finally:
+            self._inflight -= 1
+            if not self._inflight:
+                self._idle.set()
+        return True
+
+    async def stop(self, timeout: Optional[float] = 30.0):
+        """Esvazia a fila, grava o que estiver em disco e encerra a task"""
+        if self._task is None:
+            return
+
+        # Recusa novos submits; os que já começaram entram antes do marcador
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"✗ {self._inflight} logs ainda aguardavam espaço na fila")
+        await self._queue.put(_STOP)
+
+        try:
+            await asyncio.wait_for(self._task, timeout)
+            logger.info(f"✓ Gravador de logs encerrado: {self.stats}")
+        except asyncio.TimeoutError:
+            logger.error(f"✗ Gravador de logs não terminou em {timeout}s "
+                         f"({self._queue.qsize()} logs pendentes)")
+        self._task = None
+
+    async def _run(self):
+        """Loop de group commit: grava ao atingir batch_size ou flush_interval"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            batch = []
+            try:
+                item = await asyncio.wait_for(self._queue.get(), self.flush_interval)
+                deadline = loop.time() + self.flush_interval
+
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+            if batch:
+                await self._write(batch)
+
+            if stopping or self._queue.empty():
+                await self._replay_spilled()
+
+    async def _replay_spilled(self):
+        """Regrava os logs em disco, um bloco de batch_size por vez
+
+        A leitura do arquivo roda em thread, fora do event loop.
+        """
+        replay_path = await asyncio.to_thread(self._take_spilled)
+        if replay_path is None:
+            return
+
+        count = 0
+        try:
+            f = await asyncio.to_thread(open, replay_path, encoding='utf-8')
+            try:
+                while docs := await asyncio.to_thread(self._read_spilled, f):
+                    written = await self.written_ids(docs) if self.written_ids else set()
+                    docs = self._unwritten(docs, written)
+                    count += len(docs)
+                    if docs:
+                        await self._write(docs)
+            finally:
+                f.close()
+            await asyncio.to_thread(self._finish_replay, replay_path, count)
+        except Exception as e:
+            logger.error(f"✗ Erro ao regravar logs em disco: {e}")
+
+    async def _write(self, batch: List[Dict]):
+        try:
+            result = await self.write_batch(batch)
+        except Exception as e:
+            result = self._failed_result(batch, e)
+        spill = self._handle_result(batch, result)
+        if spill:
+            await asyncio.to_thread(self._spill, spill)
@@ -42,6 +42,7 @@ def run_all_checks():
         
         total_alerts = 0
         created_alerts = 0
+        pending_alerts = []
         
         # Executar cada analisador
         for analyzer in analyzers:
@@ -52,32 +53,36 @@ def run_all_checks():
                 # Detectar problemas
                 detected_alerts = analyzer.analyze()
                 total_alerts += len(detected_alerts)
+                pending_alerts.extend(detected_alerts)
                 
                 logger.info(f"  ✓ {len(detected_alerts)} alerta(s) detectado(s)")
                 
-                # Criar alertas no banco e enviar notificações
-                for alert_data in detected_alerts:
-                    # Inserir no banco
-                    alert_id = db_manager.insert_alert(alert_data)
-                    
-                    if alert_id:
-                        created_alerts += 1
-                        alert_data['_id'] = alert_id
-                        
-                        # Enviar notificações
-                        logger.info(f"  📧 Enviando notificações...")
-                        results = notification_manager.send_alert_notification(
-                            alert_data,
-                            channels=['email']  # Pode adicionar 'whatsapp' aqui
-                        )
-                        
-                        for channel, success in results.items():
-                            status = "✓" if success else "✗"
-                            logger.info(f"    {status} {channel}")
-                
             except Exception as e:
                 logger.error(f"  ✗ Erro no {analyzer_name}: {e}")
         
+        # Criar (ou atualizar os já ativos) em lote; upsert por fingerprint
+        # evita duplicatas quando execuções concorrentes detectam o mesmo problema
+        if pending_alerts:
+            result = db_manager.upsert_alerts(pending_alerts)
+            
+            # Enviar notificações apenas dos alertas criados
+            for alert_data, alert_id in zip(pending_alerts, result['created_ids']):
+                if not alert_id:
+                    continue
+                
+                created_alerts += 1
+                alert_data['_id'] = alert_id
+                
+                logger.info(f"  📧 Enviando notificações: {alert_data.get('title')}")
+                results = notification_manager.send_alert_notification(
+                    alert_data,
+                    channels=['email']  # Pode adicionar 'whatsapp' aqui
+                )
+                
+                for channel, success in results.items():
+                    status = "✓" if success else "✗"
+                    logger.info(f"    {status} {channel}")
+        
         # Resumo final
         logger.info("\n" + "=" * 60)
         logger.info(f"📈 RESUMO:")
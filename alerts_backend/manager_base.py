@@ -0,0 +1,177 @@
+"""
+Base dos Gerenciadores de Banco
+Configuração e registro dos resultados comuns ao DatabaseManager (scripts e
+workers) e ao AsyncDatabaseManager (API)
+
+Os gerenciadores executam apenas as idas ao banco, síncronas ou assíncronas;
+consultas, pipelines e resultados vêm dos módulos de cada funcionalidade
+(queries, search, histogram, series, bulk, dedup...). Os efeitos de uma
+gravação neste processo (cache, dedup, versões, logs) são registrados por um
+método `_*_done`, que retorna as operações de rollup a aplicar.
+"""
+
+import os
+from typing import Optional, Dict, List, Any, Tuple
+import logging
+
+from rollups import ROLLUP_FIELDS, ops_for_insert, ops_for_delete, ops_for_transition
+from dedup import DedupCache, DEDUP_FIELDS, UpsertBatch, upsert_result, upserted_alert
+from timeseries import timeseries_enabled
+from archive import LogArchive
+from pool import PoolMonitor, pool_options
+from write_concerns import write_concern, write_tier
+from bulk import bulk_rollup_ops
+from alert_cache import AlertCache
+from change_feed import change_feed_enabled
+from versions import ChangeVersions
+
+logger = logging.getLogger(__name__)
+
+# Estado anterior lido em update/delete (rollups e invalidação do dedup)
+BEFORE_FIELDS = {**ROLLUP_FIELDS, **DEDUP_FIELDS}
+
+
+def before_projection(update_data: Dict) -> Dict:
+    """BEFORE_FIELDS e os campos do $set (para saber se o update altera o alerta)"""
+    return {**BEFORE_FIELDS, **{key: 1 for key in update_data}}
+
+
+class ManagerBase:
+    """Configuração e registro de resultados comuns aos gerenciadores
+
+    As subclasses definem client, db, log_writer e os feeds de alterações
+    (tipos síncronos ou assíncronos).
+    """
+
+    def __init__(self, pool_profile: str):
+        self.connection_string = os.getenv(
+            'MONGODB_URI',
+            'mongodb://localhost:27017/'
+        )
+        self.database_name = os.getenv('DB_NAME', 'alerts_system')
+        self.auto_indexes = os.getenv('DB_AUTO_INDEXES', '1') != '0'
+        self.bulk_chunk_size = int(os.getenv('DB_BULK_CHUNK_SIZE', '1000'))
+        self.stats_rollups = os.getenv('STATS_ROLLUPS', '1') != '0'
+        self.buffered_logs = os.getenv('LOG_WRITER_ENABLED', '1') != '0'
+        self.timeseries_logs = timeseries_enabled()
+        # Formato real de `logs` (detectado na conexão)
+        self.logs_timeseries = False
+        self.dedup = DedupCache.from_env()
+        # Pool por perfil de concorrência (DB_POOL_PROFILE sobrescreve)
+        self.pool_profile = os.getenv('DB_POOL_PROFILE', pool_profile)
+        self.pool_options = pool_options(self.pool_profile)
+        self.monitor = PoolMonitor(self.pool_options['maxPoolSize'])
+        self.archive = LogArchive.from_env()
+        self.alert_cache = AlertCache.from_env()
+        # Invalidação do cache por alterações de outros processos
+        self.change_feed_enabled = change_feed_enabled(self.pool_profile == 'api')
+        # Versões por collection (ETags de /alerts, /logs e /stats)
+        self.versions = ChangeVersions.from_env()
+        # Collections com o write concern de cada nível (collection, nível)
+        self._handles: Dict[Tuple[str, str], Any] = {}
+
+    def get_collection(self, name: str, site: Optional[str] = None):
+        """Retorna uma collection do banco com o write concern do nível
+        configurado para a collection ou para o ponto de chamada (`site`)"""
+        if self.db is None:
+            raise Exception("Banco de dados não conectado")
+
+        tier = write_tier(name, site)
+        collection = self._handles.get((name, tier))
+        if collection is None:
+            concern = write_concern(tier)
+            collection = self.db[name]
+            if concern is not None:
+                collection = collection.with_options(write_concern=concern)
+            self._handles[(name, tier)] = collection
+        return collection
+
+    def _on_alert_change(self, change: Dict):
+        """Evento do feed de alterações de `alerts` (outro processo ou este)"""
+        if change.get('operationType') != 'insert':
+            self.alert_cache.invalidate(change['documentKey']['_id'])
+
+    # ========== RESULTADOS ==========
+
+    def _insert_done(self, alert_data: Dict, inserted_id: Any) -> List:
+        """Registra o alerta criado; retorna as operações de rollup"""
+        self.versions.bump('alerts')
+        logger.info(f"✓ Alerta criado: {inserted_id}")
+        self.dedup.remember([alert_data])
+        return ops_for_insert([alert_data])
+
+    def _inserts_done(self, alerts: List[Dict], result: Dict[str, Any]) -> List:
+        """Registra os alertas criados em lote; retorna as operações de rollup"""
+        logger.info(f"✓ {result['inserted']}/{len(alerts)} alertas criados em lote")
+        inserted = [alert for alert, _id in zip(alerts, result['inserted_ids']) if _id]
+        self.dedup.remember(inserted)
+        for error in result['errors']:
+            logger.error(f"✗ Erro ao inserir alerta #{error['index']}: {error['message']}")
+        return ops_for_insert(inserted)
+
+    def _upsert_done(self, doc: Dict, update: Dict) -> Tuple[Dict[str, Any], List]:
+        """Resultado do upsert ({'_id', 'created', 'occurrences'}) e as
+        operações de rollup (apenas para alerta criado)"""
+        self.versions.bump('alerts')
+
+        result = upsert_result(doc)
+        if not result['created']:
+            self.alert_cache.invalidate(doc['_id'])
+            return result, []
+
+        alert = upserted_alert(update)
+        logger.info(f"✓ Alerta criado: {doc['_id']}")
+        self.dedup.remember([alert])
+        return result, ops_for_insert([alert])
+
+    def _upserts_done(self, batch: UpsertBatch) -> List:
+        """Registra o upsert em lote; retorna as operações de rollup dos criados"""
+        self.versions.bump('alerts')
+        created_alerts = batch.created_alerts()
+        self.dedup.remember(created_alerts)
+        # Os ids dos alertas atualizados não vêm no resultado do bulk_write
+        if len(batch.created) < len(batch.alerts):
+            self.alert_cache.clear()
+
+        logger.info(f"✓ Upsert de {len(batch.alerts)} alertas: {len(batch.created)} criados")
+        for error in batch.errors:
+            logger.error(f"✗ Erro no upsert do alerta #{error['index']}: {error['message']}")
+        return ops_for_insert(created_alerts)
+
+    def _update_done(self, alert_id: str, before: Dict, update_data: Dict) -> List:
+        """Registra a atualização (estado anterior `before`); retorna as
+        operações de rollup"""
+        self.versions.bump('alerts')
+        logger.info(f"✓ Alerta atualizado: {alert_id}")
+        self.alert_cache.invalidate(alert_id)
+        self.dedup.forget(before)
+        return ops_for_transition(before, update_data)
+
+    def _delete_done(self, alert_id: str, deleted: Dict) -> List:
+        """Registra a remoção; retorna as operações de rollup"""
+        self.versions.bump('alerts')
+        logger.info(f"✓ Alerta removido: {alert_id}")
+        self.alert_cache.invalidate(alert_id)
+        self.dedup.forget(deleted)
+        return ops_for_delete(deleted)
+
+    def _bulk_done(self, action: str, targets: List[Dict], changed: int,
+                   update_data: Optional[Dict]) -> List:
+        """Registra a operação em lote; retorna as operações de rollup"""
+        self.versions.bump('alerts')
+
+        if changed != len(targets):
+            # Alterados entre a leitura e a gravação: os rollups podem divergir
+            logger.warning(f"⚠ Operação em lote ({action}): {changed} de {len(targets)} "
+                           "alertas alterados; se necessário: python rollups.py --rebuild")
+
+        logger.info(f"✓ Operação em lote ({action}): {changed} alertas")
+        for doc in targets:
+            self.alert_cache.invalidate(doc['_id'])
+            self.dedup.forget(doc)
+        return bulk_rollup_ops(action, targets, update_data)
+
+    def _log_errors(self, result: Dict[str, Any]):
+        """Registra as falhas por documento de insert_logs"""
+        for error in result['errors']:
+            logger.error(f"✗ Erro ao inserir log #{error['index']}: {error['message']}")
@@ -0,0 +1,1505 @@
+"""
+Backend em Memória
+Implementação em processo das operações do pymongo que os gerenciadores usam
+(DB_BACKEND=memory), para testes, desenvolvimento sem MongoDB e benchmarks
+
+Interface suportada (qualquer outra operação falha com AttributeError ou
+OperationFailure):
+  - collection: find (filtro, projeção, sort, skip, limit, explain), find_one,
+    count_documents, estimated_document_count, aggregate, insert_one/insert_many,
+    update_one/update_many, find_one_and_update, find_one_and_delete,
+    delete_one/delete_many, bulk_write, create_indexes, index_information,
+    drop_index, drop, rename
+  - filtros: igualdade, $in, $gt/$gte/$lt/$lte, $exists, $type, $regex,
+    $and/$or e $text; updates: $set, $setOnInsert, $inc e $unset
+  - agregação: $match, $project de inclusão logo após o $match, $group
+    ($sum, $avg, $max), $facet e $count; expressões $subtract e $dateTrunc
+  - database: create_collection, list_collections, command('collMod')
+
+Índices:
+  - hash nos campos de igualdade (ASCENDING) dos índices declarados
+  - ordenados nos campos de data (DESCENDING), usados em sort + limit
+  - únicos (com partialFilterExpression)
+  - de texto ($text com pontuação textScore; sem stemming nem stop words)
+"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Callable, Iterable, Iterator, Set, Tuple
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+)
+
+_MISSING = object()
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+# ========== VALORES ==========
+
+def _get(doc: Any, path: str) -> Any:
+    """Valor de um caminho com pontos ('meta.level'); _MISSING se ausente"""
+    if '.' not in path:
+        return doc.get(path, _MISSING) if isinstance(doc, dict) else _MISSING
+    value = doc
+    for part in path.split('.'):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set(doc: Dict, path: str, value: Any):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc: Dict, path: str):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _clone(value: Any) -> Any:
+    """Cópia dos containers (mais barata que deepcopy para documentos BSON)"""
+    if isinstance(value, dict):
+        return {key: _clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone(item) for item in value]
+    return value
+
+
+def _rank(value: Any) -> int:
+    """Ordem de comparação entre tipos do BSON"""
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def sort_key(value: Any) -> Tuple:
+    """Chave de ordenação compatível com a ordem do MongoDB"""
+    rank = _rank(value)
+    if rank == 1:
+        return (1, 0)
+    if rank in (4, 5, 10):
+        return (rank, repr(value))
+    if rank == 7:
+        # Mesma ordem do ObjectId, comparada em C
+        return (rank, value.binary)
+    return (rank, value)
+
+
+def _equals(value: Any, target: Any) -> bool:
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return any(_equals(item, target) for item in value)
+    return value == target
+
+
+def _compare(value: Any, target: Any, op: str) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    if type(value) is not type(target) and _rank(value) != _rank(target):
+        return False
+    if op == '$gt':
+        return value > target
+    if op == '$gte':
+        return value >= target
+    if op == '$lt':
+        return value < target
+    return value <= target
+
+
+_TYPES = {
+    'date': datetime, 'string': str, 'objectId': ObjectId, 'bool': bool,
+    'object': dict, 'array': list, 'double': float, 'int': int, 'long': int,
+    'number': (int, float), 'null': type(None),
+}
+
+
+# Tipos comparados por igualdade de hash sem ambiguidade (1 == True em Python)
+_SET_TYPES = (str, ObjectId, datetime)
+
+
+def _getter(path: str) -> Callable[[Dict], Any]:
+    if '.' not in path:
+        return lambda doc: doc.get(path, _MISSING)
+    return lambda doc: _get(doc, path)
+
+
+def _compile_in(items: List[Any]) -> Callable[[Any], bool]:
+    """Teste de $in (conjunto quando os valores permitem)"""
+    if items and all(isinstance(item, _SET_TYPES) for item in items):
+        members = frozenset(items)
+
+        def test(value: Any) -> bool:
+            if isinstance(value, list):
+                return any(isinstance(item, _SET_TYPES) and item in members for item in value)
+            return isinstance(value, _SET_TYPES) and value in members
+        return test
+    return lambda value: any(_equals(value, item) for item in items)
+
+
+def _compile_operator(op: str, arg: Any, condition: Dict) -> Optional[Callable[[Any], bool]]:
+    if op == '$in':
+        return _compile_in(arg)
+    if op in ('$gt', '$gte', '$lt', '$lte'):
+        return lambda value: _compare(value, arg, op)
+    if op == '$exists':
+        return lambda value: (value is not _MISSING) == bool(arg)
+    if op == '$type':
+        expected = _TYPES.get(arg, ())
+        return lambda value: value is not _MISSING and isinstance(value, expected) \
+            and not (arg != 'bool' and isinstance(value, bool))
+    if op == '$regex':
+        flags = re.IGNORECASE if 'i' in condition.get('$options', '') else 0
+        pattern = re.compile(arg, flags) if isinstance(arg, str) else arg
+        return lambda value: isinstance(value, str) and pattern.search(value) is not None
+    if op == '$options':
+        return None
+    raise OperationFailure(f"Operador não suportado pelo backend em memória: {op}")
+
+
+def _compile_condition(condition: Any) -> Callable[[Any], bool]:
+    if isinstance(condition, re.Pattern):
+        return lambda value: isinstance(value, str) and condition.search(value) is not None
+
+    if not (isinstance(condition, dict) and condition
+            and all(key.startswith('$') for key in condition)):
+        return lambda value: _equals(value, condition)
+
+    tests = [test for test in (_compile_operator(op, arg, condition)
+                               for op, arg in condition.items()) if test is not None]
+    if len(tests) == 1:
+        return tests[0]
+    return lambda value: all(test(value) for test in tests)
+
+
+def _compile_field(path: str, condition: Any) -> Callable[[Dict], bool]:
+    get = _getter(path)
+    test = _compile_condition(condition)
+    return lambda doc: test(get(doc))
+
+
+def compile_query(query: Optional[Dict]) -> Callable[[Dict], bool]:
+    """Converte um filtro do MongoDB em predicado (compilado uma vez por consulta)"""
+    tests: List[Callable[[Dict], bool]] = []
+    for key, condition in (query or {}).items():
+        if key in ('$and', '$or'):
+            subs = [compile_query(sub) for sub in condition]
+            if key == '$and':
+                tests.append(lambda doc, subs=subs: all(sub(doc) for sub in subs))
+            else:
+                tests.append(lambda doc, subs=subs: any(sub(doc) for sub in subs))
+        elif key.startswith('$'):
+            raise OperationFailure(f"Operador não suportado pelo backend em memória: {key}")
+        else:
+            tests.append(_compile_field(key, condition))
+
+    if not tests:
+        return lambda doc: True
+    if len(tests) == 1:
+        return tests[0]
+    return lambda doc: all(test(doc) for test in tests)
+
+
+def project(doc: Dict, projection: Optional[Any],
+            scores: Optional[Dict[Any, float]] = None) -> Dict:
+    """Aplica uma projeção de inclusão ou exclusão (retorna cópia)
+
+    Campos {'$meta': 'textScore'} recebem a pontuação de `scores`.
+    """
+    if not projection:
+        return _clone(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+
+    meta = [field for field, flag in projection.items() if isinstance(flag, dict)]
+    if meta:
+        result = project(doc, {field: flag for field, flag in projection.items()
+                               if not isinstance(flag, dict)})
+        for field in meta:
+            result[field] = (scores or {}).get(doc.get('_id'), 0.0)
+        return result
+
+    include_id = bool(projection.get('_id', 1))
+    fields = {field: flag for field, flag in projection.items() if field != '_id'}
+
+    if fields and all(not flag for flag in fields.values()):
+        result = _clone(doc)
+        for field in fields:
+            _unset(result, field)
+        if not include_id:
+            result.pop('_id', None)
+        return result
+
+    result: Dict[str, Any] = {}
+    if include_id and '_id' in doc:
+        result['_id'] = doc['_id']
+    for field in fields:
+        value = _get(doc, field)
+        if value is not _MISSING:
+            _set(result, field, _clone(value))
+    return result
+
+
+def _normalize_sort(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    return [(field, order if isinstance(order, dict) else int(order))
+            for field, order in key_or_list]
+
+
+def sort_documents(docs: List[Dict], spec: List[Tuple[str, Any]],
+                   scores: Optional[Dict[Any, float]] = None) -> List[Dict]:
+    """Ordenação estável por várias chaves ({'$meta': 'textScore'} usa `scores`)"""
+    scores = scores or {}
+    directions = {-1 if isinstance(order, dict) else order for _, order in spec}
+    if len(directions) == 1:
+        # Todas as chaves no mesmo sentido: uma única ordenação por tupla
+        keys = [(lambda doc: scores.get(doc.get('_id'), 0.0)) if isinstance(order, dict)
+                else (lambda doc, field=field: sort_key(_get(doc, field)))
+                for field, order in spec]
+        docs.sort(key=lambda doc: tuple(key(doc) for key in keys), reverse=directions.pop() < 0)
+        return docs
+
+    for field, order in reversed(spec):
+        if isinstance(order, dict):
+            docs.sort(key=lambda doc: scores.get(doc.get('_id'), 0.0), reverse=True)
+        else:
+            docs.sort(key=lambda doc: sort_key(_get(doc, field)), reverse=order < 0)
+    return docs
+
+
+# ========== TEXTO ==========
+
+_WORD = re.compile(r'\w+')
+_SEARCH_TERM = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+
+def text_tokens(value: Any) -> List[str]:
+    """Palavras de um campo de texto, em minúsculas e sem acentos"""
+    if not isinstance(value, str):
+        return []
+    normalized = unicodedata.normalize('NFKD', value.lower())
+    return _WORD.findall(''.join(ch for ch in normalized if not unicodedata.combining(ch)))
+
+
+def parse_text_search(search: str) -> Tuple[Set[str], List[str], Set[str]]:
+    """$search -> (palavras, frases, palavras negadas)
+
+    Como no MongoDB: basta uma palavra, todas as frases são exigidas e
+    nenhuma palavra negada pode aparecer.
+    """
+    words: Set[str] = set()
+    phrases: List[str] = []
+    negated: Set[str] = set()
+    for match in _SEARCH_TERM.finditer(search):
+        minus, phrase, term = match.groups()
+        if phrase is not None:
+            tokens = text_tokens(phrase)
+            if minus:
+                negated.update(tokens)
+            elif tokens:
+                words.update(tokens)
+                phrases.append(' '.join(tokens))
+        elif term.startswith('-'):
+            negated.update(text_tokens(term[1:]))
+        else:
+            words.update(text_tokens(term))
+    return words, phrases, negated
+
+
+# ========== ATUALIZAÇÕES ==========
+
+def _upsert_seed(query: Dict) -> Dict:
+    """Campos de igualdade do filtro copiados para o documento criado"""
+    seed: Dict[str, Any] = {}
+    for key, condition in query.items():
+        if key == '$and':
+            for sub in condition:
+                for field, value in _upsert_seed(sub).items():
+                    _set(seed, field, value)
+        elif key.startswith('$') or (isinstance(condition, dict)
+                                     and any(k.startswith('$') for k in condition)):
+            continue
+        else:
+            _set(seed, key, _clone(condition))
+    return seed
+
+
+def apply_update(doc: Dict, update: Dict, inserting: bool = False) -> Dict:
+    """Aplica $set/$inc/$unset/$setOnInsert (retorna novo documento)"""
+    result = _clone(doc)
+    for op, fields in update.items():
+        if op == '$setOnInsert':
+            if inserting:
+                for field, value in fields.items():
+                    _set(result, field, _clone(value))
+        elif op == '$set':
+            for field, value in fields.items():
+                _set(result, field, _clone(value))
+        elif op == '$inc':
+            for field, value in fields.items():
+                current = _get(result, field)
+                _set(result, field, (0 if current is _MISSING else current) + value)
+        elif op == '$unset':
+            for field in fields:
+                _unset(result, field)
+        else:
+            raise OperationFailure(f"Operador de update não suportado: {op}")
+
+    return result
+
+
+# ========== AGREGAÇÃO ==========
+
+def _date_arg(value: Any) -> Any:
+    return value if isinstance(value, datetime) else None
+
+
+def evaluate(doc: Dict, expression: Any) -> Any:
+    """Avalia uma expressão de agregação"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        value = _get(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, list):
+        return [evaluate(doc, item) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+
+    if len(expression) == 1:
+        op, arg = next(iter(expression.items()))
+        if op.startswith('$'):
+            return _operator(doc, op, arg)
+    return {key: evaluate(doc, value) for key, value in expression.items()}
+
+
+_UNITS = {
+    'second': timedelta(seconds=1), 'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1), 'day': timedelta(days=1),
+}
+
+
+def _date_trunc(date: datetime, unit: str, bin_size: int) -> datetime:
+    step = _UNITS[unit] * bin_size
+    origin = datetime(2000, 1, 1)
+    return origin + ((date - origin) // step) * step
+
+
+def _operator(doc: Dict, op: str, arg: Any) -> Any:
+    if op == '$subtract':
+        a, b = evaluate(doc, arg)
+        if a is None or b is None:
+            return None
+        if isinstance(a, datetime) and isinstance(b, datetime):
+            return int((a - b).total_seconds() * 1000)
+        if isinstance(a, datetime):
+            return a - timedelta(milliseconds=b)
+        return a - b
+    if op == '$dateTrunc':
+        date = _date_arg(evaluate(doc, arg['date']))
+        if date is None:
+            return None
+        return _date_trunc(date, evaluate(doc, arg['unit']), int(evaluate(doc, arg.get('binSize', 1))))
+    raise OperationFailure(f"Expressão não suportada pelo backend em memória: {op}")
+
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def _accumulate(docs: List[Dict], spec: Dict[str, Any]) -> Any:
+    (op, expression), = spec.items()
+    values = [evaluate(doc, expression) for doc in docs]
+
+    if op == '$sum':
+        return sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+    if op == '$avg':
+        numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        return sum(numbers) / len(numbers) if numbers else None
+    if op == '$max':
+        present = [v for v in values if v is not None]
+        return max(present, key=sort_key) if present else None
+    raise OperationFailure(f"Acumulador não suportado pelo backend em memória: {op}")
+
+
+def run_pipeline(docs: List[Dict], pipeline: List[Dict]) -> List[Dict]:
+    """Executa os estágios de agregação sobre uma lista de documentos
+
+    O $project logo após o $match é aplicado por MemoryCollection.aggregate.
+    """
+    for stage in pipeline:
+        (name, spec), = stage.items()
+
+        if name == '$match':
+            test = compile_query(spec)
+            docs = [doc for doc in docs if test(doc)]
+        elif name == '$group':
+            groups: Dict[Any, List[Dict]] = {}
+            keys: Dict[Any, Any] = {}
+            for doc in docs:
+                key = evaluate(doc, spec['_id'])
+                hashed = _hashable(key)
+                groups.setdefault(hashed, []).append(doc)
+                keys.setdefault(hashed, key)
+            docs = [
+                {'_id': keys[hashed],
+                 **{field: _accumulate(members, acc) for field, acc in spec.items() if field != '_id'}}
+                for hashed, members in groups.items()
+            ]
+        elif name == '$facet':
+            docs = [{field: run_pipeline(list(docs), sub) for field, sub in spec.items()}]
+        elif name == '$count':
+            docs = [{spec: len(docs)}] if docs else []
+        else:
+            raise OperationFailure(f"Estágio não suportado pelo backend em memória: {name}")
+
+    return docs
+
+
+# ========== ÍNDICES ==========
+
+class _SortedIndex:
+    """Lista ordenada (chave, _id) com inserções pendentes
+
+    Novas entradas aguardam em `pending` e são incorporadas na próxima leitura
+    (insort quando são poucas, merge por ordenação quando o lote é grande).
+    Entradas de documentos alterados/removidos são validadas na leitura e
+    descartadas quando passam de 1/4 da lista.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        # (rank, valor, _id): tuplas planas comparam mais rápido
+        self.entries: List[Tuple[int, Any, Any]] = []
+        self.pending: List[Tuple[int, Any, Any]] = []
+        self.stale = 0
+
+    def add(self, doc: Dict):
+        self.pending.append((*sort_key(_get(doc, self.field)), doc['_id']))
+
+    def discard(self):
+        self.stale += 1
+
+    def _valid(self, docs: Dict, entry: Tuple[int, Any, Any]) -> bool:
+        doc = docs.get(entry[2])
+        return doc is not None and sort_key(_get(doc, self.field)) == entry[:2]
+
+    def _refresh(self, docs: Dict):
+        entries = self.entries
+        if self.pending and not entries:
+            self.entries = sorted(set(self.pending))
+            self.pending = []
+        elif self.pending:
+            fresh = []
+            for entry in set(self.pending):
+                position = bisect_left(entries, entry)
+                if position == len(entries) or entries[position] != entry:
+                    fresh.append(entry)
+            self.pending = []
+            if len(fresh) < 64:
+                for entry in fresh:
+                    insort(entries, entry)
+            else:
+                entries.extend(fresh)
+                entries.sort()
+
+        if self.stale > len(self.entries) // 4:
+            self.entries = [entry for entry in self.entries if self._valid(docs, entry)]
+            self.stale = 0
+
+    def iterate(self, docs: Dict, descending: bool,
+                upper: Any = _MISSING, lower: Any = _MISSING) -> Iterator[Dict]:
+        self._refresh(docs)
+
+        entries = self.entries
+        start, stop = 0, len(entries)
+        if lower is not _MISSING:
+            start = bisect_left(entries, sort_key(lower))
+        if upper is not _MISSING:
+            # Entradas com o mesmo valor ficam antes do limite superior
+            stop = bisect_right(entries, (*sort_key(upper), _MaxId()))
+
+        positions = range(stop - 1, start - 1, -1) if descending else range(start, stop)
+        for position in positions:
+            entry = entries[position]
+            if self._valid(docs, entry):
+                yield docs[entry[2]]
+
+
+class _MaxId:
+    """Sentinela maior que qualquer _id (limite superior de bisect)"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, _MaxId)
+
+
+def _bound(query: Dict, field: str, ops: Tuple[str, ...]) -> Any:
+    """Limite implícito de `field` em um filtro (_MISSING se não houver)
+
+    ops=('$lt', '$lte') extrai o limite superior; ('$gt', '$gte') o inferior.
+    Entende igualdade, operadores de intervalo, $and e $or (limite mais
+    frouxo entre os ramos).
+    """
+    upper = ops[0] == '$lt'
+    pick = min if upper else max
+    relax = max if upper else min
+    bounds = []
+
+    for key, condition in query.items():
+        if key == '$and':
+            bounds += [b for b in (_bound(sub, field, ops) for sub in condition) if b is not _MISSING]
+        elif key == '$or':
+            branch = [_bound(sub, field, ops) for sub in condition]
+            if branch and all(b is not _MISSING for b in branch):
+                bounds.append(relax(branch, key=sort_key))
+        elif key == field:
+            if isinstance(condition, dict) and any(k.startswith('$') for k in condition):
+                bounds += [condition[op] for op in ops if op in condition]
+            elif not isinstance(condition, (dict, list, re.Pattern)) and condition is not None:
+                bounds.append(condition)
+
+    return pick(bounds, key=sort_key) if bounds else _MISSING
+
+
+# ========== COLLECTION ==========
+
+class MemoryCollection:
+    """Collection em memória com a interface usada do pymongo.Collection"""
+
+    # Atributos com o conteúdo da collection (movidos por rename)
+    _STATE = ('exists', 'options', '_docs', '_index_specs', '_hash', '_sorted',
+              '_unique', '_text_index', '_text_weights', '_text_postings', '_text_docs',
+              '_seq', '_next_seq')
+
+    def __init__(self, database: 'MemoryDatabase', name: str):
+        self.database = database
+        self.name = name
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self, options: Optional[Dict] = None):
+        """Estado vazio; a collection passa a existir na primeira escrita"""
+        self.exists = False
+        self.options = options or {}
+        self._docs: Dict[Any, Dict] = {}
+        self._index_specs: Dict[str, Dict[str, Any]] = {'_id_': {'key': [('_id', 1)], 'v': 2}}
+        self._hash: Dict[str, Dict[Any, Set]] = {}
+        self._sorted: Dict[str, _SortedIndex] = {}
+        # nome -> (campos, predicado do partialFilterExpression, chave -> _id)
+        self._unique: Dict[str, Tuple[List[str], Optional[Callable], Dict[Tuple, Any]]] = {}
+        # Índice de texto (um por collection): campo -> peso, palavra -> ids e
+        # _id -> palavras de cada campo (evita normalizar o texto a cada busca)
+        self._text_index: Optional[str] = None
+        self._text_weights: Dict[str, int] = {}
+        self._text_postings: Dict[str, Set] = defaultdict(set)
+        self._text_docs: Dict[Any, List[List[str]]] = {}
+        # Ordem de inserção (ordem natural dos resultados sem sort)
+        self._seq: Dict[Any, int] = {}
+        self._next_seq = 0
+
+    # ---------- índices ----------
+
+    def create_indexes(self, indexes: List[Any]) -> List[str]:
+        names = []
+        with self._lock:
+            self.exists = True
+            for model in indexes:
+                document = dict(model.document)
+                keys = list(document['key'].items())
+                name = document['name']
+                self._index_specs[name] = {**document, 'key': keys}
+                names.append(name)
+
+                for field, direction in keys:
+                    if field == '_id' or direction in ('text', 'hashed', '2dsphere'):
+                        continue
+                    if direction == -1:
+                        self._ensure_sorted(field)
+                    else:
+                        self._ensure_hash(field)
+
+                if document.get('unique'):
+                    self._ensure_unique(name, [field for field, _ in keys],
+                                        document.get('partialFilterExpression'))
+
+                text_fields = [field for field, direction in keys if direction == 'text']
+                if text_fields:
+                    weights = document.get('weights', {})
+                    self._ensure_text(name, {field: weights.get(field, 1) for field in text_fields})
+        return names
+
+    def _ensure_hash(self, field: str):
+        if field in self._hash:
+            return
+        index: Dict[Any, Set] = defaultdict(set)
+        for _id, doc in self._docs.items():
+            for value in self._hash_values(doc, field):
+                index[value].add(_id)
+        self._hash[field] = index
+
+    def _ensure_sorted(self, field: str):
+        if field in self._sorted:
+            return
+        index = _SortedIndex(field)
+        for doc in self._docs.values():
+            index.add(doc)
+        self._sorted[field] = index
+
+    def _ensure_unique(self, name: str, fields: List[str], partial: Optional[Dict]):
+        seen: Dict[Tuple, Any] = {}
+        partial = compile_query(partial) if partial is not None else None
+        for _id, doc in self._docs.items():
+            if partial is None or partial(doc):
+                key = self._unique_key(doc, fields)
+                if key in seen:
+                    raise DuplicateKeyError(f"E11000 duplicate key error index: {name}",
+                                            DUPLICATE_KEY_ERROR)
+                seen[key] = _id
+        self._unique[name] = (fields, partial, seen)
+
+    def _ensure_text(self, name: str, weights: Dict[str, int]):
+        if self._text_index == name:
+            return
+        if self._text_index is not None:
+            raise OperationFailure(f"Índice de texto já existe: {self._text_index}", code=85)
+        self._text_index = name
+        self._text_weights = weights
+        for doc in self._docs.values():
+            self._index_text(doc)
+
+    def _index_text(self, doc: Dict):
+        _id = doc['_id']
+        fields = [text_tokens(_get(doc, field)) for field in self._text_weights]
+        self._text_docs[_id] = fields
+        for word in set().union(*fields):
+            self._text_postings[word].add(_id)
+
+    def _unindex_text(self, doc: Dict):
+        fields = self._text_docs.pop(doc['_id'], [])
+        for word in set().union(*fields):
+            members = self._text_postings.get(word)
+            if members is not None:
+                members.discard(doc['_id'])
+                if not members:
+                    del self._text_postings[word]
+
+    @staticmethod
+    def _hash_values(doc: Dict, field: str) -> List[Any]:
+        value = _get(doc, field)
+        if value is _MISSING:
+            return [None]
+        values = value if isinstance(value, list) else [value]
+        return [_hashable(item) for item in values]
+
+    @staticmethod
+    def _unique_key(doc: Dict, fields: List[str]) -> Tuple:
+        return tuple(_hashable(None if _get(doc, f) is _MISSING else _get(doc, f)) for f in fields)
+
+    def index_information(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(spec) for name, spec in self._index_specs.items()}
+
+    def drop_index(self, name: str):
+        with self._lock:
+            if name not in self._index_specs or name == '_id_':
+                raise OperationFailure(f"index not found with name [{name}]")
+            del self._index_specs[name]
+            self._unique.pop(name, None)
+            if name == self._text_index:
+                self._text_index = None
+                self._text_weights = {}
+                self._text_postings = defaultdict(set)
+                self._text_docs = {}
+
+    # ---------- armazenamento ----------
+
+    def _check_unique(self, doc: Dict) -> List[Tuple[Dict[Tuple, Any], Tuple]]:
+        """Valida os índices únicos e retorna as chaves a registrar em _index"""
+        keys = []
+        for name, (fields, partial, seen) in self._unique.items():
+            if partial is not None and not partial(doc):
+                continue
+            key = self._unique_key(doc, fields)
+            owner = seen.get(key)
+            if owner is not None and owner != doc['_id']:
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.name} index: {name} "
+                    f"dup key: {dict(zip(fields, key))}", DUPLICATE_KEY_ERROR
+                )
+            keys.append((seen, key))
+        return keys
+
+    def _index(self, doc: Dict, unique_keys: List[Tuple[Dict[Tuple, Any], Tuple]]):
+        _id = doc['_id']
+        for field, index in self._hash.items():
+            value = doc.get(field, _MISSING) if '.' not in field else _get(doc, field)
+            if isinstance(value, (list, dict)) or value is _MISSING:
+                for item in self._hash_values(doc, field):
+                    index[item].add(_id)
+            else:
+                index[value].add(_id)
+        for index in self._sorted.values():
+            index.add(doc)
+        for seen, key in unique_keys:
+            seen[key] = _id
+        if self._text_weights:
+            self._index_text(doc)
+
+    def _unindex(self, doc: Dict):
+        _id = doc['_id']
+        for field, index in self._hash.items():
+            for value in self._hash_values(doc, field):
+                members = index.get(value)
+                if members is not None:
+                    members.discard(_id)
+                    if not members:
+                        del index[value]
+        for index in self._sorted.values():
+            index.discard()
+        for fields, partial, seen in self._unique.values():
+            key = self._unique_key(doc, fields)
+            if seen.get(key) == _id:
+                del seen[key]
+        if self._text_weights:
+            self._unindex_text(doc)
+
+    def _insert(self, doc: Dict) -> Any:
+        if '_id' not in doc:
+            doc['_id'] = ObjectId()
+        stored = _clone(doc)
+        if stored['_id'] in self._docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.name} index: _id_",
+                DUPLICATE_KEY_ERROR
+            )
+        unique_keys = self._check_unique(stored)
+        self.exists = True
+        self._docs[stored['_id']] = stored
+        self._seq[stored['_id']] = self._next_seq
+        self._next_seq += 1
+        self._index(stored, unique_keys)
+        return stored['_id']
+
+    def _replace(self, old: Dict, new: Dict):
+        unique_keys = self._check_unique(new)
+        self._unindex(old)
+        self._docs[new['_id']] = new
+        self._index(new, unique_keys)
+
+    def _remove(self, doc: Dict):
+        self._unindex(doc)
+        del self._docs[doc['_id']]
+        del self._seq[doc['_id']]
+
+    # ---------- busca textual ----------
+
+    def _text_match(self, spec: Dict) -> Tuple[Set, Set[str]]:
+        """Ids que atendem um $text e as palavras usadas na pontuação"""
+        if not self._text_weights:
+            raise OperationFailure("text index required for $text query", code=27)
+        words, phrases, negated = parse_text_search(spec.get('$search', ''))
+        postings = self._text_postings
+        ids = set().union(*(postings.get(word, ()) for word in words)) if words else set()
+        # Uma frase exige todas as suas palavras (conferência barata antes do texto)
+        for word in {word for phrase in phrases for word in phrase.split()}:
+            ids.intersection_update(postings.get(word, ()))
+        for word in negated:
+            ids.difference_update(postings.get(word, ()))
+
+        if phrases:
+            docs = self._text_docs
+            ids = {_id for _id in ids
+                   if all(any(f" {phrase} " in f" {' '.join(tokens)} " for tokens in docs[_id])
+                          for phrase in phrases)}
+        return ids, words
+
+    def _text_score(self, _id: Any, words: Set[str]) -> float:
+        """textScore aproximado: por campo, cada palavra encontrada soma
+        peso * (0.5 + 0.5 * frequência relativa)"""
+        score = 0.0
+        for weight, tokens in zip(self._text_weights.values(), self._text_docs[_id]):
+            hits = [token for token in tokens if token in words]
+            if hits:
+                relative = 0.5 / len(tokens)
+                score += weight * sum(0.5 + relative * count for count in Counter(hits).values())
+        return score
+
+    # ---------- planejamento ----------
+
+    def _terms(self, query: Dict, exact: bool = False) -> Optional[List[List[Set]]]:
+        """Condições atendidas pelos índices hash
+
+        Cada termo é uma lista de conjuntos de ids cuja união satisfaz a
+        condição (um conjunto por valor de $in). Com exact=True, retorna None
+        se alguma condição do filtro não for resolvida só pelos índices.
+        """
+        terms: List[List[Set]] = []
+        for key, condition in query.items():
+            if key == '$and' and not exact:
+                for sub in condition:
+                    terms += self._terms(sub)
+            elif key == '$or' and not exact:
+                branches = [self._resolve(self._terms(sub), 0) for sub in condition]
+                if branches and all(ids is not None for ids in branches):
+                    terms.append(branches)
+            elif key == '_id':
+                values = self._equality_values(condition)
+                if values is not None:
+                    terms.append([{value for value in values if value in self._docs}])
+                elif exact:
+                    return None
+            elif key in self._hash:
+                values = self._equality_values(condition)
+                if values is not None and (not exact or all(isinstance(v, _SET_TYPES) for v in values)):
+                    index = self._hash[key]
+                    terms.append([index.get(_hashable(value), set()) for value in values])
+                elif exact:
+                    return None
+            elif exact:
+                return None
+        return terms
+
+    @staticmethod
+    def _resolve(terms: List[List[Set]], enough: int = 32) -> Optional[Set]:
+        """Interseção dos termos, do mais seletivo ao menos seletivo
+
+        Para quando restam `enough` candidatos ou menos (o filtro ainda é
+        avaliado em cada documento). Os conjuntos dos índices nunca são
+        alterados.
+        """
+        if not terms:
+            return None
+        ordered = sorted(terms, key=lambda sets: sum(len(ids) for ids in sets))
+        first = ordered[0]
+        best = first[0] if len(first) == 1 else set().union(*first)
+        for sets in ordered[1:]:
+            if len(best) <= enough:
+                break
+            if len(sets) == 1:
+                best = best & sets[0]
+            else:
+                best = {_id for _id in best if any(_id in ids for ids in sets)}
+        return best
+
+    @staticmethod
+    def _estimate(terms: List[List[Set]]) -> int:
+        return min(sum(len(ids) for ids in sets) for sets in terms)
+
+    def _exact_ids(self, query: Dict) -> Optional[Set]:
+        """Ids resolvidos só pelos índices hash (None = filtro exige avaliação)
+
+        Vale para filtros de igualdade/$in em campos indexados com valores
+        string, ObjectId ou data, usados para contar sem ler os documentos.
+        """
+        terms = self._terms(query, exact=True)
+        if not terms:
+            return None
+        return self._resolve(terms, enough=-1)
+
+    @staticmethod
+    def _equality_values(condition: Any) -> Optional[List[Any]]:
+        if isinstance(condition, dict) and any(key.startswith('$') for key in condition):
+            if '$in' in condition:
+                return list(condition['$in'])
+            return None
+        if isinstance(condition, (dict, list, re.Pattern)):
+            return None
+        return [condition]
+
+    def _plan(self, query: Dict, sort: Optional[List[Tuple[str, Any]]], limit: int,
+              text_ids: Optional[Set] = None) -> Tuple[str, Iterable[Dict], bool]:
+        """Escolhe o acesso: (estágio, documentos, já ordenados?)
+
+        Com sort + limit em um campo com índice ordenado, percorre o índice a
+        menos que os índices hash reduzam os candidatos a poucos documentos.
+        Com $text, os candidatos vêm do índice de texto (`text_ids`), ou do
+        índice ordenado quando o texto casa com muitos documentos.
+        """
+        terms = self._terms(query)
+        sorted_index = None
+        if sort:
+            field, order = sort[0]
+            tail_ok = len(sort) == 1 or (len(sort) == 2 and sort[1] == ('_id', order))
+            if field in self._sorted and tail_ok:
+                sorted_index = (self._sorted[field], order < 0)
+
+        if text_ids is not None:
+            if sorted_index is not None and limit and len(text_ids) > max(1000, limit * 20):
+                index, descending = sorted_index
+                upper = _bound(query, index.field, ('$lt', '$lte'))
+                lower = _bound(query, index.field, ('$gt', '$gte'))
+                docs = index.iterate(self._docs, descending, upper, lower)
+                return 'IXSCAN', (doc for doc in docs if doc['_id'] in text_ids), True
+            candidates = self._resolve(terms) if terms else None
+            if candidates is None or len(candidates) > len(text_ids):
+                candidates = text_ids
+            return 'IXSCAN', (self._docs[_id] for _id in candidates if _id in text_ids), False
+
+        if terms and (sorted_index is None or not limit
+                      or self._estimate(terms) <= max(1000, limit * 20)):
+            candidates = self._resolve(terms)
+            return 'IXSCAN', (self._docs[_id] for _id in candidates if _id in self._docs), False
+
+        if sorted_index is not None:
+            index, descending = sorted_index
+            upper = _bound(query, index.field, ('$lt', '$lte'))
+            lower = _bound(query, index.field, ('$gt', '$gte'))
+            return 'IXSCAN', index.iterate(self._docs, descending, upper, lower), True
+
+        # Intervalo sem ordenação (ex.: $match por período de uma agregação)
+        for field, index in self._sorted.items():
+            upper = _bound(query, field, ('$lt', '$lte'))
+            lower = _bound(query, field, ('$gt', '$gte'))
+            if upper is not _MISSING or lower is not _MISSING:
+                return 'IXSCAN', index.iterate(self._docs, True, upper, lower), False
+
+        return 'COLLSCAN', list(self._docs.values()), False
+
+    def _select(self, query: Optional[Dict], sort: Optional[List[Tuple[str, Any]]] = None,
+                skip: int = 0, limit: int = 0,
+                scores: Optional[Dict[Any, float]] = None) -> List[Dict]:
+        """Documentos (referências internas) que satisfazem o filtro
+
+        Com $text, a pontuação dos documentos retornados é gravada em `scores`.
+        """
+        query = query or {}
+        text = query.get('$text')
+        if text is not None:
+            query = {key: value for key, value in query.items() if key != '$text'}
+        test = compile_query(query)
+        with self._lock:
+            text_ids, words = self._text_match(text) if text is not None else (None, None)
+            _, source, ordered = self._plan(query, sort, (skip + limit) if limit else 0,
+                                            text_ids)
+            if ordered:
+                found = []
+                wanted = skip + limit if limit else None
+                for doc in source:
+                    if test(doc):
+                        found.append(doc)
+                        if wanted is not None and len(found) >= wanted:
+                            break
+            else:
+                found = [doc for doc in source if test(doc)]
+
+            # Pontua apenas os documentos que passaram pelos demais filtros
+            text_scores = None
+            if text is not None:
+                text_scores = {doc['_id']: self._text_score(doc['_id'], words) for doc in found}
+
+            if not ordered:
+                if sort:
+                    found = sort_documents(found, sort, text_scores)
+                elif query:
+                    seq = self._seq
+                    found.sort(key=lambda doc: seq[doc['_id']])
+
+        found = found[skip:]
+        found = found[:limit] if limit else found
+        if scores is not None and text is not None:
+            scores.update((doc['_id'], text_scores[doc['_id']]) for doc in found)
+        return found
+
+    # ---------- leitura ----------
+
+    def find(self, filter: Optional[Dict] = None, projection: Optional[Any] = None,
+             **kwargs) -> 'MemoryCursor':
+        cursor = MemoryCursor(self, filter, projection)
+        if kwargs.get('sort'):
+            cursor.sort(kwargs['sort'])
+        return cursor
+
+    def find_one(self, filter: Optional[Dict] = None, projection: Optional[Any] = None,
+                 **kwargs) -> Optional[Dict]:
+        for doc in self.find(filter, projection, **kwargs).limit(1):
+            return doc
+        return None
+
+    def count_documents(self, filter: Dict, **kwargs) -> int:
+        if not kwargs.get('skip') and not kwargs.get('limit'):
+            with self._lock:
+                if not filter:
+                    return len(self._docs)
+                exact = self._exact_ids(filter)
+                if exact is not None:
+                    return len(exact)
+        return len(self._select(filter, skip=kwargs.get('skip', 0), limit=kwargs.get('limit', 0)))
+
+    def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    def aggregate(self, pipeline: List[Dict], **kwargs) -> 'MemoryCursor':
+        pipeline = list(pipeline)
+        # $match inicial usa os índices
+        query = pipeline.pop(0)['$match'] if pipeline and '$match' in pipeline[0] else {}
+        # $project só de inclusão/exclusão logo após o filtro: copia apenas esses campos
+        projection = pipeline[0].get('$project') if pipeline else None
+        if projection and all(flag in (0, 1, True, False) for flag in projection.values()):
+            pipeline.pop(0)
+            docs = [project(doc, projection) for doc in self._select(query)]
+        else:
+            docs = [_clone(doc) for doc in self._select(query)]
+        return MemoryCursor.from_documents(self, run_pipeline(docs, pipeline))
+
+    # ---------- escrita ----------
+
+    def insert_one(self, document: Dict, **kwargs) -> InsertOneResult:
+        with self._lock:
+            return InsertOneResult(self._insert(document), True)
+
+    def insert_many(self, documents: Iterable[Dict], ordered: bool = True,
+                    **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        inserted, errors = [], []
+        with self._lock:
+            for index, document in enumerate(documents):
+                try:
+                    inserted.append(self._insert(document))
+                except DuplicateKeyError as e:
+                    errors.append({'index': index, 'code': DUPLICATE_KEY_ERROR,
+                                   'errmsg': str(e), 'op': document})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({
+                'writeErrors': errors, 'writeConcernErrors': [], 'nInserted': len(inserted),
+                'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []
+            })
+        return InsertManyResult(inserted, True)
+
+    def _update(self, filter: Dict, update: Dict, upsert: bool = False,
+                multi: bool = False) -> Tuple[int, int, Any, Optional[Dict], Optional[Dict]]:
+        """Atualiza 1 ou N documentos: (matched, modified, upserted_id, antes, depois)"""
+        with self._lock:
+            targets = self._select(filter, limit=0 if multi else 1)
+            if not targets:
+                if not upsert:
+                    return 0, 0, None, None, None
+                seed = _upsert_seed(filter)
+                seed.setdefault('_id', ObjectId())
+                created = apply_update(seed, update, inserting=True)
+                self._insert(created)
+                return 0, 0, created['_id'], None, self._docs[created['_id']]
+
+            modified = 0
+            before = after = None
+            for doc in targets:
+                new = apply_update(doc, update)
+                if new != doc:
+                    self._replace(doc, new)
+                    modified += 1
+                before, after = doc, new
+            return len(targets), modified, None, before, after
+
+    def update_one(self, filter: Dict, update: Dict, upsert: bool = False,
+                   **kwargs) -> UpdateResult:
+        matched, modified, upserted, _, _ = self._update(filter, update, upsert)
+        return UpdateResult({'n': matched or int(upserted is not None), 'nModified': modified,
+                             'upserted': upserted}, True)
+
+    def update_many(self, filter: Dict, update: Dict, upsert: bool = False,
+                    **kwargs) -> UpdateResult:
+        matched, modified, upserted, _, _ = self._update(filter, update, upsert, multi=True)
+        return UpdateResult({'n': matched or int(upserted is not None), 'nModified': modified,
+                             'upserted': upserted}, True)
+
+    def find_one_and_update(self, filter: Dict, update: Dict, projection: Optional[Any] = None,
+                            upsert: bool = False, return_document: bool = ReturnDocument.BEFORE,
+                            **kwargs) -> Optional[Dict]:
+        _, _, upserted, before, after = self._update(filter, update, upsert)
+        if upserted is not None:
+            return project(after, projection) if return_document == ReturnDocument.AFTER else None
+        if before is None:
+            return None
+        chosen = after if return_document == ReturnDocument.AFTER else before
+        return project(chosen, projection)
+
+    def find_one_and_delete(self, filter: Dict, projection: Optional[Any] = None,
+                            **kwargs) -> Optional[Dict]:
+        with self._lock:
+            targets = self._select(filter, limit=1)
+            if not targets:
+                return None
+            self._remove(targets[0])
+            return project(targets[0], projection)
+
+    def delete_one(self, filter: Dict, **kwargs) -> DeleteResult:
+        with self._lock:
+            targets = self._select(filter, limit=1)
+            for doc in targets:
+                self._remove(doc)
+            return DeleteResult({'n': len(targets)}, True)
+
+    def delete_many(self, filter: Dict, **kwargs) -> DeleteResult:
+        with self._lock:
+            targets = self._select(filter)
+            for doc in targets:
+                self._remove(doc)
+            return DeleteResult({'n': len(targets)}, True)
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        """Executa UpdateOne/UpdateMany/InsertOne/DeleteOne/DeleteMany em sequência"""
+        details: Dict[str, Any] = {
+            'writeErrors': [], 'writeConcernErrors': [], 'nInserted': 0, 'nUpserted': 0,
+            'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []
+        }
+        with self._lock:
+            for index, request in enumerate(requests):
+                kind = type(request).__name__
+                try:
+                    if kind in ('UpdateOne', 'UpdateMany'):
+                        matched, modified, upserted, _, _ = self._update(
+                            request._filter, request._doc, bool(request._upsert),
+                            multi=kind == 'UpdateMany'
+                        )
+                        details['nMatched'] += matched
+                        details['nModified'] += modified
+                        if upserted is not None:
+                            details['nUpserted'] += 1
+                            details['upserted'].append({'index': index, '_id': upserted})
+                    elif kind == 'InsertOne':
+                        self._insert(request._doc)
+                        details['nInserted'] += 1
+                    elif kind in ('DeleteOne', 'DeleteMany'):
+                        targets = self._select(request._filter, limit=0 if kind == 'DeleteMany' else 1)
+                        for doc in targets:
+                            self._remove(doc)
+                        details['nRemoved'] += len(targets)
+                    else:
+                        raise OperationFailure(f"Operação não suportada: {kind}")
+                except DuplicateKeyError as e:
+                    details['writeErrors'].append({'index': index, 'code': DUPLICATE_KEY_ERROR,
+                                                   'errmsg': str(e)})
+                    if ordered:
+                        break
+
+        if details['writeErrors']:
+            raise BulkWriteError(details)
+        return BulkWriteResult(details, True)
+
+    # ---------- administração ----------
+
+    def with_options(self, **kwargs) -> 'MemoryCollection':
+        """Write/read concern não se aplicam ao backend em memória"""
+        return self
+
+    def watch(self, *args, **kwargs):
+        """Sem change streams: mesmo erro de um servidor standalone"""
+        raise OperationFailure("The $changeStream stage is only supported on replica sets",
+                               code=40573)
+
+    def drop(self, **kwargs):
+        with self._lock:
+            self._reset()
+
+    def rename(self, new_name: str, dropTarget: bool = False, **kwargs):
+        self.database._rename(self.name, new_name, dropTarget)
+
+
+# ========== CURSOR ==========
+
+class MemoryCursor:
+    """Cursor preguiçoso: a consulta é executada na primeira iteração"""
+
+    def __init__(self, collection: MemoryCollection, filter: Optional[Dict] = None,
+                 projection: Optional[Any] = None):
+        self.collection = collection
+        self._filter = filter or {}
+        self._projection = projection
+        self._sort: Optional[List[Tuple[str, Any]]] = None
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[Dict]] = None
+
+    @classmethod
+    def from_documents(cls, collection: MemoryCollection, documents: List[Dict]) -> 'MemoryCursor':
+        cursor = cls(collection)
+        cursor._results = documents
+        return cursor
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> 'MemoryCursor':
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> 'MemoryCursor':
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> 'MemoryCursor':
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int) -> 'MemoryCursor':
+        return self
+
+    def _fetch(self) -> List[Dict]:
+        if self._results is None:
+            scores: Dict[Any, float] = {}
+            docs = self.collection._select(self._filter, self._sort, self._skip, self._limit,
+                                           scores)
+            self._results = [project(doc, self._projection, scores) for doc in docs]
+        return self._results
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._fetch())
+
+    def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        docs = self._fetch()
+        return list(docs if length is None else docs[:length])
+
+    def explain(self) -> Dict[str, Any]:
+        """Plano no formato de explain() (IXSCAN/COLLSCAN)"""
+        collection = self.collection
+        with collection._lock:
+            text = self._filter.get('$text')
+            query = {key: value for key, value in self._filter.items() if key != '$text'}
+            text_ids = collection._text_match(text)[0] if text is not None else None
+            stage, _, _ = collection._plan(query, self._sort, self._limit, text_ids)
+        return {'queryPlanner': {'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': stage}}}}
+
+    def close(self):
+        pass
+
+
+# ========== DATABASE / CLIENT ==========
+
+class MemoryDatabase:
+    """Banco em memória (collections criadas sob demanda)"""
+
+    def __init__(self, client: 'MemoryClient', name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = self._collections[name] = MemoryCollection(self, name)
+            return collection
+
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        return self[name]
+
+    def create_collection(self, name: str, **options) -> MemoryCollection:
+        with self._lock:
+            collection = self[name]
+            if collection.exists:
+                raise OperationFailure(f"Collection {self.name}.{name} already exists")
+            collection._reset(options)
+            collection.exists = True
+            return collection
+
+    def list_collections(self, filter: Optional[Dict] = None, **kwargs) -> List[Dict[str, Any]]:
+        with self._lock:
+            infos = [
+                {'name': name,
+                 'type': 'timeseries' if 'timeseries' in collection.options else 'collection',
+                 'options': dict(collection.options)}
+                for name, collection in self._collections.items() if collection.exists
+            ]
+        test = compile_query(filter)
+        return [info for info in infos if test(info)]
+
+    def command(self, command: Any, value: Any = 1, **kwargs) -> Dict[str, Any]:
+        if command == 'collMod':
+            options = self[value].options
+            for key, setting in kwargs.items():
+                if key == 'expireAfterSeconds' and setting == 'off':
+                    options.pop(key, None)
+                else:
+                    options[key] = setting
+        return {'ok': 1.0}
+
+    def watch(self, *args, **kwargs):
+        """Sem change streams: mesmo erro de um servidor standalone"""
+        raise OperationFailure("The $changeStream stage is only supported on replica sets",
+                               code=40573)
+
+    def _rename(self, old: str, new: str, drop_target: bool):
+        with self._lock:
+            source, target = self[old], self[new]
+            if not source.exists:
+                raise OperationFailure(f"source namespace does not exist: {old}")
+            if target.exists and not drop_target:
+                raise OperationFailure(f"target namespace exists: {new}")
+            # Os objetos continuam associados ao nome; o conteúdo é que muda de nome
+            with source._lock, target._lock:
+                for attr in MemoryCollection._STATE:
+                    setattr(target, attr, getattr(source, attr))
+                source._reset()
+
+
+class MemoryClient:
+    """Substituto de MongoClient; clients criados sem `store` compartilham os dados
+    do processo (como um servidor)"""
+
+    _shared: Dict[str, MemoryDatabase] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, *args, store: Optional[Dict[str, MemoryDatabase]] = None, **kwargs):
+        self._databases = MemoryClient._shared if store is None else store
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        with MemoryClient._shared_lock:
+            database = self._databases.get(name)
+            if database is None:
+                database = self._databases[name] = MemoryDatabase(self, name)
+            return database
+
+    def server_info(self) -> Dict[str, Any]:
+        return {'version': 'memory', 'ok': 1.0}
+
+    def close(self):
+        pass
+
+
+# ========== ADAPTADOR ASSÍNCRONO ==========
+# Mesma interface do AsyncMongoClient: operações são corrotinas, cursores
+# oferecem to_list() e iteração assíncrona. O trabalho é feito em memória,
+# sem I/O, por isso as corrotinas executam de forma síncrona.
+
+class AsyncMemoryCursor:
+
+    def __init__(self, cursor: MemoryCursor):
+        self._cursor = cursor
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> 'AsyncMemoryCursor':
+        self._cursor.sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> 'AsyncMemoryCursor':
+        self._cursor.skip(count)
+        return self
+
+    def limit(self, count: int) -> 'AsyncMemoryCursor':
+        self._cursor.limit(count)
+        return self
+
+    def batch_size(self, size: int) -> 'AsyncMemoryCursor':
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        return self._cursor.to_list(length)
+
+    async def explain(self) -> Dict[str, Any]:
+        return self._cursor.explain()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._cursor:
+            yield doc
+
+    async def close(self):
+        pass
+
+
+class AsyncMemoryCollection:
+
+    def __init__(self, collection: MemoryCollection):
+        self._collection = collection
+        self.name = collection.name
+
+    def find(self, *args, **kwargs) -> AsyncMemoryCursor:
+        return AsyncMemoryCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs) -> AsyncMemoryCursor:
+        return AsyncMemoryCursor(self._collection.aggregate(*args, **kwargs))
+
+    def with_options(self, **kwargs) -> 'AsyncMemoryCollection':
+        return self
+
+    def __getattr__(self, name: str):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncMemoryDatabase:
+
+    def __init__(self, database: MemoryDatabase):
+        self._database = database
+        self.name = database.name
+
+    def __getitem__(self, name: str) -> AsyncMemoryCollection:
+        return AsyncMemoryCollection(self._database[name])
+
+    def get_collection(self, name: str, **kwargs) -> AsyncMemoryCollection:
+        return self[name]
+
+    async def list_collections(self, *args, **kwargs) -> AsyncMemoryCursor:
+        infos = self._database.list_collections(*args, **kwargs)
+        return AsyncMemoryCursor(MemoryCursor.from_documents(None, infos))
+
+    async def create_collection(self, name: str, **options) -> AsyncMemoryCollection:
+        return AsyncMemoryCollection(self._database.create_collection(name, **options))
+
+    async def command(self, *args, **kwargs) -> Dict[str, Any]:
+        return self._database.command(*args, **kwargs)
+
+    async def watch(self, *args, **kwargs):
+        return self._database.watch(*args, **kwargs)
+
+
+class AsyncMemoryClient:
+
+    def __init__(self, *args, **kwargs):
+        self._client = MemoryClient(*args, **kwargs)
+
+    def __getitem__(self, name: str) -> AsyncMemoryDatabase:
+        return AsyncMemoryDatabase(self._client[name])
+
+    async def server_info(self) -> Dict[str, Any]:
+        return self._client.server_info()
+
+    async def close(self):
+        pass
@@ -318,7 +318,7 @@ class NotificationManager:
             return
         
         log_data = {
-            'alert_id': alert_id,
+            'alert_id': str(alert_id),
             'notification_type': notif_type,
             'recipient': recipient,
             'status': status,
@@ -327,4 +327,4 @@ class NotificationManager:
             'message': f"Notificação {status}: {notif_type} para {recipient}"
         }
         
-        self.db.insert_log(log_data)
+        self.db.insert_log(log_data, site='notification_log')
@@ -0,0 +1,218 @@
+"""
+Pool de Conexões e Instrumentação
+Configuração do pool do MongoClient por perfil (api/worker) e listeners de
+eventos do pymongo com métricas de checkout, saturação e latência por comando
+"""
+
+import os
+import statistics
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List, Any, Deque
+
+from pymongo import monitoring
+
+# Padrões por perfil: a API atende muitas requisições concorrentes e deve falhar
+# rápido na espera por conexão; o worker (main.py) tem pouca concorrência.
+POOL_PROFILES: Dict[str, Dict[str, int]] = {
+    'api': {
+        'maxPoolSize': 100,
+        'minPoolSize': 10,
+        'maxIdleTimeMS': 60_000,
+        'waitQueueTimeoutMS': 2_000,
+        'maxConnecting': 4,
+        'serverSelectionTimeoutMS': 5_000,
+    },
+    'worker': {
+        'maxPoolSize': 10,
+        'minPoolSize': 0,
+        'maxIdleTimeMS': 300_000,
+        'waitQueueTimeoutMS': 10_000,
+        'maxConnecting': 2,
+        'serverSelectionTimeoutMS': 5_000,
+    },
+}
+
+# Opção do MongoClient -> sufixo da variável de ambiente
+_ENV_NAMES = {
+    'maxPoolSize': 'MAX_POOL_SIZE',
+    'minPoolSize': 'MIN_POOL_SIZE',
+    'maxIdleTimeMS': 'MAX_IDLE_TIME_MS',
+    'waitQueueTimeoutMS': 'WAIT_QUEUE_TIMEOUT_MS',
+    'maxConnecting': 'MAX_CONNECTING',
+    'serverSelectionTimeoutMS': 'SERVER_SELECTION_TIMEOUT_MS',
+}
+
+# Amostras mantidas para os percentis
+_SAMPLE_SIZE = 1024
+
+
+def pool_options(profile: str) -> Dict[str, int]:
+    """Opções do pool para o perfil
+
+    Cada opção pode ser sobrescrita por MONGO_<PERFIL>_<OPÇÃO> (ex.:
+    MONGO_API_MAX_POOL_SIZE) ou, para todos os perfis, MONGO_<OPÇÃO>.
+    """
+    options = dict(POOL_PROFILES.get(profile, POOL_PROFILES['worker']))
+    for option, suffix in _ENV_NAMES.items():
+        value = os.getenv(f"MONGO_{profile.upper()}_{suffix}") or os.getenv(f"MONGO_{suffix}")
+        if value:
+            options[option] = int(value)
+    # maxPoolSize=0 significa sem limite
+    if options['maxPoolSize']:
+        options['minPoolSize'] = min(options['minPoolSize'], options['maxPoolSize'])
+    return options
+
+
+def _summary(samples: Deque[float]) -> Dict[str, float]:
+    """Percentis (ms) de uma janela de amostras"""
+    if not samples:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        p50 = p95 = p99 = ordered[0]
+    else:
+        cuts = statistics.quantiles(ordered, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    return {
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener, monitoring.CommandListener):
+    """Coleta eventos do pool e de comandos do pymongo
+
+    Registrado em event_listeners do client; snapshot() retorna as métricas
+    usadas por GET /metrics. Espera alta no checkout com latência de comando
+    baixa indica fila por conexões (pool pequeno), e o inverso indica servidor
+    lento.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = defaultdict(int)
+        self.checkout_wait: Deque[float] = deque(maxlen=_SAMPLE_SIZE)
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.pools_cleared = 0
+        self.commands: Dict[str, Dict[str, Any]] = {}
+
+    def reset(self):
+        """Zera os contadores"""
+        with self._lock:
+            self._reset()
+
+    # ========== POOL ==========
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkout_failures[str(event.reason)] += 1
+            self.checkout_wait.append(event.duration * 1000)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.checkout_wait.append(event.duration * 1000)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    # ========== COMANDOS ==========
+
+    def _command(self, name: str) -> Dict[str, Any]:
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = {'count': 0, 'failures': 0, 'latency': deque(maxlen=_SAMPLE_SIZE)}
+            self.commands[name] = stats
+        return stats
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        with self._lock:
+            stats = self._command(event.command_name)
+            stats['count'] += 1
+            stats['latency'].append(event.duration_micros / 1000)
+
+    def failed(self, event):
+        with self._lock:
+            stats = self._command(event.command_name)
+            stats['count'] += 1
+            stats['failures'] += 1
+            stats['latency'].append(event.duration_micros / 1000)
+
+    # ========== CONSULTA ==========
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Métricas atuais do pool e dos comandos"""
+        with self._lock:
+            commands: List[Dict[str, Any]] = [
+                {'command': name, 'count': stats['count'],
+                 'failures': stats['failures'], **_summary(stats['latency'])}
+                for name, stats in sorted(self.commands.items())
+            ]
+            return {
+                'pool': {
+                    'max_pool_size': self.max_pool_size,
+                    'checked_out': self.checked_out,
+                    'max_checked_out': self.max_checked_out,
+                    'saturation': round(self.checked_out / self.max_pool_size, 3)
+                    if self.max_pool_size else 0.0,
+                    'waiting': self.waiting,
+                    'max_waiting': self.max_waiting,
+                    'checkouts': self.checkouts,
+                    'checkout_failures': dict(self.checkout_failures),
+                    'checkout_wait': _summary(self.checkout_wait),
+                    'connections_created': self.connections_created,
+                    'connections_closed': self.connections_closed,
+                    'pools_cleared': self.pools_cleared,
+                },
+                'commands': commands,
+            }
@@ -0,0 +1,424 @@
+"""
+Entrega em Tempo Real (Server-Sent Events)
+GET /stream/alerts e GET /stream/logs enviam alertas e logs novos ou alterados
+assim que são gravados, sem polling do frontend
+
+Um único leitor por collection alimenta todas as conexões (PushHub):
+  - change streams (fullDocument) quando disponíveis
+  - sem change streams (servidor standalone, DB_BACKEND=memory, logs
+    time-series): uma consulta a cada PUSH_POLL_INTERVAL segundos pelos
+    documentos novos ou alterados (updated_at em alerts, timestamp em logs),
+    enquanto há conexões; remoções não são detectadas nesse modo
+
+Cada evento tem um id ("<época>-<seq>"). Ao reconectar, o EventSource envia
+Last-Event-ID e os eventos posteriores que ainda estão no buffer
+(PUSH_BUFFER_SIZE) são reenviados antes dos novos. Se o id não está mais no
+buffer (ou é de outro processo), ou se a conexão não acompanhou o ritmo dos
+eventos, ela recebe um evento `reset`: o cliente deve recarregar a lista.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, AsyncIterator, Awaitable, Callable, Set, Tuple
+import logging
+
+from serialization import dumps
+
+SSE_MEDIA_TYPE = 'text/event-stream'
+
+logger = logging.getLogger(__name__)
+
+PUSH_COLLECTIONS = ('alerts', 'logs')
+
+# Filtros por conexão (parâmetros da URL -> campo do documento)
+PUSH_FILTERS: Dict[str, Tuple[str, ...]] = {
+    'alerts': ('severity', 'client_id', 'status'),
+    'logs': ('level', 'origin'),
+}
+
+# Nome do evento SSE e chave do documento no payload
+EVENT_TYPES = {'alerts': 'alert', 'logs': 'log'}
+RESET_EVENT = 'reset'
+
+# Campo consultado pelo leitor por polling
+POLL_FIELDS = {'alerts': 'updated_at', 'logs': 'timestamp'}
+
+PUSH_OPERATIONS = ('insert', 'update', 'replace', 'delete')
+
+# Item da fila de uma conexão: (seq, operação, documento); operação RESET_EVENT
+# pede que o cliente recarregue
+Item = Tuple[int, str, Optional[Dict]]
+
+
+def push_enabled(default: bool) -> bool:
+    """PUSH_ENABLED sobrescreve o padrão do gerenciador"""
+    value = os.getenv('PUSH_ENABLED')
+    return default if value is None else value != '0'
+
+
+def poll_interval() -> float:
+    return float(os.getenv('PUSH_POLL_INTERVAL', '2'))
+
+
+def poll_limit() -> int:
+    """Documentos por consulta do leitor por polling"""
+    return int(os.getenv('PUSH_POLL_LIMIT', '1000'))
+
+
+def poll_max_pages() -> int:
+    """Consultas por rodada antes de desistir de alcançar as gravações (reset)"""
+    return int(os.getenv('PUSH_POLL_MAX_PAGES', '10'))
+
+
+def heartbeat_interval() -> float:
+    return float(os.getenv('PUSH_HEARTBEAT', '15'))
+
+
+def idle_grace() -> float:
+    return float(os.getenv('PUSH_IDLE_GRACE', '60'))
+
+
+def parse_push_filters(collection_name: str, values: Dict[str, Optional[str]]) -> Dict[str, Set[str]]:
+    """Parâmetros da conexão -> {campo: valores aceitos} ('a,b' = qualquer um)
+
+    ValueError para filtro não suportado pela collection.
+    """
+    filters: Dict[str, Set[str]] = {}
+    for name, value in values.items():
+        if not value or value == 'all':
+            continue
+        if name not in PUSH_FILTERS[collection_name]:
+            raise ValueError(f"Filtro não suportado em /stream/{collection_name}: {name}")
+        accepted = {item.strip() for item in value.split(',') if item.strip()}
+        filters[name] = {item.upper() for item in accepted} if name == 'level' else accepted
+    return filters
+
+
+def matches_filters(document: Optional[Dict], filters: Dict[str, Set[str]]) -> bool:
+    """Remoções (sem documento) passam por qualquer filtro"""
+    if document is None:
+        return True
+    return all(document.get(name) in accepted for name, accepted in filters.items())
+
+
+def change_event(change: Dict) -> Optional[Tuple[str, Dict]]:
+    """Evento do change stream -> (operação, documento)
+
+    Remoções levam apenas o _id; None se o documento já não existe (update
+    seguido de remoção antes do lookup).
+    """
+    operation = change.get('operationType')
+    if operation == 'delete':
+        return operation, {'_id': change['documentKey']['_id']}
+    document = change.get('fullDocument')
+    if document is None:
+        return None
+    return operation, document
+
+
+def sse_frame(event: str, data: Any, event_id: Optional[str] = None) -> bytes:
+    """Evento no formato text/event-stream"""
+    head = f"id: {event_id}\n" if event_id else ''
+    return f"{head}event: {event}\ndata: ".encode() + dumps(data) + b"\n\n"
+
+
+class Subscription:
+    """Fila de uma conexão (limitada: quem não acompanha recebe reset)"""
+
+    def __init__(self, filters: Dict[str, Set[str]], queue_size: int):
+        self.filters = filters
+        self.queue: 'asyncio.Queue[Item]' = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, item: Item) -> bool:
+        """Enfileira o item; com a fila cheia, descarta a fila e pede reset"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((item[0], RESET_EVENT, None))
+            return False
+
+
+class PushHub:
+    """Distribui os eventos de uma collection às conexões, com buffer para retomada
+
+    Usado dentro do event loop (publish e subscribe sem await: sem corridas
+    entre o buffer reenviado e os eventos novos).
+    """
+
+    def __init__(self, collection_name: str, buffer_size: int = 1000, queue_size: int = 1000):
+        self.collection_name = collection_name
+        self.event_type = EVENT_TYPES[collection_name]
+        self.queue_size = queue_size
+        self._buffer: 'deque[Item]' = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+        self._seq = 0
+        self._new_epoch()
+        self.stats = {
+            'published': 0,
+            'replayed': 0,
+            'resets': 0,
+            'lagged': 0,
+        }
+
+    @classmethod
+    def from_env(cls, collection_name: str) -> 'PushHub':
+        """Cria a partir de PUSH_BUFFER_SIZE e PUSH_QUEUE_SIZE"""
+        return cls(
+            collection_name,
+            buffer_size=int(os.getenv('PUSH_BUFFER_SIZE', '1000')),
+            queue_size=int(os.getenv('PUSH_QUEUE_SIZE', '1000')),
+        )
+
+    def _new_epoch(self):
+        # Ids de antes de uma perda de eventos (ou de outro processo) não são retomáveis
+        self.epoch = os.urandom(4).hex()
+        self._buffer.clear()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def publish(self, operation: str, document: Dict):
+        """Novo evento: buffer de retomada e filas das conexões cujo filtro aceita"""
+        self._seq += 1
+        item = (self._seq, operation, document)
+        self._buffer.append(item)
+        self.stats['published'] += 1
+        matched = document if operation != 'delete' else None
+        for subscription in self._subscribers:
+            if matches_filters(matched, subscription.filters) and not subscription.offer(item):
+                self.stats['lagged'] += 1
+
+    def on_change(self, change: Dict):
+        """Evento do feed de alterações (change stream)"""
+        event = change_event(change)
+        if event is not None:
+            self.publish(*event)
+
+    def reset(self):
+        """Eventos podem ter sido perdidos (queda do feed): todas as conexões recarregam"""
+        self._new_epoch()
+        self.stats['resets'] += 1
+        for subscription in self._subscribers:
+            subscription.offer((self._seq, RESET_EVENT, None))
+
+    def subscribe(self, filters: Dict[str, Set[str]],
+                  last_event_id: Optional[str] = None) -> Tuple[Subscription, List[Item]]:
+        """Registra uma conexão; retorna a fila e os itens a reenviar
+
+        Com `last_event_id` fora do buffer, o primeiro item é um reset.
+        """
+        subscription = Subscription(filters, self.queue_size)
+        self._subscribers.add(subscription)
+
+        replay: List[Item] = []
+        if last_event_id:
+            epoch, _, seq = last_event_id.partition('-')
+            oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+            if epoch != self.epoch or not seq.isdigit() or int(seq) < oldest - 1:
+                replay.append((self._seq, RESET_EVENT, None))
+                self.stats['resets'] += 1
+            else:
+                replay.extend(item for item in self._buffer
+                              if item[0] > int(seq) and matches_filters(
+                                  item[2] if item[1] != 'delete' else None, filters))
+                self.stats['replayed'] += len(replay)
+        return subscription, replay
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def frame(self, item: Item) -> bytes:
+        """Item -> evento SSE (`alert`/`log` com op e documento, ou `reset`)"""
+        seq, operation, document = item
+        if operation == RESET_EVENT:
+            return sse_frame(RESET_EVENT, {'reason': 'eventos perdidos; recarregue a lista'},
+                             self.event_id(seq))
+        return sse_frame(self.event_type, {'op': operation, self.event_type: document},
+                         self.event_id(seq))
+
+    def status(self) -> Dict[str, Any]:
+        """Estado do hub para /metrics"""
+        return {
+            'subscribers': self.subscribers,
+            'buffered': len(self._buffer),
+            'last_seq': self._seq,
+            **self.stats,
+        }
+
+
+async def sse_body(hub: PushHub, filters: Dict[str, Set[str]], last_event_id: Optional[str],
+                   is_disconnected: Callable[[], Awaitable[bool]],
+                   heartbeat: Optional[float] = None) -> AsyncIterator[bytes]:
+    """Corpo text/event-stream de uma conexão: reenvio, eventos novos e heartbeats
+
+    A conexão é registrada no hub só quando o corpo começa a ser enviado e
+    removida ao encerrar (inclusive quando o cliente desconecta).
+    """
+    heartbeat = heartbeat or heartbeat_interval()
+    subscription, replay = hub.subscribe(filters, last_event_id)
+    try:
+        # Intervalo de reconexão do EventSource (ms)
+        yield b"retry: 3000\n\n"
+        for item in replay:
+            yield hub.frame(item)
+
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                # Comentário SSE: mantém a conexão viva em proxies
+                yield b": ping\n\n"
+                continue
+            yield hub.frame(item)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+class AsyncPushPoller:
+    """Leitor por consulta periódica, usado quando não há change streams
+
+    Consulta os documentos com `field` a partir do último visto (com uma
+    sobreposição de um intervalo, para gravações que chegam fora de ordem) e
+    ignora os já publicados. Com feed ativo não consulta o banco; sem conexões,
+    continua por PUSH_IDLE_GRACE segundos (reconexões retomam sem lacuna) e
+    depois para, invalidando os ids já emitidos.
+
+    Cada consulta lê até `limit` documentos, em páginas por (field, _id); se
+    após `max_pages` páginas ainda houver documentos (rajada de gravações), o
+    leitor salta para o instante atual e as conexões recebem reset.
+    """
+
+    def __init__(self, collection, hub: PushHub, field: str,
+                 feed=None, interval: Optional[float] = None,
+                 transform: Optional[Callable[[Dict], Dict]] = None,
+                 limit: Optional[int] = None, max_pages: Optional[int] = None):
+        self.collection = collection
+        self.hub = hub
+        self.field = field
+        self.feed = feed
+        self.interval = interval or poll_interval()
+        self.transform = transform
+        self.limit = limit or poll_limit()
+        self.max_pages = max_pages or poll_max_pages()
+        self.idle_grace = idle_grace()
+        self._task: Optional[asyncio.Task] = None
+        self._since: Optional[datetime] = None
+        # Após um salto (rajada), o que foi gravado antes dele não é relido
+        self._floor: Optional[datetime] = None
+        self._idle_since: Optional[float] = None
+        self._seen: Dict[Tuple[Any, datetime], datetime] = {}
+
+    @property
+    def active(self) -> bool:
+        return self.feed is None or self.feed.unsupported
+
+    def start(self):
+        """Inicia a task do leitor (deve ser chamado dentro do event loop)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _idle(self) -> bool:
+        """Sem conexões além do período de tolerância"""
+        if self.hub.subscribers:
+            self._idle_since = None
+            return False
+        now = time.monotonic()
+        if self._idle_since is None:
+            self._idle_since = now
+        return now - self._idle_since > self.idle_grace
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.active:
+                continue
+            if self._idle():
+                if self._since is not None:
+                    # Eventos deste intervalo não serão lidos: ids antigos pedem reset
+                    self._since = None
+                    self._seen = {}
+                    self.hub.reset()
+                continue
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"✗ Erro na leitura de {self.hub.collection_name} para tempo real: {e}")
+
+    async def poll(self):
+        """Publica os documentos novos ou alterados desde a última consulta"""
+        now = datetime.now()
+        if self._since is None:
+            self._since = now
+            return
+
+        overlap = timedelta(seconds=self.interval)
+        start = self._since - overlap
+        if self._floor is not None and self._floor > start:
+            start = self._floor
+        query: Dict[str, Any] = {self.field: {'$gte': start}}
+
+        for _ in range(self.max_pages):
+            found = (self.collection.find(query)
+                     .sort([(self.field, 1), ('_id', 1)])
+                     .limit(self.limit))
+            documents = await found.to_list(None)
+            if documents:
+                last = documents[-1]
+                # Próxima página: depois do último (field, _id) lido
+                query = {'$or': [
+                    {self.field: {'$gt': last[self.field]}},
+                    {self.field: last[self.field], '_id': {'$gt': last['_id']}},
+                ]}
+            self._publish(documents)
+            if len(documents) < self.limit:
+                break
+        else:
+            # Gravações mais rápidas que a leitura: salta para o presente
+            logger.warning(f"⚠ Mais de {self.limit * self.max_pages} alterações em "
+                           f"{self.hub.collection_name} em uma consulta; conexões reiniciadas")
+            self._since = self._floor = now
+            self._seen = {}
+            self.hub.reset()
+            return
+
+        # Chaves fora da janela de sobreposição não voltam a ser lidas
+        self._seen = {key: stamp for key, stamp in self._seen.items()
+                      if stamp and stamp >= self._since - overlap}
+
+    def _publish(self, documents: List[Dict]):
+        for document in documents:
+            if self.transform:
+                document = self.transform(document)
+            stamp = document.get(self.field)
+            key = (document['_id'], stamp)
+            if key in self._seen:
+                continue
+            self._seen[key] = stamp
+            created = self.field == 'timestamp' or document.get('created_at') == stamp
+            self.hub.publish('insert' if created else 'update', document)
+            if stamp and stamp > self._since:
+                self._since = stamp
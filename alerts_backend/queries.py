@@ -0,0 +1,273 @@
+"""
+Consultas Compartilhadas
+Filtros e conversões usados pelos gerenciadores síncrono e assíncrono
+"""
+
+import base64
+import hashlib
+import json
+import re
+from datetime import datetime, date
+from typing import Optional, Dict, List, Any, Iterable, Set, Tuple
+
+from bson.errors import InvalidId
+
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+
+# Status considerados "ativos" (ainda não resolvidos)
+OPEN_STATUSES = ['open', 'in_progress']
+
+# Campos de metadata que distinguem alertas do mesmo tipo para o mesmo cliente
+FINGERPRINT_METADATA = ['product_id', 'nfe_number', 'server', 'database', 'endpoint']
+
+# Projeção padrão ("summary") das listagens: apenas campos escalares.
+# metadata/details ficam de fora e são obtidos em GET /alerts/{id}.
+ALERT_SUMMARY_FIELDS = [
+    'client_id', 'client_name', 'alert_type', 'severity', 'title',
+    'description', 'status', 'source', 'created_at', 'updated_at',
+    'assigned_to', 'resolved_by', 'resolved_at', 'occurrences', 'last_seen'
+]
+LOG_SUMMARY_FIELDS = ['level', 'origin', 'message', 'timestamp', 'alert_id']
+
+# Valor de `fields` que solicita o documento completo
+ALL_FIELDS = '*'
+_FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_.]*$')
+
+
+def to_object_id(alert_id: str) -> ObjectId:
+    """Converte id textual em ObjectId"""
+    return ObjectId(alert_id)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Converte 'a,b,c' em lista de campos (None = projeção padrão)"""
+    if fields is None or not fields.strip():
+        return None
+
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    for name in names:
+        if name != ALL_FIELDS and not _FIELD_NAME.match(name):
+            raise ValueError(f"Campo inválido em fields: {name}")
+    return names
+
+
+def build_projection(fields: Optional[List[str]], default: List[str],
+                     sort_field: str) -> Optional[Dict[str, int]]:
+    """Projeção do find: padrão (summary), campos pedidos ou None (documento completo)
+
+    O campo de ordenação é sempre incluído, pois a paginação depende dele.
+    """
+    if fields is not None and ALL_FIELDS in fields:
+        return None
+
+    projection = {name: 1 for name in (fields if fields is not None else default)}
+    projection[sort_field] = 1
+    return projection
+
+
+def encode_cursor(sort_value: datetime, doc_id: Any) -> str:
+    """Token opaco de paginação (valor de ordenação + _id do último item)"""
+    payload = json.dumps({'t': sort_value.isoformat(), 'id': str(doc_id)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """Decodifica um token de paginação (ValueError se inválido)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload['t']), ObjectId(payload['id'])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Cursor de paginação inválido: {token}") from e
+
+
+def keyset_query(filters: Optional[Dict], sort_field: str,
+                 cursor: Optional[str]) -> Dict:
+    """Combina os filtros com o predicado de continuação do cursor
+
+    Ordenação (sort_field desc, _id desc): a próxima página começa no
+    primeiro documento estritamente "menor" que o último entregue.
+    """
+    query = dict(filters or {})
+    if not cursor:
+        return query
+
+    value, last_id = decode_cursor(cursor)
+    after = {'$or': [
+        {sort_field: {'$lt': value}},
+        {sort_field: value, '_id': {'$lt': last_id}}
+    ]}
+    return {'$and': [query, after]} if query else after
+
+
+def keyset_sort(sort_field: str) -> List[Tuple[str, int]]:
+    """Ordenação estável usada na paginação por cursor"""
+    return [(sort_field, -1), ('_id', -1)]
+
+
+def find_alerts(filters: Optional[Dict], cursor: Optional[str],
+                fields: Optional[List[str]]) -> Tuple[Dict, Dict, List]:
+    """Consulta, projeção e ordenação keyset de get_alerts/iter_alerts"""
+    return (keyset_query(filters, 'created_at', cursor),
+            build_projection(fields, ALERT_SUMMARY_FIELDS, 'created_at'),
+            keyset_sort('created_at'))
+
+
+def next_cursor(documents: List[Dict], sort_field: str,
+                limit: int) -> Optional[str]:
+    """Token da próxima página (None quando a página veio incompleta)"""
+    if len(documents) < limit or not documents:
+        return None
+    last = documents[-1]
+    return encode_cursor(last[sort_field], last['_id'])
+
+
+def set_modifies(before: Dict, fields: Dict) -> bool:
+    """O $set de `fields` altera o documento `before` (modified_count > 0)"""
+    return any(key not in before or before[key] != value for key, value in fields.items())
+
+
+def alert_fingerprint(alert: Dict) -> str:
+    """Identidade estável do problema: cliente, tipo e metadata discriminante"""
+    metadata = alert.get('metadata') or {}
+    parts = [str(alert.get('client_id')), str(alert.get('alert_type'))]
+    parts += [f"{key}={metadata[key]}" for key in FINGERPRINT_METADATA
+              if metadata.get(key) is not None]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def prepare_alert(alert_data: Dict, now: Optional[datetime] = None) -> Dict:
+    """Preenche datas, status padrão, fingerprint e ocorrências de um novo alerta
+
+    Um alerta inserido diretamente (POST /alerts, seeds) fica igual a um criado
+    por upsert_alert(s): é encontrado pelo upsert seguinte e protegido pelo
+    índice fingerprint_active_unique.
+    """
+    now = now or datetime.now()
+    alert_data['created_at'] = now
+    alert_data['updated_at'] = now
+    alert_data['last_seen'] = now
+    alert_data['status'] = alert_data.get('status', 'open')
+    alert_data['fingerprint'] = alert_fingerprint(alert_data)
+    alert_data['occurrences'] = 1
+    return alert_data
+
+
+def chunk_errors(error: Exception, start: int,
+                 size: int) -> Tuple[Set[int], List[Dict[str, Any]]]:
+    """Extrai os erros por documento de uma falha de insert_many
+
+    Retorna os índices (relativos ao bloco) que falharam e os erros com
+    índice absoluto ({'index', 'code', 'message'}).
+    """
+    if isinstance(error, BulkWriteError):
+        failed = set()
+        errors = []
+        for write_error in error.details.get('writeErrors', []):
+            failed.add(write_error['index'])
+            errors.append({
+                'index': start + write_error['index'],
+                'code': write_error.get('code'),
+                'message': write_error.get('errmsg', '')
+            })
+        return failed, errors
+
+    # Falha do bloco inteiro (rede, timeout...)
+    failed = set(range(size))
+    return failed, [{'index': start + i, 'code': None, 'message': str(error)}
+                    for i in range(size)]
+
+
+def insert_result(documents: List[Dict], failed: Iterable[int],
+                  errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Monta o retorno de uma inserção em lote"""
+    failed = set(failed)
+    inserted_ids = [
+        str(doc['_id']) if i not in failed and '_id' in doc else None
+        for i, doc in enumerate(documents)
+    ]
+    return {
+        'inserted_ids': inserted_ids,
+        'inserted': sum(1 for _id in inserted_ids if _id is not None),
+        'errors': errors
+    }
+
+
+def failed_insert_result(count: int, error: Exception) -> Dict[str, Any]:
+    """Retorno de uma inserção em lote que falhou por completo"""
+    return {
+        'inserted_ids': [None] * count,
+        'inserted': 0,
+        'errors': [{'index': i, 'code': None, 'message': str(error)}
+                   for i in range(count)]
+    }
+
+
+def format_duration(minutes: int) -> str:
+    """Formata minutos como '45min' ou '2h 5min'"""
+    if minutes < 60:
+        return f"{minutes}min"
+    return f"{minutes // 60}h {minutes % 60}min"
+
+
+def alert_stats_pipeline(today_start: Optional[datetime] = None) -> List[Dict]:
+    """Agregação única ($facet) com todos os contadores de get_alert_stats"""
+    if today_start is None:
+        today_start = datetime.combine(date.today(), datetime.min.time())
+    return [
+        {'$facet': {
+            'by_status': [
+                {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+            ],
+            'resolved_today': [
+                {'$match': {
+                    'status': 'resolved',
+                    'resolved_at': {'$gte': today_start}
+                }},
+                {'$count': 'count'}
+            ],
+            # Média sobre todos os resolvidos (não apenas uma amostra)
+            'resolution': [
+                {'$match': {
+                    'status': 'resolved',
+                    'resolved_at': {'$type': 'date'},
+                    'created_at': {'$type': 'date'}
+                }},
+                {'$group': {
+                    '_id': None,
+                    'avg_ms': {'$avg': {'$subtract': ['$resolved_at', '$created_at']}}
+                }}
+            ],
+        }}
+    ]
+
+
+def stats_from_facet(result: Dict) -> Dict[str, Any]:
+    """Converte o resultado de alert_stats_pipeline no formato da API"""
+    by_status = {row['_id']: row['count'] for row in result.get('by_status', [])}
+    resolved_today = result.get('resolved_today') or [{'count': 0}]
+    resolution = result.get('resolution') or []
+
+    avg_time = "N/A"
+    if resolution and resolution[0].get('avg_ms') is not None:
+        avg_time = format_duration(int(resolution[0]['avg_ms'] / 60000))
+
+    return {
+        'openAlerts': by_status.get('open', 0),
+        'inProgress': by_status.get('in_progress', 0),
+        'resolvedToday': resolved_today[0]['count'],
+        'avgResponseTime': avg_time,
+        'total': sum(by_status.values())
+    }
+
+
+def empty_stats() -> Dict[str, Any]:
+    """Estatísticas zeradas (fallback em caso de erro)"""
+    return {
+        'openAlerts': 0,
+        'inProgress': 0,
+        'resolvedToday': 0,
+        'avgResponseTime': 'N/A',
+        'total': 0
+    }
@@ -0,0 +1,273 @@
+"""
+Rollups de Estatísticas de Alertas
+Contadores mantidos incrementalmente ($inc) na collection alert_stats
+
+Cada alerta contribui para três escopos (global, cliente e severidade), em
+dois tipos de documento:
+  - total (day=None): contagem por status e somas de tempo de resolução
+  - diário (day='YYYY-MM-DD'): criados no dia, resolvidos no dia e somas
+
+O documento global ('all') só é usado por get_alert_stats depois de marcado
+como `initialized` (banco vazio na conexão ou após `--rebuild`).
+"""
+
+import sys
+from collections import defaultdict
+from datetime import datetime, date
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+import logging
+
+from pymongo import UpdateOne
+
+from queries import format_duration
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = 'alert_stats'
+
+# Campos lidos do alerta para calcular as contribuições
+ROLLUP_FIELDS = {
+    'status': 1, 'client_id': 1, 'severity': 1,
+    'created_at': 1, 'resolved_at': 1
+}
+
+
+def _day(value: Any) -> Optional[str]:
+    return value.date().isoformat() if isinstance(value, datetime) else None
+
+
+def rollup_id(scope: str, key: Optional[str] = None,
+              day: Optional[str] = None) -> str:
+    """Id do documento de rollup: 'all', 'client:CLI001', 'severity:high@2025-01-15'..."""
+    rid = scope if key is None else f"{scope}:{key}"
+    return rid if day is None else f"{rid}@{day}"
+
+
+def _scopes(alert: Dict) -> List[Tuple[str, Optional[str]]]:
+    scopes = [('all', None)]
+    if alert.get('client_id'):
+        scopes.append(('client', str(alert['client_id'])))
+    if alert.get('severity'):
+        scopes.append(('severity', str(alert['severity'])))
+    return scopes
+
+
+def contributions(alert: Dict, sign: int = 1) -> Dict[Tuple, Dict[str, int]]:
+    """Incrementos que um alerta representa em cada documento de rollup"""
+    deltas: Dict[Tuple, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    status = alert.get('status', 'open')
+    created_day = _day(alert.get('created_at'))
+    resolved_at = alert.get('resolved_at')
+    created_at = alert.get('created_at')
+
+    resolution_ms = None
+    if status == 'resolved' and isinstance(resolved_at, datetime) \
+            and isinstance(created_at, datetime):
+        resolution_ms = int((resolved_at - created_at).total_seconds() * 1000)
+
+    for scope, key in _scopes(alert):
+        total = deltas[(scope, key, None)]
+        total[f"status.{status}"] += sign
+
+        if created_day:
+            deltas[(scope, key, created_day)]['created'] += sign
+
+        if resolution_ms is not None:
+            total['resolved_count'] += sign
+            total['resolution_ms'] += sign * resolution_ms
+
+            daily = deltas[(scope, key, _day(resolved_at))]
+            daily['resolved'] += sign
+            daily['resolution_ms'] += sign * resolution_ms
+
+    return deltas
+
+
+def _merge(target: Dict[Tuple, Dict[str, int]], source: Dict[Tuple, Dict[str, int]]):
+    for doc_key, fields in source.items():
+        for field, value in fields.items():
+            target[doc_key][field] += value
+
+
+def _to_ops(deltas: Dict[Tuple, Dict[str, int]]) -> List[UpdateOne]:
+    """Converte incrementos em operações $inc (upsert), ignorando zeros"""
+    ops = []
+    for (scope, key, day), fields in deltas.items():
+        inc = {field: value for field, value in fields.items() if value}
+        if not inc:
+            continue
+        ops.append(UpdateOne(
+            {'_id': rollup_id(scope, key, day)},
+            {
+                '$inc': inc,
+                '$setOnInsert': {'scope': scope, 'key': key, 'day': day}
+            },
+            upsert=True
+        ))
+    return ops
+
+
+def ops_for_insert(alerts: Iterable[Dict]) -> List[UpdateOne]:
+    """Operações de rollup para alertas recém-criados"""
+    deltas: Dict[Tuple, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for alert in alerts:
+        _merge(deltas, contributions(alert))
+    return _to_ops(deltas)
+
+
+def ops_for_delete(alert: Dict) -> List[UpdateOne]:
+    """Operações de rollup para um alerta removido"""
+    return _to_ops(contributions(alert, -1))
+
+
+def ops_for_transition(before: Dict, update_data: Dict) -> List[UpdateOne]:
+    """Operações de rollup para um alerta atualizado ($set de update_data)"""
+    after = {**before, **update_data}
+    deltas = contributions(after)
+    _merge(deltas, contributions(before, -1))
+    return _to_ops(deltas)
+
+
+def ops_for_transitions(befores: Iterable[Dict], update_data: Dict) -> List[UpdateOne]:
+    """Operações de rollup para vários alertas atualizados com o mesmo $set
+    (incrementos somados: uma operação por documento de rollup)"""
+    deltas: Dict[Tuple, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for before in befores:
+        _merge(deltas, contributions({**before, **update_data}))
+        _merge(deltas, contributions(before, -1))
+    return _to_ops(deltas)
+
+
+def ops_for_deletes(alerts: Iterable[Dict]) -> List[UpdateOne]:
+    """Operações de rollup para vários alertas removidos"""
+    deltas: Dict[Tuple, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for alert in alerts:
+        _merge(deltas, contributions(alert, -1))
+    return _to_ops(deltas)
+
+
+def rollup_ids_for_stats(today: Optional[date] = None) -> List[str]:
+    """Documentos lidos por get_alert_stats"""
+    today = today or date.today()
+    return [rollup_id('all'), rollup_id('all', day=today.isoformat())]
+
+
+def stats_from_rollups(docs: List[Dict], today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+    """Monta as estatísticas da API a partir dos rollups (None se ainda não existem)"""
+    today = today or date.today()
+    by_id = {doc['_id']: doc for doc in docs}
+    total = by_id.get(rollup_id('all'))
+    if total is None or not total.get('initialized'):
+        return None
+
+    daily = by_id.get(rollup_id('all', day=today.isoformat()), {})
+    status = total.get('status', {})
+
+    avg_time = "N/A"
+    if total.get('resolved_count', 0) > 0:
+        avg_minutes = total.get('resolution_ms', 0) / total['resolved_count'] / 60000
+        avg_time = format_duration(int(avg_minutes))
+
+    return {
+        'openAlerts': status.get('open', 0),
+        'inProgress': status.get('in_progress', 0),
+        'resolvedToday': daily.get('resolved', 0),
+        'avgResponseTime': avg_time,
+        'total': sum(status.values())
+    }
+
+
+def _needs_rebuild(total: Optional[Dict], has_alerts: bool) -> bool:
+    if total and total.get('initialized'):
+        return False
+    if has_alerts:
+        logger.warning("⚠ Rollups de estatísticas não inicializados; "
+                       "execute: python rollups.py --rebuild")
+        return True
+    return False
+
+
+_INIT_UPDATE = {'$set': {'initialized': True, 'scope': 'all', 'key': None, 'day': None}}
+
+
+def init_rollups(db) -> bool:
+    """Marca os rollups como válidos quando a collection alerts está vazia"""
+    collection = db[ROLLUP_COLLECTION]
+    total = collection.find_one({'_id': rollup_id('all')}, {'initialized': 1})
+    has_alerts = db['alerts'].find_one({}, {'_id': 1}) is not None
+
+    if _needs_rebuild(total, has_alerts):
+        return False
+    if not (total and total.get('initialized')):
+        collection.update_one({'_id': rollup_id('all')}, _INIT_UPDATE, upsert=True)
+    return True
+
+
+async def init_rollups_async(db) -> bool:
+    """Versão assíncrona de init_rollups"""
+    collection = db[ROLLUP_COLLECTION]
+    total = await collection.find_one({'_id': rollup_id('all')}, {'initialized': 1})
+    has_alerts = await db['alerts'].find_one({}, {'_id': 1}) is not None
+
+    if _needs_rebuild(total, has_alerts):
+        return False
+    if not (total and total.get('initialized')):
+        await collection.update_one({'_id': rollup_id('all')}, _INIT_UPDATE, upsert=True)
+    return True
+
+
+def rebuild_rollups(db, batch_size: int = 5000) -> int:
+    """Recalcula todos os rollups a partir da collection alerts
+
+    Os documentos são gerados em uma collection temporária e trocados
+    atomicamente com renameCollection.
+    """
+    deltas: Dict[Tuple, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    deltas[('all', None, None)]  # garante o documento global mesmo sem alertas
+    scanned = 0
+
+    for alert in db['alerts'].find({}, ROLLUP_FIELDS).batch_size(batch_size):
+        _merge(deltas, contributions(alert))
+        scanned += 1
+
+    docs = []
+    for (scope, key, day), fields in deltas.items():
+        doc = {'_id': rollup_id(scope, key, day), 'scope': scope, 'key': key, 'day': day}
+        for field, value in fields.items():
+            if '.' in field:
+                parent, child = field.split('.', 1)
+                doc.setdefault(parent, {})[child] = value
+            else:
+                doc[field] = value
+        if doc['_id'] == rollup_id('all'):
+            doc['initialized'] = True
+        docs.append(doc)
+
+    temp_name = f"{ROLLUP_COLLECTION}_rebuild"
+    temp = db[temp_name]
+    temp.drop()
+    for start in range(0, len(docs), batch_size):
+        temp.insert_many(docs[start:start + batch_size], ordered=False)
+
+    temp.rename(ROLLUP_COLLECTION, dropTarget=True)
+
+    return scanned
+
+
+if __name__ == "__main__":
+    from database import db_manager
+
+    if '--rebuild' not in sys.argv:
+        print("Uso: python rollups.py --rebuild")
+        sys.exit(2)
+
+    if not db_manager.connect():
+        sys.exit(1)
+
+    try:
+        print("🔄 Recalculando rollups de estatísticas...")
+        count = rebuild_rollups(db_manager.db)
+        print(f"✅ Rollups recalculados a partir de {count} alertas")
+        print(f"📊 {db_manager.get_alert_stats()}")
+    finally:
+        db_manager.close()
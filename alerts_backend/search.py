@@ -0,0 +1,190 @@
+"""
+Busca Textual
+Consultas de /search sobre os índices de texto de alertas (title/description)
+e logs (message), usadas pelos gerenciadores síncrono e assíncrono
+
+Ordenação por relevância (textScore) pagina por deslocamento, limitado a
+SEARCH_MAX_OFFSET; por data ('recent') usa o mesmo cursor de get_alerts/get_logs.
+Em `logs` time-series (sem suporte a índice de texto) a busca cai para uma
+expressão regular sobre `message`, ordenada por data.
+"""
+
+import base64
+import json
+import os
+import re
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Tuple
+
+from pymongo import TEXT, IndexModel
+
+from queries import (
+    ALERT_SUMMARY_FIELDS, LOG_SUMMARY_FIELDS, encode_cursor, keyset_query, keyset_sort
+)
+from timeseries import from_timeseries, timeseries_projection, timeseries_query
+
+SEARCH_LANGUAGE = os.getenv('SEARCH_LANGUAGE', 'portuguese')
+
+SORT_RELEVANCE = 'relevance'
+SORT_RECENT = 'recent'
+SEARCH_SORTS = (SORT_RELEVANCE, SORT_RECENT)
+
+SCORE_FIELD = 'score'
+_TEXT_SCORE = {'$meta': 'textScore'}
+
+# Collection -> (campo de data, campos retornados)
+SEARCH_TARGETS: Dict[str, Tuple[str, List[str]]] = {
+    'alerts': ('created_at', ALERT_SUMMARY_FIELDS),
+    'logs': ('timestamp', LOG_SUMMARY_FIELDS),
+}
+
+# Índices de texto (um por collection), declarados em indexes.INDEXES
+ALERTS_TEXT_INDEX = IndexModel(
+    [('title', TEXT), ('description', TEXT)],
+    name='title_description_text',
+    weights={'title': 5, 'description': 1},
+    default_language=SEARCH_LANGUAGE
+)
+LOGS_TEXT_INDEX = IndexModel(
+    [('message', TEXT)],
+    name='message_text',
+    default_language=SEARCH_LANGUAGE
+)
+
+_TERM = re.compile(r'"[^"]*"|\S+')
+
+
+def max_offset() -> int:
+    return int(os.getenv('SEARCH_MAX_OFFSET', '1000'))
+
+
+def search_filters(collection_name: str, severity: Optional[str] = None,
+                   status: Optional[str] = None, level: Optional[str] = None,
+                   origin: Optional[str] = None, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> Dict:
+    """Filtros de /search aplicáveis à collection (severity/status só em alertas,
+    level/origin só em logs)"""
+    time_field, _ = SEARCH_TARGETS[collection_name]
+    if collection_name == 'alerts':
+        fields = {'severity': severity, 'status': status}
+    else:
+        fields = {'level': level, 'origin': origin}
+
+    filters: Dict[str, Any] = {
+        name: value for name, value in fields.items() if value and value != 'all'
+    }
+    period = {}
+    if start:
+        period['$gte'] = start
+    if end:
+        period['$lt'] = end
+    if period:
+        filters[time_field] = period
+    return filters
+
+
+def encode_offset(offset: int) -> str:
+    """Token opaco da próxima página na ordenação por relevância"""
+    payload = json.dumps({'o': offset})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_offset(token: str) -> int:
+    """Decodifica um token de encode_offset (ValueError se inválido)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        offset = json.loads(base64.urlsafe_b64decode(padded.encode()))['o']
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Cursor de paginação inválido: {token}") from e
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Cursor de paginação inválido: {token}")
+    return offset
+
+
+def regex_search(text: str) -> Dict:
+    """Condição equivalente (sem índice) a $text em `message`: qualquer termo,
+    sem diferenciar maiúsculas"""
+    terms = [term.strip('"') for term in _TERM.findall(text) if not term.startswith('-')]
+    pattern = '|'.join(re.escape(term) for term in terms if term)
+    return {'$regex': pattern or '^$', '$options': 'i'}
+
+
+def build_search(collection_name: str, text: str, filters: Optional[Dict] = None,
+                 cursor: Optional[str] = None, sort: str = SORT_RELEVANCE,
+                 indexed: bool = True) -> Tuple[Dict, Dict, List, int]:
+    """Monta (filtro, projeção, ordenação, skip) de uma busca
+
+    indexed=False usa regex_search (collection sem índice de texto) e força a
+    ordenação por data. ValueError para ordenação ou cursor inválidos.
+    """
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"Ordenação inválida: {sort} (use {', '.join(SEARCH_SORTS)})")
+    if not indexed:
+        sort = SORT_RECENT
+
+    time_field, fields = SEARCH_TARGETS[collection_name]
+    projection = {name: 1 for name in fields}
+    projection[time_field] = 1
+
+    if sort == SORT_RECENT:
+        query = keyset_query(filters, time_field, cursor)
+        order = keyset_sort(time_field)
+        skip = 0
+    else:
+        query = dict(filters or {})
+        order = [(SCORE_FIELD, _TEXT_SCORE), *keyset_sort(time_field)]
+        skip = decode_offset(cursor) if cursor else 0
+        if skip > max_offset():
+            raise ValueError(f"Paginação por relevância limitada a {max_offset()} resultados; "
+                             "refine a busca ou use sort=recent")
+
+    if indexed:
+        query['$text'] = {'$search': text}
+        projection[SCORE_FIELD] = _TEXT_SCORE
+    else:
+        query['message'] = regex_search(text)
+    return query, projection, order, skip
+
+
+def search_plan(collection_name: str, text: str, filters: Optional[Dict],
+                cursor: Optional[str], sort: str,
+                logs_timeseries: bool) -> Tuple[Dict, Dict, List, int, bool]:
+    """Busca no formato da collection: (query, projection, order, skip, timeseries)
+
+    ValueError para collection sem busca, ordenação ou cursor inválidos.
+    """
+    if collection_name not in SEARCH_TARGETS:
+        raise ValueError(f"Collection sem busca: {collection_name}")
+
+    timeseries = collection_name == 'logs' and logs_timeseries
+    query, projection, order, skip = build_search(
+        collection_name, text, filters, cursor, sort, indexed=not timeseries
+    )
+    if timeseries:
+        query = timeseries_query(query)
+        projection = timeseries_projection(projection)
+    return query, projection, order, skip, timeseries
+
+
+def search_page(docs: List[Dict], collection_name: str, limit: int, skip: int,
+                order: List, timeseries: bool) -> Dict[str, Any]:
+    """Resultado da busca ({'results', 'next_cursor'})"""
+    if timeseries:
+        docs = [from_timeseries(doc) for doc in docs]
+    return {
+        'results': docs,
+        'next_cursor': search_next_cursor(docs, collection_name, limit, skip, order)
+    }
+
+
+def search_next_cursor(documents: List[Dict], collection_name: str, limit: int,
+                       skip: int, order: List) -> Optional[str]:
+    """Token da próxima página (None quando a página veio incompleta)"""
+    if len(documents) < limit or not documents:
+        return None
+    if order[0][0] == SCORE_FIELD:
+        offset = skip + len(documents)
+        return encode_offset(offset) if offset <= max_offset() else None
+    time_field, _ = SEARCH_TARGETS[collection_name]
+    last = documents[-1]
+    return encode_cursor(last[time_field], last['_id'])
@@ -4,11 +4,18 @@ Script para gerar alertas de exemplo
 
 from database import db_manager
 from datetime import datetime, timedelta
+from queries import FINGERPRINT_METADATA
 import random
 
 def generate_sample_alerts():
     """Gera alertas de exemplo para teste"""
     
+    clients = [
+        ("CLI001", "Empresa ABC Ltda"),
+        ("CLI002", "Comércio XYZ"),
+        ("CLI003", "Indústria 123"),
+        ("CLI004", "Serviços Delta"),
+    ]
     severities = ["critical", "high", "medium", "low"]
     statuses = ["open", "in_progress", "resolved"]
     types = [
@@ -116,15 +123,20 @@ def generate_sample_alerts():
             }
         
         # Criar alerta
+        client_id, client_name = random.choice(clients)
         alert = {
+            "client_id": client_id,
+            "client_name": client_name,
             "title": message,
             "description": f"Alerta automático gerado pelo monitoramento",
             "severity": severity,
             "status": status,
-            "type": alert_type,
+            "alert_type": alert_type,
             "source": f"{alert_type.split('_')[0].title()}Analyzer",
             "created_at": created_at,
-            "details": details
+            "details": details,
+            # Campos que distinguem problemas do mesmo tipo (fingerprint)
+            "metadata": {key: details[key] for key in FINGERPRINT_METADATA if key in details}
         }
         
         # Se resolvido, adicionar dados de resolução
@@ -146,13 +158,13 @@ def generate_sample_alerts():
     # Inserir alertas no banco
     print(f"Gerando {len(alerts)} alertas de exemplo...")
     
-    inserted_count = 0
-    for alert in alerts:
-        alert_id = db_manager.insert_alert(alert)
-        if alert_id:
-            inserted_count += 1
+    result = db_manager.insert_alerts(alerts)
+    inserted_count = result['inserted']
     
     print(f"✓ {inserted_count} alertas inseridos com sucesso!")
+    if result['errors']:
+        # Índice fingerprint_active_unique: um alerta ativo por problema
+        print(f"⚠ {len(result['errors'])} alertas repetiam um problema ativo e foram ignorados")
     
     # Estatísticas
     print("\n📊 Estatísticas dos alertas gerados:")
@@ -168,7 +180,7 @@ def generate_sample_alerts():
     
     print(f"\n  Por Tipo:")
     for alert_type in types:
-        count = sum(1 for a in alerts if a["type"] == alert_type)
+        count = sum(1 for a in alerts if a["alert_type"] == alert_type)
         if count > 0:
             print(f"    • {alert_type.replace('_', ' ').title()}: {count}")
 
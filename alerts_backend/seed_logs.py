@@ -129,16 +129,17 @@ def generate_sample_logs():
     # Inserir logs no banco
     print(f"Gerando {len(logs)} logs de exemplo...")
     
-    for log in logs:
-        log_data = {
+    result = db_manager.insert_logs([
+        {
             "level": log["level"],
             "message": log["message"],
             "origin": log["origin"],
             "metadata": log["metadata"]
         }
-        db_manager.insert_log(log_data)
+        for log in logs
+    ])
     
-    print(f"✓ {len(logs)} logs inseridos com sucesso!")
+    print(f"✓ {result['inserted']} logs inseridos com sucesso!")
     
     # Estatísticas
     stats = {}
@@ -0,0 +1,54 @@
+"""
+Serialização das Respostas da API
+Codificação JSON com ObjectId e datetime tratados nativamente, sem a conversão
+documento a documento do _id no DatabaseManager nem a passagem pelo
+jsonable_encoder do FastAPI
+
+Requer orjson (opcional): pip install orjson. Sem ele, usa o json da
+biblioteca padrão, com a mesma saída.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # orjson já codifica datetime/date; o json padrão passa por aqui
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _stdlib_dumps(content: Any) -> bytes:
+    # Mesmo formato do JSONResponse do Starlette
+    return json.dumps(content, default=_default, ensure_ascii=False,
+                      separators=(',', ':')).encode()
+
+
+def dumps(content: Any) -> bytes:
+    """Conteúdo -> JSON compacto (ObjectId como string, datas em ISO 8601)"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return _stdlib_dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse codificada com dumps
+
+    Retornada diretamente pelos endpoints de listagem, evita o
+    jsonable_encoder (o response_model desses endpoints serve à documentação).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,214 @@
+"""
+Série Temporal de Alertas (gráfico do dashboard)
+Contagens de alertas criados por severidade e tipo em intervalos de minuto,
+hora ou dia (GET /alerts/series)
+
+Intervalos encerrados são agregados uma única vez e gravados selados na
+collection alert_series ($setOnInsert: nunca recalculados). A cada leitura só
+o intervalo aberto (mais os encerrados há menos de SERIES_SEAL_DELAY_SECONDS,
+que ainda podem receber gravações em andamento) é agregado sobre o índice de
+created_at. Para descartar os intervalos selados: python series.py --rebuild
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Tuple
+
+from pymongo import UpdateOne
+
+SERIES_COLLECTION = 'alert_series'
+
+GRANULARITIES: Dict[str, timedelta] = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+# Intervalos retornados quando `start` não é informado
+DEFAULT_POINTS = {'minute': 60, 'hour': 24, 'day': 7}
+
+# Dimensão da resposta -> campo do alerta
+DIMENSIONS = {'severity': 'severity', 'type': 'alert_type'}
+
+UNKNOWN = 'unknown'
+
+
+def max_points() -> int:
+    return int(os.getenv('SERIES_MAX_POINTS', '1440'))
+
+
+def seal_delay() -> timedelta:
+    return timedelta(seconds=int(os.getenv('SERIES_SEAL_DELAY_SECONDS', '30')))
+
+
+def truncate(value: datetime, granularity: str) -> datetime:
+    """Início do intervalo que contém `value`"""
+    if granularity == 'minute':
+        return value.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def series_buckets(granularity: str, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None,
+                   now: Optional[datetime] = None) -> List[datetime]:
+    """Inícios dos intervalos do período [start, end)
+
+    Sem `start`, os últimos DEFAULT_POINTS intervalos até `end` (padrão: agora).
+    ValueError para granularidade ou período inválidos.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidade inválida: {granularity} "
+                         f"(use {', '.join(GRANULARITIES)})")
+    step = GRANULARITIES[granularity]
+    end = end or now or datetime.now()
+    if start is None:
+        start = truncate(end, granularity) - step * (DEFAULT_POINTS[granularity] - 1)
+    if end <= start:
+        raise ValueError("O fim do período deve ser posterior ao início")
+
+    first = truncate(start, granularity)
+    if (end - first) / step > max_points():
+        raise ValueError(f"Período com mais de {max_points()} intervalos; "
+                         "aumente a granularidade ou reduza o período")
+
+    buckets = []
+    current = first
+    while current < end:
+        buckets.append(current)
+        current += step
+    return buckets
+
+
+def seal_boundary(granularity: str, now: Optional[datetime] = None) -> datetime:
+    """Intervalos que começam antes deste instante estão encerrados e podem ser selados"""
+    return truncate((now or datetime.now()) - seal_delay(), granularity)
+
+
+def series_plan(granularity: str, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> Tuple[List[datetime], datetime]:
+    """Intervalos do período e limite de selagem
+
+    ValueError para granularidade ou período inválidos.
+    """
+    return series_buckets(granularity, start, end), seal_boundary(granularity)
+
+
+def series_id(granularity: str, bucket: datetime) -> str:
+    """Id do documento selado: 'hour@2025-01-15T10:00:00'"""
+    return f"{granularity}@{bucket.isoformat()}"
+
+
+def sealed_query(granularity: str, buckets: List[datetime], boundary: datetime) -> Dict:
+    """Filtro dos intervalos selados do período (apenas os anteriores a `boundary`)"""
+    end = min(buckets[-1] + GRANULARITIES[granularity], boundary)
+    return {'granularity': granularity, 't': {'$gte': buckets[0], '$lt': end}}
+
+
+def series_pipeline(start: datetime, end: datetime, granularity: str) -> List[Dict]:
+    """Agregação dos alertas criados em [start, end) por (intervalo, severidade, tipo)"""
+    return [
+        {'$match': {'created_at': {'$gte': start, '$lt': end}}},
+        {'$project': {'_id': 0, 'created_at': 1, **{field: 1 for field in DIMENSIONS.values()}}},
+        {'$group': {
+            '_id': {
+                't': {'$dateTrunc': {'date': '$created_at', 'unit': granularity}},
+                **{name: f'${field}' for name, field in DIMENSIONS.items()},
+            },
+            'count': {'$sum': 1},
+        }},
+    ]
+
+
+def buckets_pipeline(granularity: str, buckets: List[datetime]) -> List[Dict]:
+    """series_pipeline do primeiro ao último dos intervalos `buckets`"""
+    return series_pipeline(buckets[0], buckets[-1] + GRANULARITIES[granularity], granularity)
+
+
+def _empty_bucket(bucket: datetime) -> Dict[str, Any]:
+    return {'t': bucket, 'total': 0, **{name: {} for name in DIMENSIONS}}
+
+
+def bucket_counts(rows: List[Dict]) -> Dict[datetime, Dict[str, Any]]:
+    """Converte as linhas do $group em contagens por intervalo"""
+    buckets: Dict[datetime, Dict[str, Any]] = {}
+    for row in rows:
+        key, count = row['_id'], row['count']
+        entry = buckets.setdefault(key['t'], _empty_bucket(key['t']))
+        entry['total'] += count
+        for name in DIMENSIONS:
+            value = key.get(name) or UNKNOWN
+            entry[name][value] = entry[name].get(value, 0) + count
+    return buckets
+
+
+def seal_operations(granularity: str, buckets: List[datetime],
+                    counts: Dict[datetime, Dict[str, Any]],
+                    now: Optional[datetime] = None) -> List[UpdateOne]:
+    """Gravações dos intervalos encerrados (intervalos vazios também são selados)
+
+    $setOnInsert: um intervalo já selado (outro processo) não é alterado.
+    """
+    sealed_at = now or datetime.now()
+    return [
+        UpdateOne(
+            {'_id': series_id(granularity, bucket)},
+            {'$setOnInsert': {'granularity': granularity, 'sealed_at': sealed_at,
+                              **counts.get(bucket, _empty_bucket(bucket))}},
+            upsert=True
+        )
+        for bucket in buckets
+    ]
+
+
+def build_series(granularity: str, buckets: List[datetime],
+                 sealed: Dict[datetime, Dict[str, Any]],
+                 live: Dict[datetime, Dict[str, Any]]) -> Dict[str, Any]:
+    """Resposta da API: todos os intervalos do período (zeros inclusive) e totais"""
+    totals: Dict[str, Any] = {'total': 0, **{name: {} for name in DIMENSIONS}}
+    points = []
+
+    for bucket in buckets:
+        source = sealed.get(bucket) or live.get(bucket) or _empty_bucket(bucket)
+        point = {'t': bucket, 'total': source.get('total', 0), 'sealed': bucket in sealed}
+        totals['total'] += point['total']
+        for name in DIMENSIONS:
+            point[name] = dict(source.get(name, {}))
+            for value, count in point[name].items():
+                totals[name][value] = totals[name].get(value, 0) + count
+        points.append(point)
+
+    return {
+        'granularity': granularity,
+        'start': buckets[0],
+        'end': buckets[-1] + GRANULARITIES[granularity],
+        **totals,
+        'buckets': points,
+    }
+
+
+def split_buckets(buckets: List[datetime], sealed: Dict[datetime, Any],
+                  boundary: datetime) -> Tuple[List[datetime], List[datetime]]:
+    """(encerrados ainda não selados, abertos agregados a cada leitura)"""
+    missing = [bucket for bucket in buckets if bucket < boundary and bucket not in sealed]
+    open_buckets = [bucket for bucket in buckets if bucket >= boundary]
+    return missing, open_buckets
+
+
+if __name__ == "__main__":
+    from database import db_manager
+
+    if '--rebuild' not in sys.argv:
+        print("Uso: python series.py --rebuild")
+        sys.exit(2)
+
+    if not db_manager.connect():
+        sys.exit(1)
+
+    try:
+        removed = db_manager.get_collection(SERIES_COLLECTION).delete_many({}).deleted_count
+        print(f"✅ {removed} intervalos selados removidos (serão recalculados na próxima leitura)")
+    finally:
+        db_manager.close()
@@ -7,6 +7,10 @@ from notifiers import NotificationManager
 from datetime import datetime
 import time
 
+# Cliente dos alertas simulados (campos do modelo usado pela API e pelos analisadores)
+CLIENT_ID = "CLI001"
+CLIENT_NAME = "Empresa ABC Ltda"
+
 def simulate_backup_failure():
     """Simula falha crítica de backup"""
     print("\n🔴 Simulando FALHA DE BACKUP CRÍTICA...")
@@ -16,7 +20,9 @@ def simulate_backup_failure():
         "description": "O servidor de backup principal não responde há 48 horas. Todos os backups programados falharam.",
         "severity": "critical",
         "status": "open",
-        "type": "backup_failure",
+        "client_id": CLIENT_ID,
+        "client_name": CLIENT_NAME,
+        "alert_type": "backup_failure",
         "source": "BackupAnalyzer",
         "created_at": datetime.now(),
         "details": {
@@ -31,7 +37,8 @@ def simulate_backup_failure():
         }
     }
     
-    alert_id = db_manager.insert_alert(alert)
+    result = db_manager.upsert_alert(alert)
+    alert_id = result['_id'] if result else None
     if alert_id:
         print(f"   ✅ Alerta criado: {alert_id}")
         
@@ -61,18 +68,21 @@ def simulate_stock_critical():
         {"id": 11247, "name": "Teclado Mecânico RGB", "stock": 8, "min": 75}
     ]
     
-    alert_ids = []
+    alerts = []
     for product in products:
         severity = "critical" if product["stock"] == 0 else "high"
         
-        alert = {
+        alerts.append({
             "title": f"Produto #{product['id']} com estoque {'ZERADO' if product['stock'] == 0 else 'crítico'}",
             "description": f"{product['name']} - Estoque atual: {product['stock']} unidades (mínimo: {product['min']})",
             "severity": severity,
             "status": "open",
-            "type": "low_stock",
+            "client_id": CLIENT_ID,
+            "client_name": CLIENT_NAME,
+            "alert_type": "low_stock",
             "source": "StockAnalyzer",
             "created_at": datetime.now(),
+            "metadata": {"product_id": product["id"]},
             "details": {
                 "product_id": product["id"],
                 "product_name": product["name"],
@@ -83,9 +93,11 @@ def simulate_stock_critical():
                 "last_entry": "2025-01-10",
                 "pending_orders": 45 if product["stock"] < 10 else 0
             }
-        }
-        
-        alert_id = db_manager.insert_alert(alert)
+        })
+    
+    result = db_manager.upsert_alerts(alerts)
+    alert_ids = []
+    for product, alert_id in zip(products, result['created_ids']):
         if alert_id:
             alert_ids.append(alert_id)
             print(f"   ✅ Alerta produto #{product['id']}: {alert_id}")
@@ -114,7 +126,9 @@ def simulate_database_slow():
         "description": "Múltiplas consultas SQL excedendo 5 segundos de tempo de resposta",
         "severity": "high",
         "status": "open",
-        "type": "database_slow",
+        "client_id": CLIENT_ID,
+        "client_name": CLIENT_NAME,
+        "alert_type": "database_slow",
         "source": "DatabaseAnalyzer",
         "created_at": datetime.now(),
         "details": {
@@ -132,7 +146,8 @@ def simulate_database_slow():
         }
     }
     
-    alert_id = db_manager.insert_alert(alert)
+    result = db_manager.upsert_alert(alert)
+    alert_id = result['_id'] if result else None
     if alert_id:
         print(f"   ✅ Alerta criado: {alert_id}")
         
@@ -143,8 +158,8 @@ def simulate_database_slow():
             "SELECT COUNT(*) FROM products p JOIN inventory i - 15.2s"
         ]
         
-        for query in queries:
-            db_manager.insert_log({
+        db_manager.insert_logs([
+            {
                 "level": "WARNING",
                 "message": f"Query lenta detectada: {query}",
                 "origin": "DatabaseAnalyzer",
@@ -153,7 +168,9 @@ def simulate_database_slow():
                     "query": query.split(' - ')[0],
                     "execution_time": query.split(' - ')[1]
                 }
-            })
+            }
+            for query in queries
+        ])
         
         print(f"   ✅ {len(queries)} logs de queries registrados")
     
@@ -169,7 +186,9 @@ def simulate_disk_space_critical():
         "description": "Partição principal com 98% de uso. Apenas 2.1GB disponíveis.",
         "severity": "critical",
         "status": "open",
-        "type": "disk_space",
+        "client_id": CLIENT_ID,
+        "client_name": CLIENT_NAME,
+        "alert_type": "disk_space",
         "source": "DiskSpaceAnalyzer",
         "created_at": datetime.now(),
         "details": {
@@ -188,7 +207,8 @@ def simulate_disk_space_critical():
         }
     }
     
-    alert_id = db_manager.insert_alert(alert)
+    result = db_manager.upsert_alert(alert)
+    alert_id = result['_id'] if result else None
     if alert_id:
         print(f"   ✅ Alerta criado: {alert_id}")
         
@@ -217,7 +237,9 @@ def simulate_high_error_rate():
         "description": "Sistema apresentando taxa anormal de erros nas últimas 2 horas",
         "severity": "high",
         "status": "open",
-        "type": "high_error_rate",
+        "client_id": CLIENT_ID,
+        "client_name": CLIENT_NAME,
+        "alert_type": "high_error_rate",
         "source": "ErrorRateAnalyzer",
         "created_at": datetime.now(),
         "details": {
@@ -239,13 +261,14 @@ def simulate_high_error_rate():
         }
     }
     
-    alert_id = db_manager.insert_alert(alert)
+    result = db_manager.upsert_alert(alert)
+    alert_id = result['_id'] if result else None
     if alert_id:
         print(f"   ✅ Alerta criado: {alert_id}")
         
         # Logs de erros específicos
-        for error in alert["details"]["top_errors"][:3]:
-            db_manager.insert_log({
+        db_manager.insert_logs([
+            {
                 "level": "ERROR",
                 "message": f"Erro {error['code']}: {error['message']} ({error['count']} ocorrências)",
                 "origin": "ErrorRateAnalyzer",
@@ -254,7 +277,9 @@ def simulate_high_error_rate():
                     "error_code": error["code"],
                     "count": error["count"]
                 }
-            })
+            }
+            for error in alert["details"]["top_errors"][:3]
+        ])
         
         print("   ✅ Logs de erros registrados")
     
@@ -266,17 +291,20 @@ def simulate_nfe_errors():
     print("\n🟡 Simulando ERROS DE NFe...")
     
     nfes = [45678, 45892, 46103, 46215, 46334]
-    alert_ids = []
+    alerts = []
     
     for nfe in nfes:
-        alert = {
+        alerts.append({
             "title": f"Erro ao processar NFe #{nfe}",
             "description": f"Falha no processamento da Nota Fiscal Eletrônica {nfe}",
             "severity": "medium",
             "status": "open",
-            "type": "nfe_error",
+            "client_id": CLIENT_ID,
+            "client_name": CLIENT_NAME,
+            "alert_type": "nfe_error",
             "source": "NFeAnalyzer",
             "created_at": datetime.now(),
+            "metadata": {"nfe_number": nfe},
             "details": {
                 "nfe_number": nfe,
                 "error_type": "XML_VALIDATION_ERROR",
@@ -291,11 +319,10 @@ def simulate_nfe_errors():
                 "retry_count": 3,
                 "sefaz_status": "Rejeitada"
             }
-        }
-        
-        alert_id = db_manager.insert_alert(alert)
-        if alert_id:
-            alert_ids.append(alert_id)
+        })
+    
+    result = db_manager.upsert_alerts(alerts)
+    alert_ids = [aid for aid in result['created_ids'] if aid]
     
     print(f"   ✅ {len(alert_ids)} alertas de NFe criados")
     
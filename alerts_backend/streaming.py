@@ -0,0 +1,93 @@
+"""
+Respostas em Streaming
+Leituras grandes de /alerts e /logs enviadas em lotes, sem montar a lista
+completa em memória
+
+  - Accept: application/x-ndjson -> um documento JSON por linha
+  - ?stream=1 -> o mesmo envelope da resposta normal ({"success", <lista>,
+    "total", "next_cursor"}), gerado incrementalmente
+
+Os documentos são lidos do cursor em lotes de STREAM_BATCH_SIZE e cada lote é
+codificado e enviado antes do próximo ser lido: a memória não depende do
+limite e o primeiro byte sai após o primeiro lote.
+"""
+
+import json
+import os
+from typing import Optional, Dict, AsyncIterable, AsyncIterator
+import logging
+
+from queries import encode_cursor
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+JSON_MEDIA_TYPE = 'application/json'
+
+
+def stream_batch_size() -> int:
+    return int(os.getenv('STREAM_BATCH_SIZE', '1000'))
+
+
+def stream_media_type(accept: Optional[str], stream: bool) -> Optional[str]:
+    """Formato da resposta: NDJSON (Accept), JSON em streaming (?stream=1) ou
+    None para a resposta normal"""
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        return NDJSON_MEDIA_TYPE
+    return JSON_MEDIA_TYPE if stream else None
+
+
+def encode_document(document: Dict) -> bytes:
+    """Documento -> JSON compacto (datas em ISO 8601, ObjectId como string)"""
+    return dumps(document)
+
+
+async def ndjson_body(documents: AsyncIterable[Dict],
+                      batch_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Corpo NDJSON: um bloco de linhas por lote"""
+    batch_size = batch_size or stream_batch_size()
+    lines = []
+    try:
+        async for document in documents:
+            lines.append(encode_document(document))
+            if len(lines) >= batch_size:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+    except Exception as e:
+        # Cabeçalhos já enviados: a resposta termina incompleta
+        logger.error(f"✗ Erro durante o streaming: {e}")
+        raise
+
+
+async def json_body(documents: AsyncIterable[Dict], key: str, sort_field: str,
+                    limit: Optional[int],
+                    batch_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Corpo JSON no formato da resposta normal, com total e next_cursor no final"""
+    batch_size = batch_size or stream_batch_size()
+    yield f'{{"success":true,{json.dumps(key)}:['.encode()
+
+    parts = []
+    total = 0
+    last = None
+    try:
+        async for document in documents:
+            # Separador antes de cada documento exceto o primeiro
+            parts.append((b',' if total else b'') + encode_document(document))
+            total += 1
+            last = document
+            if len(parts) >= batch_size:
+                yield b''.join(parts)
+                parts = []
+    except Exception as e:
+        # Cabeçalhos já enviados: o JSON termina incompleto (inválido)
+        logger.error(f"✗ Erro durante o streaming: {e}")
+        raise
+
+    cursor = None
+    if limit and last is not None and total >= limit:
+        cursor = encode_cursor(last[sort_field], last['_id'])
+    parts.append(f'],"total":{total},"next_cursor":{json.dumps(cursor)}}}'.encode())
+    yield b''.join(parts)
@@ -0,0 +1,81 @@
+"""
+Configuração dos testes
+Backend em memória (DB_BACKEND=memory), um banco por teste e os módulos do
+backend importados pelo nome, como em api.py (python -m pytest em alerts_backend)
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ['DB_BACKEND'] = 'memory'
+# Gravações diretas (sem a thread do gravador de logs) e admissão rápida
+os.environ.setdefault('LOG_WRITER_ENABLED', '0')
+os.environ.setdefault('ALERT_INGEST_FLUSH_INTERVAL', '0.01')
+os.environ.setdefault('ALERT_INGEST_RETRY_BACKOFF', '0.001')
+
+from async_database import AsyncDatabaseManager  # noqa: E402
+from database import DatabaseManager  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch, tmp_path):
+    """Banco próprio do teste (o backend em memória é compartilhado no processo)
+    e arquivo Parquet em um diretório ainda inexistente (indisponível)"""
+    monkeypatch.setenv('DB_NAME', f"test_{uuid.uuid4().hex[:12]}")
+    monkeypatch.setenv('LOG_ARCHIVE_DIR', str(tmp_path / 'archive'))
+
+
+@pytest.fixture
+def db():
+    """DatabaseManager conectado"""
+    manager = DatabaseManager()
+    assert manager.connect()
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Módulo da API sobre um AsyncDatabaseManager novo"""
+    import api as api_module
+    monkeypatch.setattr(api_module, 'db_manager', AsyncDatabaseManager())
+    return api_module
+
+
+@pytest.fixture
+def run_api(api):
+    """Executa `scenario(api)` entre o startup e o shutdown da API, em um event loop"""
+    def run(scenario):
+        async def main():
+            await api.startup_event()
+            try:
+                return await scenario(api)
+            finally:
+                await api.shutdown_event()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def make_alert():
+    """Fábrica de alertas válidos (campos informados sobrescrevem o padrão)"""
+    def make(**fields):
+        return {
+            'client_id': 'c1',
+            'client_name': 'Cliente 1',
+            'alert_type': 'backup_failed',
+            'severity': 'high',
+            'title': 'Backup falhou',
+            'description': 'Backup noturno não concluído',
+            'status': 'open',
+            **fields
+        }
+    return make
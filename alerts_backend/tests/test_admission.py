@@ -0,0 +1,190 @@
+"""
+Admissão de POST /alerts: 202 ao aceitar (padrão), resposta após a gravação
+com `Prefer: wait=N`, 429 por cota ou fila cheia e falhas de gravação
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from admission import FAILED, QUEUED, SHED_QUEUE, SHED_QUOTA, STORED, AlertIngestor
+
+
+def _create(api, alert, prefer=None):
+    return api.create_alert(api.AlertCreate(**alert), prefer)
+
+
+async def _settled(api, tracking_id):
+    """Situação do alerta assim que deixa a fila"""
+    for _ in range(200):
+        status = await api.get_alert_ingest_status(tracking_id)
+        if status['status'] != QUEUED:
+            return status
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"alerta {tracking_id} ainda na fila")
+
+
+def test_default_returns_202_and_tracks_the_alert(run_api, make_alert):
+    async def scenario(api):
+        response = await _create(api, make_alert())
+        body = json.loads(response.body)
+
+        assert response.status_code == 202
+        assert body['status'] == QUEUED
+        assert (await _settled(api, body['tracking_id']))['status'] == STORED
+        assert await api.db_manager.get_alert_by_id(body['alert_id'])
+
+    run_api(scenario)
+
+
+def test_prefer_wait_responds_after_the_write(run_api, make_alert):
+    async def scenario(api):
+        response = await _create(api, make_alert(), prefer='respond-async, wait=5')
+
+        assert response['success'] and response['message'] == 'Alerta criado com sucesso'
+        alert = await api.db_manager.get_alert_by_id(response['alert_id'])
+        assert alert['title'] == 'Backup falhou'
+        assert (await api.db_manager.get_alert_stats())['total'] == 1
+
+    run_api(scenario)
+
+
+def test_prefer_wait_times_out_with_202(run_api, make_alert):
+    async def scenario(api):
+        ingestor = api.db_manager.alert_ingestor
+        write = ingestor.write_batch
+
+        async def slow(batch):
+            await asyncio.sleep(0.2)
+            return await write(batch)
+
+        ingestor.write_batch = slow
+        response = await _create(api, make_alert(), prefer='wait=0.05')
+        body = json.loads(response.body)
+
+        assert response.status_code == 202
+        assert (await _settled(api, body['tracking_id']))['status'] == STORED
+
+    run_api(scenario)
+
+
+def test_prefer_wait_parsing(api):
+    assert api._prefer_wait(None) is None
+    assert api._prefer_wait('respond-async') is None
+    assert api._prefer_wait('respond-async, wait=5') == 5
+    assert api._prefer_wait('wait=600') == api.MAX_PREFER_WAIT
+    assert api._prefer_wait('wait=x') is None
+
+
+def test_quota_returns_429_with_retry_after(run_api, make_alert, monkeypatch):
+    monkeypatch.setenv('ALERT_INGEST_BURST', '2')
+    monkeypatch.setenv('ALERT_INGEST_RATE', '0.1')
+
+    async def scenario(api):
+        await _create(api, make_alert(metadata={'server': 'a'}))
+        await _create(api, make_alert(metadata={'server': 'b'}))
+
+        with pytest.raises(HTTPException) as refused:
+            await _create(api, make_alert())
+        # A cota é por client_id
+        other = await _create(api, make_alert(client_id='c2'))
+
+        assert refused.value.status_code == 429
+        assert refused.value.detail['reason'] == SHED_QUOTA
+        assert int(refused.value.headers['Retry-After']) >= 1
+        assert other.status_code == 202
+        assert api.db_manager.alert_ingestor.stats['shed_quota'] == 1
+
+    run_api(scenario)
+
+
+def test_full_queue_refuses_before_taking_quota():
+    async def scenario():
+        async def write(batch):
+            return {'errors': []}
+
+        ingestor = AlertIngestor(write, max_queue=1)
+        ingestor.start()
+        first = ingestor.submit({'client_id': 'c1'})
+        second = ingestor.submit({'client_id': 'c2'})
+        await ingestor.stop()
+        return ingestor, first, second
+
+    ingestor, first, second = asyncio.run(scenario())
+
+    assert first['accepted']
+    assert not second['accepted'] and second['reason'] == SHED_QUEUE
+    assert second['retry_after'] >= 1
+    # Recusa pela fila não consome ficha do cliente
+    assert 'c2' not in ingestor.quotas._buckets
+    assert ingestor.stats['stored'] == 1
+
+
+def test_write_failure_is_retried_then_returns_500(run_api, make_alert):
+    async def scenario(api):
+        ingestor = api.db_manager.alert_ingestor
+        calls = []
+
+        async def down(batch):
+            calls.append(len(batch))
+            raise ConnectionError('primário indisponível')
+
+        ingestor.write_batch = down
+        with pytest.raises(HTTPException) as failed:
+            await _create(api, make_alert(), prefer='wait=5')
+        accepted = json.loads((await _create(api, make_alert())).body)
+        status = await _settled(api, accepted['tracking_id'])
+
+        assert failed.value.status_code == 500
+        assert len(calls) == 2 * (ingestor.retries + 1)
+        assert ingestor.stats['failed'] == 2
+        assert status['status'] == FAILED
+        assert 'primário indisponível' in status['error']
+        assert await api.db_manager.get_collection('alerts').count_documents({}) == 0
+
+    run_api(scenario)
+
+
+def test_write_interrupted_after_insert_is_recovered(run_api, make_alert):
+    async def scenario(api):
+        ingestor = api.db_manager.alert_ingestor
+        write = ingestor.write_batch
+        collection = api.db_manager.get_collection('alerts')
+        calls = []
+
+        async def flaky(batch):
+            # Primeira tentativa: o insert chega ao servidor e a resposta se perde
+            calls.append(len(batch))
+            if len(calls) == 1:
+                await collection.insert_many([dict(alert) for alert in batch])
+                raise ConnectionError('conexão interrompida')
+            return await write(batch)
+
+        ingestor.write_batch = flaky
+        response = await _create(api, make_alert(), prefer='wait=5')
+
+        assert response['success']
+        assert len(calls) == 2
+        assert ingestor.stats['recovered'] == 1
+        assert await collection.count_documents({}) == 1
+        # Rollups aplicados uma única vez
+        assert (await api.db_manager.get_alert_stats())['total'] == 1
+
+    run_api(scenario)
+
+
+def test_same_active_problem_returns_409(run_api, make_alert):
+    async def scenario(api):
+        first = await _create(api, make_alert(), prefer='wait=5')
+        with pytest.raises(HTTPException) as conflict:
+            await _create(api, make_alert(), prefer='wait=5')
+
+        assert first['success']
+        assert conflict.value.status_code == 409
+        # Chave duplicada no fingerprint não é tomada por regravação recuperada
+        assert api.db_manager.alert_ingestor.stats['recovered'] == 0
+        assert (await api.db_manager.get_alert_stats())['total'] == 1
+
+    run_api(scenario)
@@ -0,0 +1,103 @@
+"""
+Arquivo Parquet de logs antigos: consultas que alcançam o arquivo e
+paginação por cursor na fronteira com o MongoDB
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from queries import encode_cursor, next_cursor
+
+
+@pytest.fixture
+def archived_logs(db):
+    """5 logs arquivados (40 dias atrás) e 3 recentes no MongoDB"""
+    pytest.importorskip('pyarrow')
+    os.makedirs(db.archive.path)
+    now = datetime.now()
+    logs = db.get_collection('logs')
+
+    logs.insert_many([
+        {'_id': ObjectId(), 'timestamp': now - timedelta(days=40, minutes=i),
+         'level': 'ERROR', 'origin': 'x', 'message': f"o{i}"}
+        for i in range(5)
+    ])
+    assert db.archive.archive(db.db) == 5
+    logs.insert_many([
+        {'timestamp': now - timedelta(minutes=i), 'level': 'ERROR', 'origin': 'x',
+         'message': f"n{i}"}
+        for i in range(3)
+    ])
+    return {'level': 'ERROR', 'timestamp': {'$gte': now - timedelta(days=41)}}
+
+
+def test_logs_without_period_stay_in_mongodb(db, archived_logs, monkeypatch):
+    partitions = []
+    days = db.archive._days
+    monkeypatch.setattr(db.archive, '_days', lambda *args: partitions.append(args) or days(*args))
+
+    logs = db.get_logs({'level': 'ERROR'}, limit=10)
+
+    assert [log['message'] for log in logs] == ['n0', 'n1', 'n2']
+    assert partitions == []
+
+
+def test_logs_page_across_archive_boundary(db, archived_logs):
+    first = db.get_logs(archived_logs, limit=4)
+    rest = db.get_logs(archived_logs, limit=4, cursor=next_cursor(first, 'timestamp', 4))
+
+    assert [log['message'] for log in first] == ['n0', 'n1', 'n2', 'o0']
+    assert [log['message'] for log in rest] == ['o1', 'o2', 'o3', 'o4']
+    # _id do arquivo volta como ObjectId: cursores iguais dos dois lados
+    assert {type(log['_id']) for log in first + rest} == {ObjectId}
+
+
+def test_cursor_inside_archive_continues_there(db, archived_logs):
+    archived = db.get_logs(archived_logs, limit=10)[3:]
+    cursor = encode_cursor(archived[1]['timestamp'], archived[1]['_id'])
+
+    # Sem período: o cursor anterior ao cutoff já alcança o arquivo
+    logs = db.get_logs({'level': 'ERROR'}, limit=10, cursor=cursor)
+
+    assert [log['message'] for log in logs] == ['o2', 'o3', 'o4']
+
+
+def test_iter_logs_crosses_archive_boundary(db, archived_logs):
+    streamed = [log['message'] for log in db.iter_logs(archived_logs, batch_size=2)]
+
+    assert streamed == ['n0', 'n1', 'n2', 'o0', 'o1', 'o2', 'o3', 'o4']
+    assert len(list(db.iter_logs(archived_logs, limit=4))) == 4
+
+
+def test_notification_log_round_trip(db):
+    pytest.importorskip('pyarrow')
+    from notifiers import NotificationManager
+
+    os.makedirs(db.archive.path)
+    alert_id = ObjectId()
+    NotificationManager(db)._log_notification(alert_id, 'email', 'suporte@c1.com', 'failed')
+    logs = db.get_collection('logs')
+    logs.update_many({}, {'$set': {'timestamp': datetime.now() - timedelta(days=40),
+                                   'metadata': {'tentativa': 2}}})
+    original = logs.find_one({})
+
+    assert db.archive.archive(db.db) == 1
+    assert logs.count_documents({}) == 0
+
+    period = {'timestamp': {'$gte': datetime.now() - timedelta(days=41)}}
+    restored, = db.get_logs(period, limit=10, fields=['*'])
+    assert restored['notification_type'] == 'email'
+    assert restored['recipient'] == 'suporte@c1.com'
+    assert restored['status'] == 'failed'
+    assert restored['alert_id'] == str(alert_id)
+    assert restored['metadata'] == {'tentativa': 2}
+    assert {key: value for key, value in restored.items() if key != 'timestamp'} == \
+        {key: value for key, value in original.items() if key != 'timestamp'}
+
+    # Campos de `extra` também atendem a sparse fieldsets
+    sparse, = db.get_logs(period, limit=10, fields=['recipient'])
+    assert sparse['recipient'] == 'suporte@c1.com'
+    assert 'status' not in sparse
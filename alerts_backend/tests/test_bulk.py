@@ -0,0 +1,79 @@
+"""
+Operações em lote sobre alertas: desfecho por id (inclusive ids inválidos ou
+inexistentes), limites e rollups coerentes com a collection
+"""
+
+import pytest
+from bson import ObjectId
+
+from bulk import ALREADY_RESOLVED, DELETED, INVALID_ID, NOT_FOUND, RESOLVED, UPDATED
+
+
+@pytest.fixture
+def alert_ids(db, make_alert):
+    result = db.insert_alerts([make_alert(title=f"a{i}", metadata={'server': f"srv-{i}"})
+                               for i in range(3)])
+    return [str(_id) for _id in result['inserted_ids']]
+
+
+def test_resolve_with_invalid_and_missing_ids(db, alert_ids):
+    missing = str(ObjectId())
+
+    result = db.resolve_alerts('operador', ids=[alert_ids[0], 'zzz', missing])
+
+    assert result['results'] == {alert_ids[0]: RESOLVED, 'zzz': INVALID_ID,
+                                 missing: NOT_FOUND}
+    assert result['succeeded'] == 1
+    assert db.get_alert_by_id(alert_ids[0])['status'] == 'resolved'
+    assert db.get_alert_by_id(alert_ids[1])['status'] == 'open'
+
+
+def test_resolve_twice_keeps_first_resolution(db, alert_ids):
+    db.resolve_alerts('primeiro', ids=alert_ids[:1])
+
+    result = db.resolve_alerts('segundo', ids=alert_ids[:2])
+
+    assert result['results'] == {alert_ids[0]: ALREADY_RESOLVED, alert_ids[1]: RESOLVED}
+    assert db.get_alert_by_id(alert_ids[0])['resolved_by'] == 'primeiro'
+
+
+def test_only_invalid_ids_change_nothing(db, alert_ids):
+    result = db.delete_alerts(ids=['zzz', '123'])
+
+    assert result['results'] == {'zzz': INVALID_ID, '123': INVALID_ID}
+    assert result['succeeded'] == 0
+    assert db.get_collection('alerts').count_documents({}) == 3
+
+
+def test_update_and_delete_by_id(db, alert_ids):
+    updated = db.update_alerts(ids=alert_ids[:2] + ['zzz'], update_data={'assigned_to': 'ana'})
+    deleted = db.delete_alerts(ids=[alert_ids[2], 'zzz'])
+
+    assert updated['results'] == {alert_ids[0]: UPDATED, alert_ids[1]: UPDATED,
+                                  'zzz': INVALID_ID}
+    assert deleted['results'] == {alert_ids[2]: DELETED, 'zzz': INVALID_ID}
+    assert db.get_alert_by_id(alert_ids[0])['assigned_to'] == 'ana'
+    assert db.get_alert_by_id(alert_ids[2]) is None
+
+
+def test_rollups_follow_bulk_changes(db, alert_ids):
+    db.resolve_alerts('operador', ids=alert_ids[:2])
+    db.delete_alerts(ids=alert_ids[:1])
+
+    stats = db.get_alert_stats()
+
+    assert stats['total'] == 2
+    assert stats['resolvedToday'] == 1
+    assert stats['openAlerts'] == 1
+
+
+def test_selection_is_validated(db, alert_ids, monkeypatch):
+    with pytest.raises(ValueError):
+        db.delete_alerts()
+    with pytest.raises(ValueError):
+        db.delete_alerts(ids=alert_ids, filters={'status': 'open'})
+
+    monkeypatch.setenv('BULK_MAX_ALERTS', '2')
+    with pytest.raises(ValueError):
+        db.resolve_alerts('operador', filters={'status': 'open'})
+    assert db.get_collection('alerts').count_documents({'status': 'open'}) == 3
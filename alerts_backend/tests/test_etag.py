@@ -0,0 +1,127 @@
+"""
+Requisições condicionais (ETag / If-None-Match -> 304) em /alerts, /logs e /stats
+
+Os handlers são chamados diretamente, com todos os parâmetros (sem os
+valores padrão do FastAPI).
+"""
+
+import asyncio
+import json
+
+from async_database import AsyncDatabaseManager
+
+
+def _alerts(api, if_none_match=None, **params):
+    query = {'status': None, 'severity': None, 'client_id': None, 'limit': None,
+             'cursor': None, 'fields': None, 'stream': False, 'accept': None, **params}
+    return api.get_alerts(**query, if_none_match=if_none_match)
+
+
+def _logs(api, if_none_match=None, **params):
+    query = {'level': None, 'origin': None, 'limit': None, 'start': None, 'end': None,
+             'cursor': None, 'fields': None, 'stream': False, 'accept': None, **params}
+    return api.get_logs(**query, if_none_match=if_none_match)
+
+
+def test_stats_not_modified_until_a_write(run_api, make_alert):
+    async def scenario(api):
+        await api.db_manager.insert_alert(make_alert())
+
+        first = await api.get_stats(None)
+        etag = first.headers['etag']
+        repeat = await api.get_stats(etag)
+        await api.db_manager.insert_alert(make_alert(client_id='c2'))
+        after = await api.get_stats(etag)
+
+        assert first.status_code == 200
+        assert first.headers['cache-control'] == 'no-cache'
+        assert repeat.status_code == 304
+        assert repeat.headers['etag'] == etag
+        assert after.status_code == 200
+        assert after.headers['etag'] != etag
+        assert json.loads(after.body)['total'] == 2
+
+    run_api(scenario)
+
+
+def test_alerts_etag_depends_on_query(run_api, make_alert):
+    async def scenario(api):
+        await api.db_manager.insert_alerts([make_alert(),
+                                            make_alert(client_id='c2', severity='low')])
+
+        first = await _alerts(api)
+        etag = first.headers['etag']
+
+        assert (await _alerts(api, etag)).status_code == 304
+        # Outra consulta (filtro ou limite) tem outro ETag
+        assert (await _alerts(api, etag, severity='low')).status_code == 200
+        assert (await _alerts(api, etag, limit=1)).status_code == 200
+        # Lista de ETags e weak match, como os navegadores enviam
+        assert (await _alerts(api, f'"outro", {etag}')).status_code == 304
+
+        await api.db_manager.resolve_alerts('operador', filters={'severity': 'low'})
+        changed = await _alerts(api, etag)
+        assert changed.status_code == 200
+        assert json.loads(changed.body)['total'] == 2
+
+    run_api(scenario)
+
+
+def test_logs_etag_changes_with_new_logs(run_api):
+    async def scenario(api):
+        await api.db_manager.insert_log({'level': 'INFO', 'origin': 'x', 'message': 'm1'})
+
+        first = await _logs(api)
+        etag = first.headers['etag']
+        assert (await _logs(api, etag)).status_code == 304
+
+        await api.db_manager.insert_logs([{'level': 'INFO', 'origin': 'x', 'message': 'm2'}])
+        after = await _logs(api, etag)
+        assert after.status_code == 200
+        assert json.loads(after.body)['total'] == 2
+
+    run_api(scenario)
+
+
+def test_streaming_responses_have_no_etag(run_api, make_alert):
+    async def scenario(api):
+        await api.db_manager.insert_alert(make_alert())
+
+        response = await _alerts(api, stream=True)
+
+        assert 'etag' not in response.headers
+
+    run_api(scenario)
+
+
+def test_workers_share_the_etag(make_alert, monkeypatch):
+    # Sem feed de alterações (backend em memória): estado relido a cada requisição
+    monkeypatch.setenv('ETAG_TTL', '0')
+
+    async def scenario():
+        workers = [AsyncDatabaseManager(), AsyncDatabaseManager()]
+        for worker in workers:
+            assert await worker.connect()
+        try:
+            params = {'limit': 100}
+            await workers[0].insert_alert(make_alert())
+            before = [await worker.etag(['alerts'], params) for worker in workers]
+
+            alert_id = str((await workers[1].get_alerts())[0]['_id'])
+            await workers[1].resolve_alert(alert_id, 'operador')
+            resolved = [await worker.etag(['alerts'], params) for worker in workers]
+            await workers[0].insert_alert(make_alert(client_id='c2'))
+            await workers[0].delete_alert(alert_id)
+            deleted = [await worker.etag(['alerts'], params) for worker in workers]
+
+            return before, resolved, deleted
+        finally:
+            for worker in workers:
+                await worker.close()
+
+    before, resolved, deleted = asyncio.run(scenario())
+
+    # Mesma ETag em todos os workers, alterada por gravações de qualquer um
+    assert before[0] == before[1]
+    assert resolved[0] == resolved[1] != before[0]
+    assert deleted[0] == deleted[1] not in (before[0], resolved[0])
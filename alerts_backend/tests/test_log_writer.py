@@ -0,0 +1,64 @@
+"""
+Gravador de logs: espera limitada com a fila cheia e regravação do disco
+sem duplicar logs que o banco já recebeu
+"""
+
+import time
+from datetime import datetime
+
+from bson import ObjectId, json_util
+
+from log_writer import OVERFLOW_SPILL, BufferedLogWriter
+
+
+def _writer(db, tmp_path, **options):
+    return BufferedLogWriter(
+        lambda docs: db._insert_many('logs', docs),
+        written_ids=db._written_log_ids,
+        spill_path=str(tmp_path / 'spill.jsonl'),
+        **options
+    )
+
+
+def _log(message):
+    return {'_id': ObjectId(), 'level': 'INFO', 'origin': 'test',
+            'message': message, 'timestamp': datetime.now().replace(microsecond=0)}
+
+
+def test_full_queue_blocks_for_a_bounded_time(db, tmp_path):
+    writer = _writer(db, tmp_path, max_queue=1, block_timeout=0.05)
+    # Thread marcada como iniciada sem consumir a fila
+    writer._thread = object()
+
+    assert writer.submit(_log('primeiro'))
+    started = time.monotonic()
+    assert writer.submit(_log('segundo'))
+
+    assert time.monotonic() - started < 1
+    assert writer.stats['enqueued'] == 1
+    assert writer.stats['dropped'] == 1
+
+
+def test_replay_skips_logs_already_written(db, tmp_path):
+    # Lote cujo insert chegou ao banco mas terminou em timeout: foi para o disco
+    written, pending = _log('gravado'), _log('pendente')
+    db.get_collection('logs').insert_one(dict(written))
+    with open(tmp_path / 'spill.jsonl', 'w', encoding='utf-8') as f:
+        for doc in (written, pending):
+            f.write(json_util.dumps(doc) + '\n')
+
+    writer = _writer(db, tmp_path, overflow=OVERFLOW_SPILL)
+    writer._replay_spilled()
+
+    messages = sorted(log['message'] for log in db.get_collection('logs').find({}))
+    assert messages == ['gravado', 'pendente']
+    assert writer.stats['replayed'] == 1
+    assert not (tmp_path / 'spill.jsonl').exists()
+
+
+def test_spilled_logs_get_an_id(db, tmp_path):
+    writer = _writer(db, tmp_path, overflow=OVERFLOW_SPILL)
+    writer._spill([{'message': 'sem id', 'timestamp': datetime.now()}])
+
+    with open(tmp_path / 'spill.jsonl', encoding='utf-8') as f:
+        assert '_id' in json_util.loads(f.readline())
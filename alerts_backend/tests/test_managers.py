@@ -0,0 +1,63 @@
+"""
+DatabaseManager e AsyncDatabaseManager: mesmas operações, mesmos resultados
+(consultas e resultados vêm dos módulos de cada funcionalidade)
+"""
+
+import asyncio
+import os
+
+from bson import ObjectId
+
+from async_database import AsyncDatabaseManager
+
+
+def _scenario(alerts):
+    """Upsert em lote, atualização, operação em lote e série sobre um banco vazio"""
+    return [
+        ('upsert_alerts', (alerts,), {}),
+        ('upsert_alerts', (alerts[:1],), {}),
+        ('update_alert', (str(ObjectId()), {'severity': 'low'}), {}),
+        ('resolve_alerts', ('operador',), {'filters': {'severity': 'high'}}),
+        ('get_alert_series', ('hour',), {}),
+        ('get_alert_stats', (), {}),
+    ]
+
+
+def _comparable(result):
+    """Sem ids e instantes, que diferem entre os dois bancos"""
+    if isinstance(result, dict):
+        result = {key: value for key, value in result.items()
+                  if key not in ('created_ids', 'results', 'start', 'end', 'buckets')}
+    return result
+
+
+def test_sync_and_async_managers_agree(db, make_alert, monkeypatch):
+    def alerts():
+        return [make_alert(metadata={'server': str(i)}) for i in range(3)]
+
+    expected = [_comparable(getattr(db, name)(*args, **kwargs))
+                for name, args, kwargs in _scenario(alerts())]
+
+    monkeypatch.setenv('DB_NAME', f"{os.environ['DB_NAME']}_async")
+
+    async def run():
+        manager = AsyncDatabaseManager()
+        assert await manager.connect()
+        try:
+            return [_comparable(await getattr(manager, name)(*args, **kwargs))
+                    for name, args, kwargs in _scenario(alerts())]
+        finally:
+            await manager.close()
+
+    assert asyncio.run(run()) == expected
+    assert expected[0]['created'] == 3 and expected[1]['updated'] == 1
+    assert expected[2] is False
+    assert expected[5]['total'] == 3 and expected[5]['openAlerts'] == 0
+
+
+def test_update_alert_reports_changes_only(db, make_alert):
+    alert_id = db.insert_alert(make_alert())
+
+    assert db.update_alert(alert_id, {'severity': 'low'})
+    assert not db.update_alert(str(ObjectId()), {'severity': 'low'})
+    assert db.get_alert_by_id(alert_id)['severity'] == 'low'
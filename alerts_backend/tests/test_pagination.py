@@ -0,0 +1,55 @@
+"""
+Paginação por cursor (keyset) em alertas
+"""
+
+import pytest
+
+from queries import next_cursor
+
+
+def test_alert_pages_break_ties_by_id(db, make_alert):
+    # insert_alerts grava o lote com o mesmo created_at: só o _id desempata
+    db.insert_alerts([make_alert(title=f"a{i}", metadata={'server': f"srv-{i}"})
+                      for i in range(25)])
+
+    seen = []
+    cursor = None
+    while True:
+        page = db.get_alerts(limit=10, cursor=cursor)
+        seen += page
+        cursor = next_cursor(page, 'created_at', 10)
+        if cursor is None:
+            break
+
+    ids = [alert['_id'] for alert in seen]
+    assert len(ids) == 25
+    assert len(set(ids)) == 25
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_alert_pages_respect_filters(db, make_alert):
+    db.insert_alerts([make_alert(severity='high' if i % 2 else 'low',
+                                 metadata={'server': f"srv-{i}"}) for i in range(9)])
+
+    first = db.get_alerts({'severity': 'high'}, limit=3)
+    rest = db.get_alerts({'severity': 'high'}, limit=3,
+                         cursor=next_cursor(first, 'created_at', 3))
+
+    assert [a['severity'] for a in first + rest] == ['high'] * 4
+    assert not {a['_id'] for a in first} & {a['_id'] for a in rest}
+
+
+def test_invalid_cursor_raises_value_error(db):
+    with pytest.raises(ValueError):
+        db.iter_alerts(cursor='não-é-um-cursor')
+
+
+def test_iter_alerts_matches_pages(db, make_alert):
+    db.insert_alerts([make_alert(title=f"a{i}", metadata={'server': f"srv-{i}"})
+                      for i in range(12)])
+
+    streamed = [alert['_id'] for alert in db.iter_alerts(batch_size=5)]
+    listed = [alert['_id'] for alert in db.get_alerts(limit=100)]
+
+    assert streamed == listed
+
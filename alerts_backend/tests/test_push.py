@@ -0,0 +1,159 @@
+"""
+Entrega em tempo real: retomada por Last-Event-ID, reset quando eventos se
+perdem e leitor por polling paginado
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from memory_backend import AsyncMemoryClient
+from push import RESET_EVENT, AsyncPushPoller, PushHub, parse_push_filters, sse_body
+
+
+def _alert(severity, seq=0):
+    return {'_id': seq, 'severity': severity}
+
+
+def _ops(items):
+    return [(operation, document and document['_id']) for _, operation, document in items]
+
+
+def test_resume_replays_events_after_last_id():
+    hub = PushHub('alerts')
+    for seq, severity in enumerate(['high', 'low', 'high', 'high'], 1):
+        hub.publish('insert', _alert(severity, seq))
+
+    _, replay = hub.subscribe(parse_push_filters('alerts', {'severity': 'high'}),
+                              hub.event_id(1))
+
+    assert _ops(replay) == [('insert', 3), ('insert', 4)]
+    assert hub.stats['replayed'] == 2
+
+
+def test_resume_with_unknown_id_gets_reset():
+    hub = PushHub('alerts')
+    hub.publish('insert', _alert('high', 1))
+
+    _, other_epoch = hub.subscribe({}, 'deadbeef-1')
+    _, malformed = hub.subscribe({}, f"{hub.epoch}-x")
+
+    assert _ops(other_epoch) == [(RESET_EVENT, None)]
+    assert _ops(malformed) == [(RESET_EVENT, None)]
+
+
+def test_resume_older_than_buffer_gets_reset():
+    hub = PushHub('alerts', buffer_size=2)
+    for seq in range(1, 5):
+        hub.publish('insert', _alert('high', seq))
+
+    _, kept = hub.subscribe({}, hub.event_id(2))
+    _, lost = hub.subscribe({}, hub.event_id(1))
+
+    assert _ops(kept) == [('insert', 3), ('insert', 4)]
+    assert _ops(lost) == [(RESET_EVENT, None)]
+
+
+def test_feed_reset_invalidates_previous_ids():
+    hub = PushHub('alerts')
+    hub.publish('insert', _alert('high', 1))
+    old_id = hub.event_id(1)
+    subscription, _ = hub.subscribe({})
+
+    hub.reset()
+    _, replay = hub.subscribe({}, old_id)
+
+    assert subscription.queue.get_nowait()[1] == RESET_EVENT
+    assert _ops(replay) == [(RESET_EVENT, None)]
+
+
+def test_lagging_connection_gets_reset():
+    hub = PushHub('alerts', queue_size=2)
+    subscription, _ = hub.subscribe({})
+
+    for seq in range(1, 4):
+        hub.publish('insert', _alert('high', seq))
+
+    assert subscription.queue.qsize() == 1
+    assert subscription.queue.get_nowait()[1] == RESET_EVENT
+    assert hub.stats['lagged'] == 1
+
+
+def test_sse_body_replays_then_streams():
+    async def scenario():
+        hub = PushHub('alerts')
+        hub.publish('insert', _alert('high', 1))
+        hub.publish('update', _alert('high', 2))
+
+        async def connected():
+            return False
+
+        body = sse_body(hub, {}, hub.event_id(1), connected, heartbeat=0.01)
+        frames = [await body.__anext__(), await body.__anext__()]
+        hub.publish('delete', {'_id': 3})
+        frames.append(await body.__anext__())
+        await body.aclose()
+        return hub, frames
+
+    hub, frames = asyncio.run(scenario())
+
+    assert frames[0].startswith(b'retry:')
+    assert frames[1].startswith(f"id: {hub.event_id(2)}\nevent: alert\n".encode())
+    assert b'"op":"update"' in frames[1]
+    assert frames[2].startswith(f"id: {hub.event_id(3)}\n".encode())
+    assert b'"op":"delete"' in frames[2]
+    # Conexão encerrada sai do hub
+    assert hub.subscribers == 0
+
+
+def test_parse_filters_rejects_unknown_field():
+    with pytest.raises(ValueError):
+        parse_push_filters('logs', {'severity': 'high'})
+    assert parse_push_filters('logs', {'level': 'info,error', 'origin': 'all'}) == \
+        {'level': {'INFO', 'ERROR'}}
+
+
+# ========== LEITOR POR POLLING ==========
+
+def _poller_run(limit, max_pages, batches):
+    """Publica `batches` (quantidade de logs por rodada) com um poller; retorna
+    os ids publicados e a quantidade de resets"""
+    async def scenario():
+        collection = AsyncMemoryClient(store={})['push']['logs']
+        hub = PushHub('logs')
+        published, resets = [], []
+        hub.publish = lambda operation, document: published.append(document['_id'])
+        hub.reset = lambda: resets.append(True)
+        poller = AsyncPushPoller(collection, hub, 'timestamp', interval=1,
+                                 limit=limit, max_pages=max_pages)
+
+        await poller.poll()
+        for count in batches:
+            now = datetime.now()
+            await collection.insert_many([{'timestamp': now, 'level': 'INFO'}
+                                          for _ in range(count)])
+            await poller.poll()
+            # Sobreposição da janela: a mesma rodada lida de novo não republica
+            await poller.poll()
+        return published, len(resets)
+
+    return asyncio.run(scenario())
+
+
+def test_poller_pages_without_duplicates():
+    # Mesmo timestamp em todos: a paginação avança por (timestamp, _id)
+    published, resets = _poller_run(limit=10, max_pages=3, batches=[25, 3])
+
+    assert len(published) == 28
+    assert len(set(published)) == 28
+    assert resets == 0
+
+
+def test_poller_burst_resets_connections():
+    # A rajada é pulada uma vez: a rodada seguinte não a relê
+    published, resets = _poller_run(limit=10, max_pages=3, batches=[40, 2])
+
+    assert resets == 1
+    assert len(published) == 32
+    assert len(set(published)) == 32
@@ -0,0 +1,102 @@
+"""
+Upsert por fingerprint: um alerta ativo por problema, ocorrências contadas e
+rollups de estatísticas só para os alertas criados
+"""
+
+from datetime import datetime, timedelta
+
+from dedup import alert_fingerprint, backfill_fingerprints
+
+
+def test_repeated_upsert_counts_occurrences(db, make_alert):
+    results = [db.upsert_alert(make_alert()) for _ in range(3)]
+
+    assert [r['created'] for r in results] == [True, False, False]
+    assert [r['occurrences'] for r in results] == [1, 2, 3]
+    assert len({r['_id'] for r in results}) == 1
+    assert db.get_collection('alerts').count_documents({}) == 1
+    assert db.get_alert_stats()['total'] == 1
+
+
+def test_resolved_alert_is_not_reopened(db, make_alert):
+    first = db.upsert_alert(make_alert())
+    assert db.resolve_alert(first['_id'], 'operador')
+
+    again = db.upsert_alert(make_alert())
+
+    assert again['created'] and again['_id'] != first['_id']
+    assert db.get_collection('alerts').count_documents({}) == 2
+
+
+def test_metadata_outside_fingerprint_does_not_split(db, make_alert):
+    db.upsert_alert(make_alert(metadata={'detalhe': 'a'}))
+    second = db.upsert_alert(make_alert(metadata={'detalhe': 'b'}))
+
+    assert not second['created']
+    assert alert_fingerprint(make_alert()) == \
+        db.get_collection('alerts').find_one({})['fingerprint']
+
+
+def test_bulk_upsert_counts(db, make_alert):
+    db.upsert_alert(make_alert(client_id='existente'))
+
+    result = db.upsert_alerts([
+        make_alert(client_id='existente'),
+        make_alert(client_id='novo'),
+        make_alert(client_id='novo'),
+        make_alert(client_id='outro'),
+    ])
+
+    assert result['errors'] == []
+    assert result['created'] == 2
+    assert result['updated'] == 2
+    assert [created is not None for created in result['created_ids']] == \
+        [False, True, False, True]
+
+    alerts = {doc['client_id']: doc for doc in db.get_collection('alerts').find({})}
+    assert {client: doc['occurrences'] for client, doc in alerts.items()} == \
+        {'existente': 2, 'novo': 2, 'outro': 1}
+    # Rollups: um por alerta criado, não por ocorrência
+    assert db.get_alert_stats()['total'] == 3
+
+
+def test_bulk_upsert_chunks_share_one_alert(db, make_alert):
+    result = db.upsert_alerts([make_alert() for _ in range(5)], chunk_size=2)
+
+    assert result['created'] == 1
+    assert result['updated'] == 4
+    assert db.get_collection('alerts').find_one({})['occurrences'] == 5
+
+
+def test_inserted_alert_is_matched_by_upsert(db, make_alert):
+    inserted = db.insert_alert(make_alert())
+
+    upserted = db.upsert_alert(make_alert())
+    repeated = db.insert_alerts([make_alert(), make_alert(client_id='c2')])
+
+    assert upserted == {'_id': inserted, 'created': False, 'occurrences': 2}
+    # Segundo alerta ativo do mesmo problema: recusado pelo índice
+    assert repeated['inserted'] == 1
+    assert [error['index'] for error in repeated['errors']] == [0]
+    assert db.get_collection('alerts').count_documents({}) == 2
+    assert db.get_alert_stats()['total'] == 2
+
+
+def test_backfill_fingerprints(db, make_alert):
+    alerts = db.get_collection('alerts')
+    now = datetime.now()
+    alerts.insert_many([
+        {**make_alert(), 'created_at': now - timedelta(hours=2)},
+        {**make_alert(), 'created_at': now - timedelta(hours=1)},
+        {**make_alert(status='resolved'), 'created_at': now - timedelta(hours=3)},
+        {**make_alert(client_id='c2'), 'created_at': now},
+    ])
+
+    assert backfill_fingerprints(db.db) == {'updated': 3, 'duplicates': 1}
+    assert backfill_fingerprints(db.db) == {'updated': 0, 'duplicates': 1}
+
+    # O mais recente dos ativos repetidos recebe o fingerprint e passa a ser atualizado
+    newest = alerts.find_one({'client_id': 'c1', 'created_at': now - timedelta(hours=1)})
+    assert db.upsert_alert(make_alert()) == {'_id': str(newest['_id']), 'created': False,
+                                             'occurrences': 2}
+    assert alerts.count_documents({'fingerprint': {'$exists': False}}) == 1
@@ -0,0 +1,349 @@
+"""
+Logs em Collection Time-Series
+Modo opcional (LOGS_TIMESERIES=1) em que `logs` é uma collection time-series:
+timeField `timestamp`, metaField `meta` ({origin, level}) e expiração por TTL
+
+Os documentos continuam planos para o restante do sistema; a conversão para o
+formato com `meta` acontece na gravação e na leitura.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Any, Tuple
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from queries import LOG_SUMMARY_FIELDS, build_projection, keyset_query, keyset_sort
+
+logger = logging.getLogger(__name__)
+
+LOGS_COLLECTION = 'logs'
+LEGACY_COLLECTION = 'logs_legacy'
+MIGRATIONS_COLLECTION = 'migrations'
+MIGRATION_ID = 'logs_timeseries'
+
+# Um log mais recente que isso indica gravações em andamento (migração recusada)
+MIGRATION_QUIET_SECONDS = 120
+
+META_FIELD = 'meta'
+META_KEYS = ['origin', 'level']
+
+# Índices secundários da collection time-series (campos do meta + tempo)
+TIMESERIES_INDEXES: List[IndexModel] = [
+    IndexModel(
+        [('meta.level', ASCENDING), ('meta.origin', ASCENDING), ('timestamp', DESCENDING)],
+        name='meta_level_origin_timestamp'
+    ),
+    IndexModel(
+        [('meta.origin', ASCENDING), ('timestamp', DESCENDING)],
+        name='meta_origin_timestamp'
+    ),
+]
+
+
+def timeseries_enabled() -> bool:
+    return os.getenv('LOGS_TIMESERIES', '0') == '1'
+
+
+def timeseries_options() -> Dict[str, Any]:
+    """Opções de create_collection (LOGS_TTL_DAYS=0 desativa a expiração)"""
+    options: Dict[str, Any] = {
+        'timeseries': {
+            'timeField': 'timestamp',
+            'metaField': META_FIELD,
+            'granularity': os.getenv('LOGS_TIMESERIES_GRANULARITY', 'seconds'),
+        }
+    }
+    ttl_days = float(os.getenv('LOGS_TTL_DAYS', '30'))
+    if ttl_days > 0:
+        options['expireAfterSeconds'] = int(ttl_days * 86400)
+    return options
+
+
+# ========== CONVERSÃO ==========
+
+def to_timeseries(log: Dict) -> Dict:
+    """Log plano -> documento time-series (origin/level dentro de meta)"""
+    doc = {key: value for key, value in log.items() if key not in META_KEYS}
+    doc[META_FIELD] = {key: log.get(key) for key in META_KEYS}
+    return doc
+
+
+def from_timeseries(doc: Dict) -> Dict:
+    """Documento time-series -> log plano"""
+    meta = doc.pop(META_FIELD, None) or {}
+    for key in META_KEYS:
+        if key in meta:
+            doc[key] = meta[key]
+    return doc
+
+
+def _meta_path(field: str) -> str:
+    return f"{META_FIELD}.{field}" if field in META_KEYS else field
+
+
+def timeseries_query(query: Any) -> Any:
+    """Reescreve um filtro (inclusive $and/$or aninhados) para os campos do meta"""
+    if isinstance(query, list):
+        return [timeseries_query(item) for item in query]
+    if not isinstance(query, dict):
+        return query
+    return {
+        _meta_path(key): timeseries_query(value) if key.startswith('$') else value
+        for key, value in query.items()
+    }
+
+
+def timeseries_projection(projection: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    """Reescreve uma projeção para os campos do meta"""
+    if projection is None:
+        return None
+    return {_meta_path(field): value for field, value in projection.items()}
+
+
+def log_document(log: Dict, timeseries: bool) -> Dict:
+    """Cópia do log no formato da collection (plano ou time-series)"""
+    return to_timeseries(log) if timeseries else dict(log)
+
+
+def from_logs(logs: List[Dict], timeseries: bool) -> List[Dict]:
+    """Logs lidos da collection no formato plano"""
+    return [from_timeseries(log) for log in logs] if timeseries else logs
+
+
+def find_logs(filters: Optional[Dict], cursor: Optional[str],
+              fields: Optional[List[str]], timeseries: bool) -> Tuple[Dict, Dict, List]:
+    """Consulta, projeção e ordenação keyset de get_logs/iter_logs, no
+    formato da collection"""
+    query = keyset_query(filters, 'timestamp', cursor)
+    projection = build_projection(fields, LOG_SUMMARY_FIELDS, 'timestamp')
+    if timeseries:
+        query = timeseries_query(query)
+        projection = timeseries_projection(projection)
+    return query, projection, keyset_sort('timestamp')
+
+
+# ========== PROVISIONAMENTO ==========
+
+def _collection_info(db, name: str) -> Optional[Dict]:
+    return next(iter(db.list_collections(filter={'name': name})), None)
+
+
+def is_timeseries(db, name: str = LOGS_COLLECTION) -> bool:
+    info = _collection_info(db, name)
+    return bool(info) and info.get('type') == 'timeseries'
+
+
+async def _collection_info_async(db, name: str) -> Optional[Dict]:
+    found = await db.list_collections(filter={'name': name})
+    infos = await found.to_list(None)
+    return infos[0] if infos else None
+
+
+async def is_timeseries_async(db, name: str = LOGS_COLLECTION) -> bool:
+    info = await _collection_info_async(db, name)
+    return bool(info) and info.get('type') == 'timeseries'
+
+
+def _ttl_change(info: Dict, options: Dict[str, Any]) -> Optional[Any]:
+    """Novo expireAfterSeconds se LOGS_TTL_DAYS mudou (None = sem alteração)"""
+    current = info.get('options', {}).get('expireAfterSeconds', 'off')
+    wanted = options.get('expireAfterSeconds', 'off')
+    return wanted if current != wanted else None
+
+
+def ensure_timeseries_logs(db) -> bool:
+    """Cria `logs` como time-series (retorna True se a collection está nesse formato)
+
+    Uma collection comum já existente não é alterada: é preciso migrá-la com
+    python timeseries.py --migrate
+    """
+    options = timeseries_options()
+    info = _collection_info(db, LOGS_COLLECTION)
+
+    if info is None:
+        db.create_collection(LOGS_COLLECTION, **options)
+        logger.info(f"✓ Collection time-series criada: {LOGS_COLLECTION}")
+        return True
+
+    if info.get('type') != 'timeseries':
+        logger.warning(f"⚠ '{LOGS_COLLECTION}' não é time-series; "
+                       "execute: python timeseries.py --migrate")
+        return False
+
+    ttl = _ttl_change(info, options)
+    if ttl is not None:
+        db.command('collMod', LOGS_COLLECTION, expireAfterSeconds=ttl)
+        logger.info(f"✓ TTL de '{LOGS_COLLECTION}' ajustado: {ttl}")
+    return True
+
+
+async def ensure_timeseries_logs_async(db) -> bool:
+    """Versão assíncrona de ensure_timeseries_logs"""
+    options = timeseries_options()
+    info = await _collection_info_async(db, LOGS_COLLECTION)
+
+    if info is None:
+        await db.create_collection(LOGS_COLLECTION, **options)
+        logger.info(f"✓ Collection time-series criada: {LOGS_COLLECTION}")
+        return True
+
+    if info.get('type') != 'timeseries':
+        logger.warning(f"⚠ '{LOGS_COLLECTION}' não é time-series; "
+                       "execute: python timeseries.py --migrate")
+        return False
+
+    ttl = _ttl_change(info, options)
+    if ttl is not None:
+        await db.command('collMod', LOGS_COLLECTION, expireAfterSeconds=ttl)
+        logger.info(f"✓ TTL de '{LOGS_COLLECTION}' ajustado: {ttl}")
+    return True
+
+
+# ========== MIGRAÇÃO ==========
+
+def migrate_logs(db, batch_size: int = 5000, force: bool = False) -> int:
+    """Converte `logs` em time-series copiando os dados em lotes
+
+    1. renomeia a collection comum para logs_legacy
+    2. cria `logs` como time-series
+    3. copia logs_legacy em ordem de _id, registrando o progresso em
+       `migrations` (uma execução interrompida continua de onde parou)
+
+    A API e o monitor precisam estar parados: logs gravados durante a
+    migração não são copiados (ou chegam sem o formato time-series). Um log
+    gravado há menos de MIGRATION_QUIET_SECONDS interrompe a migração
+    (force=True ignora a verificação).
+
+    logs_legacy é mantida para conferência; remova-a com --drop-legacy.
+    """
+    if not is_timeseries(db):
+        if _collection_info(db, LEGACY_COLLECTION) is not None:
+            raise RuntimeError(f"'{LEGACY_COLLECTION}' já existe e '{LOGS_COLLECTION}' "
+                               "não é time-series; verifique antes de migrar")
+        if _collection_info(db, LOGS_COLLECTION) is not None:
+            if not force:
+                _check_quiet(db[LOGS_COLLECTION])
+            db[LOGS_COLLECTION].rename(LEGACY_COLLECTION)
+            logger.info(f"✓ '{LOGS_COLLECTION}' renomeada para '{LEGACY_COLLECTION}'")
+        db.create_collection(LOGS_COLLECTION, **timeseries_options())
+        db[LOGS_COLLECTION].create_indexes(TIMESERIES_INDEXES)
+
+    if _collection_info(db, LEGACY_COLLECTION) is None:
+        return 0
+
+    progress = db[MIGRATIONS_COLLECTION]
+    state = progress.find_one({'_id': MIGRATION_ID}) or {}
+    query = {'_id': {'$gt': state['last_id']}} if state.get('last_id') else {}
+    copied = state.get('copied', 0)
+    # Lote que estava sendo gravado quando a execução anterior foi interrompida
+    pending_last_id = state.get('pending_last_id')
+
+    batch: List[Dict] = []
+    legacy = db[LEGACY_COLLECTION].find(query).sort('_id', ASCENDING).batch_size(batch_size)
+
+    for log in legacy:
+        # Documentos sem timestamp não são aceitos em time-series
+        if log.get('timestamp') is None:
+            continue
+        batch.append(to_timeseries(log))
+        if len(batch) >= batch_size:
+            copied += _copy_batch(db, batch, pending_last_id)
+            batch = []
+
+    if batch:
+        copied += _copy_batch(db, batch, pending_last_id)
+
+    return copied
+
+
+def _check_quiet(collection):
+    """Recusa a migração se `logs` recebeu gravações recentes"""
+    latest = collection.find_one({}, {'timestamp': 1}, sort=[('timestamp', DESCENDING)])
+    if not latest or not isinstance(latest.get('timestamp'), datetime):
+        return
+
+    since = datetime.now() - latest['timestamp']
+    if since < timedelta(seconds=MIGRATION_QUIET_SECONDS):
+        raise RuntimeError(f"Último log gravado há {int(since.total_seconds())}s: pare a API "
+                           "e o monitor antes de migrar (ou use --force)")
+
+
+def _copy_batch(db, batch: List[Dict], pending_last_id: Any = None) -> int:
+    """Grava um lote na time-series e registra o último _id copiado
+
+    O fim do lote é registrado antes do insert_many: se a execução for
+    interrompida entre a gravação e o checkpoint, a próxima descarta os _ids
+    desse intervalo já presentes em `logs` (time-series não tem _id único).
+    """
+    progress = db[MIGRATIONS_COLLECTION]
+    last_id = batch[-1]['_id']
+    # Os ignorados já foram copiados pela execução interrompida
+    count = len(batch)
+    progress.update_one(
+        {'_id': MIGRATION_ID},
+        {'$set': {'pending_last_id': last_id}},
+        upsert=True
+    )
+
+    if pending_last_id is not None and batch[0]['_id'] <= pending_last_id:
+        batch = _skip_copied(db, batch, pending_last_id)
+
+    if batch:
+        db[LOGS_COLLECTION].insert_many(batch, ordered=False)
+    progress.update_one(
+        {'_id': MIGRATION_ID},
+        {'$set': {'last_id': last_id}, '$unset': {'pending_last_id': ''},
+         '$inc': {'copied': count}}
+    )
+    logger.info(f"✓ {count} logs copiados (até {last_id})")
+    return count
+
+
+def _skip_copied(db, batch: List[Dict], pending_last_id: Any) -> List[Dict]:
+    """Remove do lote os logs já gravados pela execução interrompida"""
+    candidates = [doc for doc in batch if doc['_id'] <= pending_last_id]
+    stamps = [doc['timestamp'] for doc in candidates]
+    # O intervalo de timestamp limita a busca aos buckets do lote
+    found = db[LOGS_COLLECTION].find(
+        {'timestamp': {'$gte': min(stamps), '$lte': max(stamps)},
+         '_id': {'$in': [doc['_id'] for doc in candidates]}},
+        {'_id': 1}
+    )
+    existing = {doc['_id'] for doc in found}
+
+    if existing:
+        logger.info(f"✓ {len(existing)} logs já copiados antes da interrupção ignorados")
+    return [doc for doc in batch if doc['_id'] not in existing]
+
+
+if __name__ == "__main__":
+    from database import db_manager
+
+    if '--migrate' not in sys.argv and '--drop-legacy' not in sys.argv:
+        print("Uso: python timeseries.py --migrate [--force] | --drop-legacy")
+        sys.exit(2)
+
+    # A migração cria a collection e seus índices; connect() não deve
+    # provisionar `logs` antes dela
+    db_manager.timeseries_logs = False
+    db_manager.auto_indexes = False
+    db_manager.buffered_logs = False
+    if not db_manager.connect():
+        sys.exit(1)
+
+    try:
+        if '--migrate' in sys.argv:
+            print("🔄 Migrando logs para collection time-series...")
+            total = migrate_logs(db_manager.db, force='--force' in sys.argv)
+            legacy = db_manager.db[LEGACY_COLLECTION].estimated_document_count()
+            print(f"✅ {total} logs copiados ({legacy} em '{LEGACY_COLLECTION}')")
+            print("   Defina LOGS_TIMESERIES=1 e reinicie a API e o monitor")
+        else:
+            db_manager.db[LEGACY_COLLECTION].drop()
+            db_manager.db[MIGRATIONS_COLLECTION].delete_one({'_id': MIGRATION_ID})
+            print(f"✅ '{LEGACY_COLLECTION}' removida")
+    finally:
+        db_manager.close()
@@ -0,0 +1,175 @@
+"""
+Versões de Alteração e ETags
+Responde GETs condicionais (If-None-Match -> 304) de /alerts, /logs e /stats
+sem refazer a consulta ao MongoDB
+
+A ETag vem apenas do estado do banco (ver STATE_FIELDS), então todos os
+workers emitem a mesma ETag para os mesmos dados. O estado lido fica em cache
+por processo, invalidado:
+  - local: toda gravação do gerenciador incrementa a versão da collection
+    depois de concluída (inclusive os rollups)
+  - entre processos: eventos do feed de alterações do banco (change streams)
+  - janela de tempo: sem change streams (servidor standalone, DB_BACKEND=memory,
+    logs time-series), o estado é relido a cada ETAG_TTL segundos, o que
+    limita a defasagem para gravações de outros processos
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, Iterable, Mapping, Set, Tuple
+
+
+# Campo que muda a cada gravação, lido pelo índice: o documento mais recente
+# e o mais antigo (arquivamento de logs) mais a contagem (exclusões no meio,
+# só em alerts). alert_stats é derivada de alerts e não tem estado próprio.
+STATE_FIELDS = {
+    'alerts': 'updated_at',
+    'logs': 'timestamp',
+}
+# estimated_document_count não é suportado em collections time-series
+COUNTED_STATES = {'alerts'}
+
+
+def state_token(newest: Optional[Dict], oldest: Optional[Dict],
+                count: Optional[int]) -> str:
+    """Representação do estado de uma collection (entra no hash da ETag)"""
+    return repr((newest, oldest, count))
+
+
+class ChangeVersions:
+    """Versões locais por collection, cache do estado do banco e ETags
+
+    A ETag é calculada antes da consulta ao banco: uma gravação concorrente
+    muda o estado e a próxima requisição recebe a resposta completa.
+    """
+
+    def __init__(self, enabled: bool = True, ttl_seconds: float = 30.0):
+        self.enabled = enabled
+        self.ttl = ttl_seconds
+        self._versions: Dict[str, int] = {}
+        # collection -> (versão local, instante da leitura, estado do banco)
+        self._states: Dict[str, Tuple[int, float, str]] = {}
+        self._lock = threading.Lock()
+        self._feed = None
+        self._watched: Set[str] = set()
+        self.counters = {
+            'bumps': 0,
+            'state_reads': 0,
+            'checks': 0,
+            'not_modified': 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> 'ChangeVersions':
+        """Cria a partir de ETAG_ENABLED (0 desativa) e ETAG_TTL"""
+        return cls(
+            enabled=os.getenv('ETAG_ENABLED', '1') != '0',
+            ttl_seconds=float(os.getenv('ETAG_TTL', '30')),
+        )
+
+    def watch(self, feed, collections: Iterable[str]):
+        """Collections cujas alterações de outros processos chegam pelo `feed`"""
+        self._feed = feed
+        self._watched = set(collections)
+
+    def bump(self, *collections: str):
+        """Registra uma gravação (chamado depois de concluída)"""
+        with self._lock:
+            for name in collections:
+                self._versions[name] = self._versions.get(name, 0) + 1
+                self.counters['bumps'] += 1
+
+    def on_change(self, change: Dict):
+        """Evento do feed de alterações do banco"""
+        name = change.get('ns', {}).get('coll')
+        if name:
+            self.bump(name)
+
+    def reset(self):
+        """Eventos podem ter sido perdidos: invalida as ETags já emitidas"""
+        self.bump(*self._watched)
+
+    def version(self, collection: str) -> int:
+        with self._lock:
+            return self._versions.get(collection, 0)
+
+    def live(self, collection: str) -> bool:
+        """Alterações de outros processos chegam pelo feed (sem janela de tempo)"""
+        return (collection in self._watched and self._feed is not None
+                and self._feed.available)
+
+    def cached_state(self, collection: str) -> Optional[str]:
+        """Estado do banco já lido, se nenhuma alteração foi vista desde então
+
+        Sem o feed, o estado expira após ETAG_TTL segundos.
+        """
+        with self._lock:
+            entry = self._states.get(collection)
+            version = self._versions.get(collection, 0)
+        if entry is None or entry[0] != version:
+            return None
+        if not self.live(collection) and time.monotonic() - entry[1] >= self.ttl:
+            return None
+        return entry[2]
+
+    def states(self, collections: Iterable[str]) -> Tuple[Dict[str, str], Dict[str, int]]:
+        """Estados em cache e as collections a reler (com a versão local atual)"""
+        states: Dict[str, str] = {}
+        stale: Dict[str, int] = {}
+        for name in collections:
+            if name not in STATE_FIELDS:
+                continue
+            state = self.cached_state(name)
+            if state is None:
+                stale[name] = self.version(name)
+            else:
+                states[name] = state
+        return states, stale
+
+    def store_state(self, collection: str, version: int, state: str):
+        """Guarda o estado lido; `version` é a versão local de antes da leitura"""
+        with self._lock:
+            self._states[collection] = (version, time.monotonic(), state)
+            self.counters['state_reads'] += 1
+
+    def etag(self, states: Mapping[str, str], params: Mapping[str, Any]) -> Optional[str]:
+        """ETag (fraca) do estado das collections e dos parâmetros da consulta
+
+        None quando desativado.
+        """
+        if not self.enabled:
+            return None
+
+        parts = [f"{name}:{state}" for name, state in sorted(states.items())]
+        parts.append(repr(sorted((key, str(value)) for key, value in params.items()
+                                 if value is not None)))
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+    def not_modified(self, if_none_match: Optional[str], etag: Optional[str]) -> bool:
+        """If-None-Match contém a ETag atual (comparação fraca, RFC 9110)"""
+        if not etag or not if_none_match:
+            return False
+
+        self.counters['checks'] += 1
+        current = etag.removeprefix('W/')
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip()
+            if candidate == '*' or candidate.removeprefix('W/') == current:
+                self.counters['not_modified'] += 1
+                return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Versões e contadores para /metrics"""
+        with self._lock:
+            versions = dict(self._versions)
+        return {
+            'enabled': self.enabled,
+            'ttl_seconds': self.ttl,
+            'live': sorted(name for name in self._watched if self.live(name)),
+            'versions': versions,
+            **self.counters,
+        }
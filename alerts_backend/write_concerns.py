@@ -0,0 +1,59 @@
+"""
+Níveis de Write Concern
+Durabilidade das gravações por collection e por ponto de chamada: logs
+operacionais podem perder uma linha em uma falha, alertas e resoluções não
+
+Níveis:
+  - fire_and_forget: w=0, sem confirmação do servidor (erros não são vistos)
+  - fast: w=1 sem esperar o journal
+  - default: write concern da connection string
+  - durable: w='majority' com journal (WRITE_CONCERN_MAJORITY_TIMEOUT_MS)
+"""
+
+import os
+from typing import Optional, Dict
+
+from pymongo import WriteConcern
+
+TIER_FIRE_AND_FORGET = 'fire_and_forget'
+TIER_FAST = 'fast'
+TIER_DEFAULT = 'default'
+TIER_DURABLE = 'durable'
+TIERS = (TIER_FIRE_AND_FORGET, TIER_FAST, TIER_DEFAULT, TIER_DURABLE)
+
+# Nível de cada collection (WRITE_CONCERN_<COLLECTION> sobrescreve)
+COLLECTION_TIERS: Dict[str, str] = {
+    'alerts': TIER_DURABLE,
+    'logs': TIER_FAST,
+}
+
+# Pontos de chamada com nível próprio (WRITE_CONCERN_SITE_<PONTO> sobrescreve)
+SITE_TIERS: Dict[str, str] = {
+    'resolve_alert': TIER_DURABLE,
+    'resolution_log': TIER_DURABLE,
+    'notification_log': TIER_FAST,
+}
+
+
+def write_tier(collection: str, site: Optional[str] = None) -> str:
+    """Nível de uma gravação: ponto de chamada > collection > default"""
+    if site:
+        tier = os.getenv(f"WRITE_CONCERN_SITE_{site.upper()}") or SITE_TIERS.get(site)
+        if tier:
+            return tier
+    return os.getenv(f"WRITE_CONCERN_{collection.upper()}") \
+        or COLLECTION_TIERS.get(collection, TIER_DEFAULT)
+
+
+def write_concern(tier: str) -> Optional[WriteConcern]:
+    """WriteConcern do nível (None = manter o do client)"""
+    if tier == TIER_FIRE_AND_FORGET:
+        return WriteConcern(w=0)
+    if tier == TIER_FAST:
+        return WriteConcern(w=1, j=False)
+    if tier == TIER_DURABLE:
+        timeout = int(os.getenv('WRITE_CONCERN_MAJORITY_TIMEOUT_MS', '5000'))
+        return WriteConcern(w='majority', j=True, wtimeout=timeout or None)
+    if tier == TIER_DEFAULT:
+        return None
+    raise ValueError(f"Nível de write concern inválido: {tier} (use {', '.join(TIERS)})")
@@ -5,6 +5,7 @@ import { Card } from "@/components/ui/card"
 import { ChartContainer } from "@/components/ui/chart"
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from "recharts"
 import { Spinner } from "@/components/ui/spinner"
+import { subscribeAlerts } from "@/lib/api"
 
 interface ChartData {
   day: string
@@ -47,10 +48,24 @@ export function AlertsChart() {
     }
 
     fetchChartData()
-    
-    // Atualizar a cada 5 minutos
+
+    // Novos alertas chegam em tempo real; agrupa rajadas em uma atualização
+    let pending: ReturnType<typeof setTimeout> | undefined
+    const refresh = () => {
+      clearTimeout(pending)
+      pending = setTimeout(fetchChartData, 2000)
+    }
+    const unsubscribe = subscribeAlerts({}, (event) => {
+      if (event.op === "insert") refresh()
+    }, refresh)
+
+    // Atualizar a cada 5 minutos (virada do dia e falhas da conexão)
     const interval = setInterval(fetchChartData, 5 * 60 * 1000)
-    return () => clearInterval(interval)
+    return () => {
+      unsubscribe()
+      clearTimeout(pending)
+      clearInterval(interval)
+    }
   }, [])
 
   if (loading) {
@@ -36,6 +36,7 @@ export function LogsView() {
       if (levelFilter !== "all") params.set("level", levelFilter)
       if (originFilter !== "all") params.set("origin", originFilter)
       params.set("limit", "1000")
+      params.set("fields", "level,origin,message,timestamp,metadata")
 
       const response = await fetch(`http://localhost:8000/logs?${params}`)
       
@@ -45,7 +45,7 @@ export async function getAlerts(params?: {
   if (params?.limit) queryParams.set('limit', params.limit.toString())
 
   const response = await fetch(`${API_BASE_URL}/alerts?${queryParams}`, {
-    cache: 'no-store',
+    cache: 'no-cache',
   })
 
   if (!response.ok) {
@@ -83,6 +83,11 @@ export async function createAlert(alertData: Partial<Alert>): Promise<string> {
     body: JSON.stringify(alertData),
   })
 
+  if (response.status === 429) {
+    const retryAfter = response.headers.get('Retry-After') ?? '1'
+    throw new Error(`Limite de alertas excedido, tente novamente em ${retryAfter}s`)
+  }
+
   if (!response.ok) {
     throw new Error('Falha ao criar alerta')
   }
@@ -144,6 +149,69 @@ export async function deleteAlert(alertId: string): Promise<void> {
   }
 }
 
+/**
+ * Seleção de uma operação em lote: lista de ids ou filtro (apenas um deles)
+ */
+interface BulkSelection {
+  ids?: string[]
+  filter?: {
+    status?: string
+    severity?: string
+    client_id?: string
+  }
+}
+
+interface BulkResult {
+  action: 'update' | 'resolve' | 'delete'
+  total: number
+  succeeded: number
+  counts: Record<string, number>
+  results: Record<string, string>
+}
+
+async function bulkRequest(path: string, method: string, body: object): Promise<BulkResult> {
+  const response = await fetch(`${API_BASE_URL}/alerts/bulk${path}`, {
+    method,
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(body),
+  })
+
+  if (!response.ok) {
+    throw new Error('Falha na operação em lote')
+  }
+
+  return response.json()
+}
+
+/**
+ * Atualiza vários alertas de uma vez
+ */
+export async function bulkUpdateAlerts(
+  selection: BulkSelection,
+  updates: { status?: string; assigned_to?: string; resolved_by?: string }
+): Promise<BulkResult> {
+  return bulkRequest('', 'PUT', { ...selection, update: updates })
+}
+
+/**
+ * Resolve vários alertas de uma vez
+ */
+export async function bulkResolveAlerts(
+  selection: BulkSelection,
+  resolvedBy: string
+): Promise<BulkResult> {
+  return bulkRequest('/resolve', 'POST', { ...selection, resolved_by: resolvedBy })
+}
+
+/**
+ * Deleta vários alertas de uma vez
+ */
+export async function bulkDeleteAlerts(selection: BulkSelection): Promise<BulkResult> {
+  return bulkRequest('/delete', 'POST', selection)
+}
+
 /**
  * Busca estatísticas
  */
@@ -155,7 +223,7 @@ export async function getStats(): Promise<{
   total: number
 }> {
   const response = await fetch(`${API_BASE_URL}/stats`, {
-    cache: 'no-store',
+    cache: 'no-cache',
   })
 
   if (!response.ok) {
@@ -165,6 +233,43 @@ export async function getStats(): Promise<{
   return response.json()
 }
 
+/**
+ * Busca a série de alertas por intervalo (gráfico do dashboard)
+ */
+export async function getAlertSeries(params?: {
+  granularity?: 'minute' | 'hour' | 'day'
+  start?: string
+  end?: string
+}): Promise<{
+  granularity: string
+  total: number
+  severity: Record<string, number>
+  type: Record<string, number>
+  buckets: {
+    t: string
+    total: number
+    sealed: boolean
+    severity: Record<string, number>
+    type: Record<string, number>
+  }[]
+}> {
+  const queryParams = new URLSearchParams()
+  
+  if (params?.granularity) queryParams.set('granularity', params.granularity)
+  if (params?.start) queryParams.set('start', params.start)
+  if (params?.end) queryParams.set('end', params.end)
+
+  const response = await fetch(`${API_BASE_URL}/stats/series?${queryParams}`, {
+    cache: 'no-store',
+  })
+
+  if (!response.ok) {
+    throw new Error('Falha ao buscar série de alertas')
+  }
+
+  return response.json()
+}
+
 /**
  * Busca logs do sistema
  */
@@ -180,7 +285,7 @@ export async function getLogs(params?: {
   if (params?.limit) queryParams.set('limit', params.limit.toString())
 
   const response = await fetch(`${API_BASE_URL}/logs?${queryParams}`, {
-    cache: 'no-store',
+    cache: 'no-cache',
   })
 
   if (!response.ok) {
@@ -189,3 +294,48 @@ export async function getLogs(params?: {
 
   return response.json()
 }
+
+type StreamOperation = 'insert' | 'update' | 'replace' | 'delete'
+
+function subscribe<T>(
+  path: string,
+  params: Record<string, string | undefined>,
+  eventName: string,
+  onEvent: (event: T) => void,
+  onReset?: () => void
+): () => void {
+  const queryParams = new URLSearchParams()
+  for (const [key, value] of Object.entries(params)) {
+    if (value) queryParams.set(key, value)
+  }
+
+  // O EventSource reconecta sozinho enviando Last-Event-ID (sem lacunas)
+  const source = new EventSource(`${API_BASE_URL}/stream/${path}?${queryParams}`)
+  source.addEventListener(eventName, (event) => onEvent(JSON.parse((event as MessageEvent).data)))
+  source.addEventListener('reset', () => onReset?.())
+
+  return () => source.close()
+}
+
+/**
+ * Recebe alertas criados, alterados e removidos em tempo real
+ * (onReset: eventos perdidos, recarregar a lista). Retorna a função que encerra a conexão.
+ */
+export function subscribeAlerts(
+  params: { severity?: string; client_id?: string; status?: string },
+  onAlert: (event: { op: StreamOperation; alert: Alert }) => void,
+  onReset?: () => void
+): () => void {
+  return subscribe('alerts', params, 'alert', onAlert, onReset)
+}
+
+/**
+ * Recebe logs novos em tempo real
+ */
+export function subscribeLogs(
+  params: { level?: string; origin?: string },
+  onLog: (event: { op: StreamOperation; log: any }) => void,
+  onReset?: () => void
+): () => void {
+  return subscribe('logs', params, 'log', onLog, onReset)
+}